@@ -0,0 +1,260 @@
+"""
+診断エンジンのヘッドレス JSON API (ASGI)
+
+提携先や LINE のバックエンドが Streamlit の画面を経由せずに診断結果を取得するためのもの。
+Streamlit に同梱の Starlette / Uvicorn だけで動き、外部サービスには依存しない。
+
+    POST /v1/diagnosis        1件の診断（result_cache を通すので同じ入力は再計算しない）
+    POST /v1/diagnosis/batch  まとめて診断（fortune_batch の配列演算をスレッドプールで実行）
+    GET  /healthz             起動確認
+    GET  /metrics             Prometheus のテキスト形式
+
+1件のレコードは {"name", "dob": "19970324", "birth_time": "0830"（任意）, "answers": {"Q1": 1〜7, ...}}。
+レスポンスには render_result_component と同じ LINE 連携用のメッセージとリンクを含める。
+
+    python api.py --host 127.0.0.1 --port 8080
+"""
+import argparse
+import contextlib
+import datetime
+import json
+import logging
+import os
+import urllib.parse
+
+import numpy as np
+from starlette.applications import Starlette
+from starlette.concurrency import run_in_threadpool
+from starlette.responses import JSONResponse, PlainTextResponse, Response
+from starlette.routing import Route
+
+import result_cache
+from content_pack import get_content_pack
+from fortune_engine import SCORE_KEYS, get_fortune_table, parse_birth_time
+from instrumentation import prometheus_text, span
+from line_link import LINE_OA_URL, build_line_message, link_from_parts
+
+logger = logging.getLogger("fate.api")
+
+TIPI_KEYS = result_cache.TIPI_KEYS
+BIG5_KEYS = ("Extraversion", "Agreeableness", "Conscientiousness", "Neuroticism", "Openness")
+# 1リクエストで受け付ける最大件数
+MAX_BATCH = int(os.environ.get("FATE_API_MAX_BATCH", "10000"))
+
+
+class InvalidRecord(ValueError):
+    """リクエストの1件分が不正"""
+
+
+# ==========================================
+# 1. Request Parsing
+# ==========================================
+def parse_dob(value):
+    """"19970324" 形式の生年月日を date にする（アプリのフォームと同じ規則）"""
+    if not isinstance(value, str) or not value.isdigit() or len(value) != 8:
+        raise InvalidRecord("dob は「19970324」のような半角数字8桁の文字列で指定してください")
+    try:
+        return datetime.date(int(value[:4]), int(value[4:6]), int(value[6:]))
+    except ValueError:
+        raise InvalidRecord(f"存在しない日付です: {value}") from None
+
+
+def parse_time(value):
+    """任意の出生時刻 "0830" / "08:30" → 0時からの分（省略・null・空文字なら None）"""
+    if value is None:
+        return None
+    if not isinstance(value, str):
+        raise InvalidRecord("birth_time は「0830」のような文字列で指定してください")
+    try:
+        return parse_birth_time(value)
+    except ValueError as e:
+        raise InvalidRecord(str(e)) from None
+
+
+def parse_answers(value):
+    """TIPI 回答 {Q1..Q10: 1〜7 の整数} を検証する"""
+    if not isinstance(value, dict):
+        raise InvalidRecord("answers は Q1〜Q10 を持つオブジェクトで指定してください")
+    answers = {}
+    for key in TIPI_KEYS:
+        v = value.get(key)
+        if isinstance(v, bool) or not isinstance(v, int) or not 1 <= v <= 7:
+            raise InvalidRecord(f"answers.{key} は 1〜7 の整数で指定してください")
+        answers[key] = v
+    return answers
+
+
+def parse_record(record):
+    """1件分のリクエスト → (名前, 生年月日の文字列, date, 回答, 出生時刻の分 or None)"""
+    if not isinstance(record, dict):
+        raise InvalidRecord("レコードはオブジェクトで指定してください")
+    name = record.get("name") or ""
+    if not isinstance(name, str):
+        raise InvalidRecord("name は文字列で指定してください")
+    dob = record.get("dob")
+    return name, dob, parse_dob(dob), parse_answers(record.get("answers")), parse_time(record.get("birth_time"))
+
+
+# ==========================================
+# 2. Response Building
+# ==========================================
+def _response(name, dob, result, big5_norm, line_link=None):
+    """API のレスポンス1件分。line_link を省略するとメッセージからリンクを組み立てる"""
+    type_id = result["gan"] + 1
+    message = build_line_message(name, dob, type_id, big5_norm)
+    return {
+        "type_id": type_id,
+        "type_name": get_content_pack().get_type(result["gan"])["name"],
+        "fate_code": result["fate_code"],
+        "scores": result["scores"],
+        "big5": big5_norm,
+        "partners": result["partners"],
+        "line": {
+            "message": message,
+            "link": line_link or LINE_OA_URL + urllib.parse.quote(message),
+        },
+    }
+
+
+def diagnose_one(record):
+    """1件を診断する。入力が不正なら InvalidRecord"""
+    name, dob, date_obj, answers, minute = parse_record(record)
+    diagnosis = result_cache.diagnose(date_obj, answers, minute)
+    return _response(name, dob, diagnosis["result"], diagnosis["big5_norm"],
+                     link_from_parts(diagnosis["line_parts"], name))
+
+
+def diagnose_batch(records):
+    """
+    複数件をまとめて診断する。結果は入力と同じ順で、不正なレコードは {"error": ...} になる。
+    運命・Big Five の計算は fortune_batch の配列版で一括して行う。
+    """
+    import fortune_batch
+
+    parsed, results = [], [None] * len(records)
+    for i, record in enumerate(records):
+        try:
+            parsed.append((i,) + parse_record(record))
+        except InvalidRecord as e:
+            results[i] = {"error": str(e)}
+    if not parsed:
+        return results
+
+    dates = np.array([p[3] for p in parsed], dtype="datetime64[D]")
+    answers = np.array([[p[4][k] for k in TIPI_KEYS] for p in parsed], dtype=np.int16)
+    minutes = np.array([np.nan if p[5] is None else p[5] for p in parsed], dtype=np.float64)
+    with span("api.batch.engine"):
+        fate = fortune_batch.analyze_many(dates, minutes)
+    with span("api.batch.big5"):
+        birth_years = dates.astype("datetime64[Y]").astype(np.int64) + 1970
+        _, big5 = fortune_batch.calculate_big5_many(answers, birth_years)
+
+    pack = get_content_pack()
+    gans = fate["gan"].tolist()
+    scores = {key: fate[key].tolist() for key in SCORE_KEYS}
+    codes = fate["fate_code"].tolist()
+    big5 = {key: big5[key].tolist() for key in BIG5_KEYS}
+    with span("api.batch.line"):
+        for j, (i, name, dob, _, _, _) in enumerate(parsed):
+            result = {
+                "gan": gans[j],
+                "scores": {key: scores[key][j] for key in SCORE_KEYS},
+                "fate_code": codes[j],
+                "partners": list(pack.compatibility_map.get(gans[j], ())),
+            }
+            results[i] = _response(name, dob, result, {key: big5[key][j] for key in BIG5_KEYS})
+    return results
+
+
+# ==========================================
+# 3. ASGI Endpoints
+# ==========================================
+def _error(message, status=400):
+    return JSONResponse({"error": message}, status_code=status)
+
+
+async def _read_json(request):
+    body = await request.body()
+    # 数千件の JSON の解析はイベントループを止めないようスレッドプールで行う
+    return await run_in_threadpool(json.loads, body)
+
+
+async def diagnosis_endpoint(request):
+    try:
+        record = await _read_json(request)
+        with span("api.diagnosis"):
+            return JSONResponse(diagnose_one(record))
+    except (json.JSONDecodeError, UnicodeDecodeError):
+        return _error("リクエスト本文が JSON ではありません")
+    except InvalidRecord as e:
+        return _error(str(e))
+
+
+def _batch_body(payload):
+    if not isinstance(payload, dict) or not isinstance(payload.get("records"), list):
+        raise InvalidRecord("records (配列) を指定してください")
+    records = payload["records"]
+    if len(records) > MAX_BATCH:
+        raise InvalidRecord(f"1リクエストあたり最大 {MAX_BATCH} 件です: {len(records)} 件")
+    with span("api.batch"):
+        results = diagnose_batch(records)
+    return json.dumps({"count": len(results), "results": results}, ensure_ascii=False).encode("utf-8")
+
+
+async def batch_endpoint(request):
+    try:
+        payload = await _read_json(request)
+        # 計算とシリアライズもスレッドプールに逃がし、他のリクエストの応答を遅らせない
+        body = await run_in_threadpool(_batch_body, payload)
+    except (json.JSONDecodeError, UnicodeDecodeError):
+        return _error("リクエスト本文が JSON ではありません")
+    except InvalidRecord as e:
+        return _error(str(e))
+    return Response(body, media_type="application/json")
+
+
+async def health_endpoint(request):
+    return JSONResponse({"status": "ok", "content_version": get_content_pack().version})
+
+
+async def metrics_endpoint(request):
+    counters = {f"fate_result_cache_{k}": v for k, v in result_cache.stats().items()}
+    return PlainTextResponse(prometheus_text(counters))
+
+
+@contextlib.asynccontextmanager
+async def lifespan(app):
+    # 参照テーブルとコンテンツパックを最初のリクエストより前に用意しておく
+    await run_in_threadpool(get_content_pack)
+    await run_in_threadpool(get_fortune_table)
+    logger.info("api ready")
+    yield
+
+
+app = Starlette(
+    routes=[
+        Route("/v1/diagnosis", diagnosis_endpoint, methods=["POST"]),
+        Route("/v1/diagnosis/batch", batch_endpoint, methods=["POST"]),
+        Route("/healthz", health_endpoint, methods=["GET"]),
+        Route("/metrics", metrics_endpoint, methods=["GET"]),
+    ],
+    lifespan=lifespan,
+)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="診断エンジンの JSON API を起動する")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8080)
+    parser.add_argument("--workers", type=int, default=1, help="ワーカープロセス数 (既定: 1)")
+    args = parser.parse_args(argv)
+
+    import uvicorn
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(name)s %(message)s")
+    os.chdir(os.path.dirname(os.path.abspath(__file__)))
+    uvicorn.run("api:app", host=args.host, port=args.port, workers=args.workers)
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,155 @@
+"""
+画像アセットのマニフェスト
+
+起動時に1度だけ images/ を走査し、タイプID → 解決済みパス・内容ハッシュ・バイト列・
+モバイル幅の縮小版（PNG / WebP）を組み立てる。再実行のたびに os.path.exists で
+拡張子を探したり、フルサイズの PNG を読み直して再エンコードしたりしないためのもの。
+画像が無いタイプには外部サービスではなくローカルで生成したプレースホルダーを返す。
+"""
+import collections
+import concurrent.futures
+import hashlib
+import io
+import os
+import threading
+
+try:
+    from PIL import Image, ImageDraw
+except ImportError:  # Pillow が無い環境では縮小版を作らず原寸のみ扱う
+    Image = None
+
+IMAGE_DIR = "images"
+EXTENSIONS = ['.png', '.jpg', '.jpeg', '.PNG', '.JPG']
+TYPE_IDS = range(1, 11)
+
+# モバイル向けの縮小幅。DISPLAY_WIDTH が st.image で実際に表示する幅
+VARIANT_WIDTHS = (480, 720)
+VARIANT_FORMATS = ("PNG", "WEBP")
+DISPLAY_WIDTH = 720
+PLACEHOLDER_SIZE = 400
+
+# 縮小版のディスクキャッシュ（内容ハッシュ単位なので画像を差し替えれば自動で作り直される）
+CACHE_DIR = os.environ.get("FATE_ASSET_CACHE_DIR", ".asset_cache")
+
+ImageAsset = collections.namedtuple("ImageAsset", ["type_id", "path", "sha256", "data", "variants"])
+
+
+# ==========================================
+# 1. Path Resolution
+# ==========================================
+def resolve_image_path(type_id, base_dir=IMAGE_DIR):
+    """画像パス探索（8と9はファイル名が入れ替わっているので読み替える）"""
+    target_id = type_id
+    if type_id == 8: target_id = 9
+    elif type_id == 9: target_id = 8
+
+    if not os.path.exists(base_dir): return None
+    for ext in EXTENSIONS:
+        path = os.path.join(base_dir, f"{target_id}{ext}")
+        if os.path.exists(path): return path
+    return None
+
+
+# ==========================================
+# 2. Variants & Placeholder
+# ==========================================
+def _encode(image, fmt):
+    buf = io.BytesIO()
+    if fmt == "WEBP":
+        image.save(buf, format="WEBP", quality=85, method=4)
+    else:
+        image.save(buf, format=fmt)
+    return buf.getvalue()
+
+
+def _build_variants(data, sha256):
+    """幅ごと・形式ごとの縮小版を作る（ディスクキャッシュがあればそれを読む）"""
+    if Image is None:
+        return {}
+    variants = {}
+    source = None
+    # 大きい幅から順に縮小し、次の幅はひとつ前の縮小結果から作る
+    for width in sorted(VARIANT_WIDTHS, reverse=True):
+        for fmt in VARIANT_FORMATS:
+            cache_path = os.path.join(CACHE_DIR, f"{sha256[:16]}-{width}.{fmt.lower()}")
+            if os.path.exists(cache_path):
+                with open(cache_path, "rb") as f:
+                    variants[(width, fmt)] = f.read()
+                continue
+            if source is None:
+                source = Image.open(io.BytesIO(data))
+                source.load()
+            if source.width > width:
+                source = source.resize((width, round(source.height * width / source.width)), Image.LANCZOS)
+            encoded = _encode(source, fmt)
+            variants[(width, fmt)] = encoded
+            try:
+                os.makedirs(CACHE_DIR, exist_ok=True)
+                with open(cache_path, "wb") as f:
+                    f.write(encoded)
+            except OSError:
+                pass
+    return variants
+
+
+def _build_placeholder():
+    """placehold.co の代わりにローカルで作る「No Image」画像"""
+    if Image is None:
+        return (
+            f'<svg xmlns="http://www.w3.org/2000/svg" width="{PLACEHOLDER_SIZE}" height="{PLACEHOLDER_SIZE}">'
+            f'<rect width="100%" height="100%" fill="#F0F0F0"/>'
+            f'<text x="50%" y="50%" fill="#333" font-size="28" text-anchor="middle" dominant-baseline="middle">No Image</text>'
+            f'</svg>'
+        )
+    image = Image.new("RGB", (PLACEHOLDER_SIZE, PLACEHOLDER_SIZE), "#F0F0F0")
+    draw = ImageDraw.Draw(image)
+    draw.text((PLACEHOLDER_SIZE / 2, PLACEHOLDER_SIZE / 2), "No Image", fill="#333333", anchor="mm")
+    return _encode(image, "PNG")
+
+
+# ==========================================
+# 3. Manifest
+# ==========================================
+def _load_asset(type_id, base_dir):
+    path = resolve_image_path(type_id, base_dir)
+    if path is None:
+        return None
+    with open(path, "rb") as f:
+        data = f.read()
+    sha256 = hashlib.sha256(data).hexdigest()
+    return ImageAsset(type_id, path, sha256, data, _build_variants(data, sha256))
+
+
+def build_manifest(base_dir=IMAGE_DIR):
+    """タイプID(1始まり) → ImageAsset。画像が無いタイプは含めない"""
+    # Pillow のデコード・縮小・エンコードは GIL を離すので、画像ごとにスレッドで並列に作る
+    with concurrent.futures.ThreadPoolExecutor() as pool:
+        assets = pool.map(lambda type_id: _load_asset(type_id, base_dir), TYPE_IDS)
+        return {asset.type_id: asset for asset in assets if asset is not None}
+
+
+_manifest = None
+_placeholder = None
+_manifest_lock = threading.Lock()
+
+
+def get_manifest():
+    """プロセス内で共有するマニフェスト（初回呼び出し時に1度だけ構築）"""
+    global _manifest, _placeholder
+    if _manifest is None:
+        with _manifest_lock:
+            if _manifest is None:
+                _placeholder = _build_placeholder()
+                _manifest = build_manifest()
+    return _manifest
+
+
+def get_image(type_id, width=DISPLAY_WIDTH, fmt="PNG"):
+    """
+    表示用の画像データ。指定幅・形式の縮小版 → 原寸 → プレースホルダーの順で返す。
+    st.image は PNG/JPEG 以外を再エンコードするため、画面表示には PNG を使う。
+    """
+    asset = get_manifest().get(type_id)
+    if asset is None:
+        return _placeholder
+    return asset.variants.get((width, fmt), asset.data)
@@ -0,0 +1,274 @@
+"""
+同時セッションの負荷試験
+
+1つのプロセスの中で N 個のヘッドレスセッション (AppTest) をスレッドで同時に動かし、
+本物の app.py を「フォーム入力 → 送信」「図鑑タブ → エキスパンダーを開く」などの
+シナリオで繰り返し再実行させる。プロセス内のキャッシュやロックは本番の1レプリカと
+同じく全セッションで共有される。外部サービスは使わない。
+
+    python benchmarks/loadtest.py --users 20 --duration 60
+    python benchmarks/loadtest.py --users 50 --mix submit=6,catalog=3,full=1 --output load.json
+
+再実行ごとのレイテンシ (p50 / p95 / p99)、スループット (再実行/秒)、
+RSS（開始時・最大・1セッションあたりの増分）を表示する。
+--tracemalloc を付けると、ウォームアップ後を基準に tracemalloc で数えた
+1セッションあたりのバイト数と、増加の多い確保箇所も出す（計測自体が遅くなる）。
+"""
+import argparse
+import collections
+import datetime
+import json
+import os
+import random
+import statistics
+import sys
+import threading
+import time
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+ROOT_DIR = os.path.dirname(BENCH_DIR)
+sys.path.insert(0, ROOT_DIR)
+
+# 負荷試験のトラフィックを本番の診断イベントとして記録しない
+os.environ.setdefault("FATE_EVENT_LOG", "0")
+
+APP_PATH = os.path.join(ROOT_DIR, "app.py")
+QUANTILES = (0.5, 0.95, 0.99)
+DEFAULT_MIX = "submit=6,catalog=3,full=1"
+
+
+# ==========================================
+# 1. Memory
+# ==========================================
+def rss_bytes():
+    """現在の RSS（/proc が無い環境では ru_maxrss で代用）"""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, IndexError):
+        import resource
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+
+
+class RssSampler(threading.Thread):
+    """一定間隔で RSS を測り、最大値を記録する"""
+
+    def __init__(self, interval=0.2):
+        super().__init__(daemon=True)
+        self.interval = interval
+        self.peak = rss_bytes()
+        self._stop_event = threading.Event()
+
+    def run(self):
+        while not self._stop_event.wait(self.interval):
+            self.peak = max(self.peak, rss_bytes())
+
+    def stop(self):
+        self._stop_event.set()
+        self.join()
+
+
+# ==========================================
+# 2. Scenarios
+# ==========================================
+class Recorder:
+    """ステップ名ごとの再実行レイテンシ（全スレッドで共有）"""
+
+    def __init__(self):
+        self.samples = collections.defaultdict(list)
+        self.errors = collections.Counter()
+        self._lock = threading.Lock()
+
+    def rerun(self, at, step):
+        t = time.perf_counter()
+        at.run()
+        elapsed = time.perf_counter() - t
+        with self._lock:
+            self.samples[step].append(elapsed)
+            if at.exception:
+                self.errors[step] += 1
+
+
+def _random_inputs(rng):
+    dob = datetime.date(1950, 1, 1) + datetime.timedelta(days=rng.randrange(365 * 60))
+    return f"負荷{rng.randrange(1000)}", dob.strftime("%Y%m%d"), [rng.randint(1, 7) for _ in range(10)]
+
+
+def scenario_submit(at, rec, rng):
+    """診断フォームに入力して送信する"""
+    name, dob, answers = _random_inputs(rng)
+    at.text_input[0].input(name)
+    at.text_input[1].input(dob)
+    for slider, value in zip(at.slider, answers):
+        slider.set_value(value)
+    at.button[0].click()
+    rec.rerun(at, "submit")
+
+
+def scenario_catalog(at, rec, rng):
+    """図鑑タブを開き、ランダムに2〜3タイプを展開する"""
+    at.session_state["main_tabs"] = "全タイプ図鑑"
+    rec.rerun(at, "catalog_tab")
+    opened = rng.sample(range(10), rng.randint(2, 3))
+    for i in opened:
+        at.session_state[f"catalog_{i}"] = True
+        rec.rerun(at, "catalog_expand")
+    for i in opened:
+        at.session_state[f"catalog_{i}"] = False
+    at.session_state["main_tabs"] = "運命を診断する"
+    rec.rerun(at, "diagnosis_tab")
+
+
+def scenario_full(at, rec, rng):
+    """送信してから図鑑も見る"""
+    scenario_submit(at, rec, rng)
+    scenario_catalog(at, rec, rng)
+
+
+SCENARIOS = {"submit": scenario_submit, "catalog": scenario_catalog, "full": scenario_full}
+
+
+def parse_mix(text):
+    """"submit=6,catalog=3" → ([名前], [重み])（--mix の type= として使う）"""
+    names, weights = [], []
+    for part in text.split(","):
+        name, _, weight = part.partition("=")
+        if name not in SCENARIOS:
+            raise argparse.ArgumentTypeError(f"未知のシナリオです: {name}（{', '.join(SCENARIOS)}）")
+        try:
+            weight = float(weight or 1)
+        except ValueError:
+            raise argparse.ArgumentTypeError(f"重みは数値で指定してください: {part}") from None
+        if weight < 0:
+            raise argparse.ArgumentTypeError(f"重みは0以上で指定してください: {part}")
+        names.append(name)
+        weights.append(weight)
+    if not sum(weights):
+        raise argparse.ArgumentTypeError(f"重みがすべて0です: {text}")
+    return names, weights
+
+
+def format_mix(mix):
+    return ",".join(f"{name}={weight:g}" for name, weight in zip(*mix))
+
+
+# ==========================================
+# 3. Runner
+# ==========================================
+def virtual_user(index, args, mix, rec, deadline, started, sessions):
+    """1セッション分のループ。deadline は開始の合図と同時に決まるので [秒] のリストで受け取る"""
+    from streamlit.testing.v1 import AppTest
+
+    rng = random.Random(args.seed + index)
+    at = AppTest.from_file(APP_PATH, default_timeout=args.timeout)
+    # メモリを計り終えるまでセッションを生かしておく
+    sessions.append(at)
+    rec.rerun(at, "initial")
+    started.wait()
+    iterations = 0
+    while time.perf_counter() < deadline[0] and (not args.iterations or iterations < args.iterations):
+        SCENARIOS[rng.choices(*mix)[0]](at, rec, rng)
+        iterations += 1
+        if args.think_time:
+            time.sleep(rng.uniform(0, 2 * args.think_time))
+
+
+def _quantiles(samples):
+    ordered = sorted(samples)
+    return {f"p{int(q * 100)}": ordered[min(len(ordered) - 1, int(q * len(ordered)))] for q in QUANTILES}
+
+
+def run(args):
+    mix = args.mix
+    # import とウォームアップを1度済ませてから計測を始める
+    from streamlit.testing.v1 import AppTest
+    AppTest.from_file(APP_PATH, default_timeout=args.timeout).run()
+    if args.tracemalloc:
+        import instrumentation
+        instrumentation.start_memory_tracing()
+
+    rec = Recorder()
+    rss_start = rss_bytes()
+    sampler = RssSampler()
+    sampler.start()
+    started = threading.Event()
+    deadline = [float("inf")]
+    sessions = []
+    threads = [
+        threading.Thread(target=virtual_user, args=(i, args, mix, rec, deadline, started, sessions))
+        for i in range(args.users)
+    ]
+    for t in threads:
+        t.start()
+    # 全セッションの初回描画が終わるのを待ってから一斉に開始する
+    while sum(len(v) for v in rec.samples.values()) < args.users and any(t.is_alive() for t in threads):
+        time.sleep(0.05)
+    rss_sessions = rss_bytes()
+    deadline[0] = time.perf_counter() + args.duration
+    t0 = time.perf_counter()
+    started.set()
+    for t in threads:
+        t.join()
+    wall = time.perf_counter() - t0
+    sampler.stop()
+    memory = None
+    if args.tracemalloc:
+        memory = instrumentation.memory_report(sessions=len(sessions))
+
+    measured = {step: s for step, s in rec.samples.items() if step != "initial"}
+    all_samples = [x for s in measured.values() for x in s]
+    return {
+        "created_at": datetime.datetime.now().isoformat(timespec="seconds"),
+        "users": args.users,
+        "mix": format_mix(mix),
+        "duration_seconds": round(wall, 3),
+        "reruns": len(all_samples),
+        "throughput_rps": round(len(all_samples) / wall, 3) if wall else 0.0,
+        "errors": dict(rec.errors),
+        "latency": {
+            "all": _quantiles(all_samples) if all_samples else {},
+            **{step: {**_quantiles(s), "count": len(s), "mean": statistics.fmean(s)} for step, s in measured.items()},
+            "initial": _quantiles(rec.samples["initial"]) if rec.samples["initial"] else {},
+        },
+        "rss": {
+            "start_mb": round(rss_start / 2**20, 1),
+            "after_sessions_mb": round(rss_sessions / 2**20, 1),
+            "peak_mb": round(sampler.peak / 2**20, 1),
+            "per_session_mb": round((sampler.peak - rss_start) / 2**20 / max(args.users, 1), 2),
+        },
+        "tracemalloc": memory,
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="app.py の同時セッション負荷試験")
+    parser.add_argument("--users", type=int, default=10, help="同時セッション数 (既定: 10)")
+    parser.add_argument("--duration", type=float, default=30.0, help="計測時間（秒, 既定: 30）")
+    parser.add_argument("--iterations", type=int, default=0, help="1セッションあたりのシナリオ回数の上限 (0 で無制限)")
+    parser.add_argument("--mix", type=parse_mix, default=DEFAULT_MIX, help=f"シナリオの重み (既定: {DEFAULT_MIX})")
+    parser.add_argument("--think-time", type=float, default=0.0, help="シナリオ間の平均待ち時間（秒）")
+    parser.add_argument("--timeout", type=float, default=120.0, help="1回の再実行のタイムアウト（秒）")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--tracemalloc", action="store_true", help="tracemalloc でセッションあたりのバイト数を数える")
+    parser.add_argument("--output", help="結果を JSON で書き出すパス")
+    args = parser.parse_args(argv)
+
+    report = run(args)
+    print(f"users {report['users']}  reruns {report['reruns']}  "
+          f"throughput {report['throughput_rps']:.2f} rerun/s  errors {sum(report['errors'].values())}")
+    for step, q in report["latency"].items():
+        if q:
+            print(f"  {step:16s} " + "  ".join(f"{k} {v * 1000:8.1f} ms" for k, v in q.items() if k.startswith("p")))
+    rss = report["rss"]
+    print(f"  RSS start {rss['start_mb']} MB  peak {rss['peak_mb']} MB  per session {rss['per_session_mb']} MB")
+    if report["tracemalloc"] is not None:
+        import instrumentation
+        print(instrumentation.format_memory_report(report["tracemalloc"]))
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+    return 1 if report["errors"] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,167 @@
+"""
+ベンチマークスイート
+
+エンジン・スコアリングのマイクロベンチマークと、Streamlit の AppTest を使った
+ヘッドレスでの再実行（診断送信・図鑑タブ）のエンドツーエンド計測を行い、
+結果を JSON に書き出して baseline.json と比較する。
+
+    python benchmarks/run_benchmarks.py                 # 計測して baseline と比較
+    python benchmarks/run_benchmarks.py --update-baseline
+    python benchmarks/run_benchmarks.py --only micro    # マイクロベンチマークのみ
+
+各ベンチマークは「1回あたりの秒数」の中央値で比較し、baseline より threshold
+（既定 25%）以上遅くなったものがあれば終了コード 1 を返す。数値はマシンに依存するため、
+baseline は比較に使うのと同じ環境で取り直すこと。
+"""
+import argparse
+import datetime
+import json
+import os
+import platform
+import statistics
+import sys
+import time
+import timeit
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+ROOT_DIR = os.path.dirname(BENCH_DIR)
+sys.path.insert(0, ROOT_DIR)
+
+# ベンチマークの送信を本番の診断イベントとして記録しない（書き出しスレッドも計測に混ぜない）
+os.environ.setdefault("FATE_EVENT_LOG", "0")
+
+APP_PATH = os.path.join(ROOT_DIR, "app.py")
+BASELINE_PATH = os.path.join(BENCH_DIR, "baseline.json")
+DEFAULT_OUTPUT = os.path.join(BENCH_DIR, "latest.json")
+
+SAMPLE_DATE = datetime.date(1997, 3, 24)
+SAMPLE_ANSWERS = {"Q1": 5, "Q2": 3, "Q3": 6, "Q4": 2, "Q5": 7, "Q6": 3, "Q7": 5, "Q8": 2, "Q9": 4, "Q10": 1}
+
+
+# ==========================================
+# 1. Micro Benchmarks
+# ==========================================
+def _time_per_call(func, repeat=7):
+    """timeit で1回あたりの秒数を repeat 回測り、中央値と最小値を返す"""
+    timer = timeit.Timer(func)
+    number, _ = timer.autorange()  # 1回の計測が 0.2 秒以上になるループ数
+    samples = [t / number for t in timer.repeat(repeat=repeat, number=number)]
+    return {"median": statistics.median(samples), "min": min(samples), "runs": repeat, "loops": number}
+
+
+def micro_benchmarks():
+    from fortune_engine import FortuneEngineIntegrated, calculate_big5, get_fortune_table
+
+    engine = FortuneEngineIntegrated()
+    table = get_fortune_table()
+    return {
+        "engine.analyze_basic": _time_per_call(lambda: engine.analyze_basic("1997/03/24")),
+        "engine.get_month_pillar": _time_per_call(lambda: engine.get_month_pillar(1997, 3, 24)),
+        "table.analyze_date": _time_per_call(lambda: table.analyze_date(SAMPLE_DATE)),
+        "calculate_big5": _time_per_call(lambda: calculate_big5(SAMPLE_ANSWERS)),
+    }
+
+
+# ==========================================
+# 2. End-to-End Reruns (AppTest)
+# ==========================================
+def _time_reruns(prepare, at, repeat):
+    samples = []
+    for _ in range(repeat):
+        prepare(at)
+        t = time.perf_counter()
+        at.run()
+        samples.append(time.perf_counter() - t)
+        if at.exception:
+            raise RuntimeError(f"app.py raised: {at.exception[0].value}")
+    return {"median": statistics.median(samples), "min": min(samples), "runs": repeat, "loops": 1}
+
+
+def e2e_benchmarks(repeat=5):
+    from streamlit.testing.v1 import AppTest
+
+    def new_app():
+        at = AppTest.from_file(APP_PATH, default_timeout=120)
+        at.run()  # import とウォームアップは計測に含めない
+        return at
+
+    def submit(at):
+        at.text_input[0].input("ベンチ")
+        at.text_input[1].input(SAMPLE_DATE.strftime("%Y%m%d"))
+        at.button[0].click()
+
+    def open_catalog(at):
+        at.session_state["main_tabs"] = "全タイプ図鑑"
+        for i in range(10):
+            at.session_state[f"catalog_{i}"] = True
+
+    return {
+        "e2e.initial_rerun": _time_reruns(lambda at: None, new_app(), repeat),
+        "e2e.diagnosis_submit": _time_reruns(submit, new_app(), repeat),
+        "e2e.catalog_all_open": _time_reruns(open_catalog, new_app(), repeat),
+    }
+
+
+# ==========================================
+# 3. Baseline Comparison
+# ==========================================
+def compare(results, baseline, threshold):
+    """baseline と共通のベンチマークだけを比較し、(名前, 比率, 回帰か) のリストを返す"""
+    rows = []
+    for name, current in results.items():
+        base = baseline.get(name)
+        if not base:
+            continue
+        ratio = current["median"] / base["median"]
+        rows.append((name, ratio, ratio > 1 + threshold))
+    return rows
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="エンジン・スコアリング・ページ描画のベンチマーク")
+    parser.add_argument("--only", choices=("micro", "e2e"), help="片方だけ実行する")
+    parser.add_argument("--output", default=DEFAULT_OUTPUT, help="結果の JSON (既定: benchmarks/latest.json)")
+    parser.add_argument("--baseline", default=BASELINE_PATH)
+    parser.add_argument("--threshold", type=float, default=0.25, help="回帰とみなす遅延の割合 (既定: 0.25)")
+    parser.add_argument("--update-baseline", action="store_true", help="今回の結果で baseline を上書きする")
+    parser.add_argument("--repeat", type=int, default=5, help="エンドツーエンド計測の回数")
+    args = parser.parse_args(argv)
+
+    results = {}
+    if args.only in (None, "micro"):
+        results.update(micro_benchmarks())
+    if args.only in (None, "e2e"):
+        results.update(e2e_benchmarks(args.repeat))
+
+    report = {
+        "created_at": datetime.datetime.now().isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "machine": platform.machine(),
+        "benchmarks": results,
+    }
+    with open(args.output, "w", encoding="utf-8") as f:
+        json.dump(report, f, ensure_ascii=False, indent=2)
+
+    for name, r in results.items():
+        print(f"{name:28s} median {r['median'] * 1e6:14.2f} us   min {r['min'] * 1e6:14.2f} us")
+
+    if args.update_baseline:
+        with open(args.baseline, "w", encoding="utf-8") as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+        print(f"baseline updated: {args.baseline}")
+        return 0
+
+    if not os.path.exists(args.baseline):
+        print("baseline がありません（--update-baseline で作成）")
+        return 0
+    with open(args.baseline, encoding="utf-8") as f:
+        baseline = json.load(f)["benchmarks"]
+    regressions = 0
+    for name, ratio, regressed in compare(results, baseline, args.threshold):
+        regressions += regressed
+        print(f"{'REGRESSION' if regressed else 'ok':10s} {name:28s} x{ratio:.2f}")
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,140 @@
+"""
+診断コンテンツのコンテンツパック
+
+タイプ別の文章・TIPI質問・FATE Code の意味・相性表を content/content_pack.json に切り出し、
+プロセス内で1度だけ読み込んでスキーマを検証する。Streamlit の再実行ごとに巨大な dict
+リテラルを評価し直さないためと、コピーライターが app.py を触らずに文章を更新できるようにするため。
+各タイプのレコードは初めて要求されたときに読み取り専用（MappingProxyType + tuple）に変換して渡す。
+"""
+import json
+import os
+import threading
+import types
+
+CONTENT_PACK_PATH = os.environ.get(
+    "FATE_CONTENT_PACK", os.path.join(os.path.dirname(os.path.abspath(__file__)), "content", "content_pack.json")
+)
+SCHEMA_VERSION = 1
+TYPE_COUNT = 10
+
+TYPE_FIELDS = {
+    "name": str, "color": str, "catch": str, "phrases": list, "fate_code_type": str,
+    "default_scores": dict, "intro": str, "social_style": str, "inner_drive": str,
+    "shadow_phase": str, "trivia": list, "impression_good": list, "impression_bad": list,
+    "golden_rule_long": str,
+}
+SCORE_KEYS = ("Identity", "Create", "Economy", "Status", "Vitality")
+
+
+class ContentPackError(ValueError):
+    """コンテンツパックの形式が不正"""
+
+
+# ==========================================
+# 1. Validation
+# ==========================================
+def _require(cond, message):
+    if not cond:
+        raise ContentPackError(message)
+
+
+def validate_pack(pack):
+    """スキーマを検証する。問題があれば ContentPackError"""
+    _require(isinstance(pack, dict), "コンテンツパックのルートはオブジェクトである必要があります")
+    _require(pack.get("schema_version") == SCHEMA_VERSION,
+             f"schema_version は {SCHEMA_VERSION} である必要があります: {pack.get('schema_version')!r}")
+    _require(isinstance(pack.get("version"), str), "version (文字列) がありません")
+    _require(isinstance(pack.get("common_cta"), str), "common_cta (文字列) がありません")
+
+    questions = pack.get("tipi_questions")
+    _require(isinstance(questions, dict) and list(questions) == [f"Q{i}" for i in range(1, 11)],
+             "tipi_questions は Q1〜Q10 を順に持つ必要があります")
+    meanings = pack.get("fate_meanings")
+    _require(isinstance(meanings, dict) and set(meanings) == set("LSRGIDMY"),
+             "fate_meanings は L/S/R/G/I/D/M/Y の8文字を持つ必要があります")
+
+    type_map = pack.get("types")
+    compat = pack.get("compatibility_map")
+    expected_keys = [str(i) for i in range(TYPE_COUNT)]
+    _require(isinstance(type_map, dict) and sorted(type_map, key=int) == expected_keys,
+             f"types は 0〜{TYPE_COUNT - 1} のキーを持つ必要があります")
+    _require(isinstance(compat, dict) and sorted(compat, key=int) == expected_keys,
+             f"compatibility_map は 0〜{TYPE_COUNT - 1} のキーを持つ必要があります")
+
+    for key, record in type_map.items():
+        _require(isinstance(record, dict), f"types[{key}] はオブジェクトである必要があります")
+        for field, field_type in TYPE_FIELDS.items():
+            _require(isinstance(record.get(field), field_type),
+                     f"types[{key}].{field} は {field_type.__name__} である必要があります")
+        scores = record["default_scores"]
+        _require(set(scores) == set(SCORE_KEYS) and all(isinstance(v, int) and 1 <= v <= 5 for v in scores.values()),
+                 f"types[{key}].default_scores は5項目 (1〜5の整数) である必要があります")
+        _require(len(record["fate_code_type"]) == 4 and all(c in meanings for c in record["fate_code_type"]),
+                 f"types[{key}].fate_code_type が不正です: {record['fate_code_type']!r}")
+    for key, partners in compat.items():
+        _require(isinstance(partners, list) and all(isinstance(p, str) for p in partners),
+                 f"compatibility_map[{key}] は文字列のリストである必要があります")
+    return pack
+
+
+# ==========================================
+# 2. Immutable Records
+# ==========================================
+def _freeze(value):
+    if isinstance(value, dict):
+        return types.MappingProxyType({k: _freeze(v) for k, v in value.items()})
+    if isinstance(value, list):
+        return tuple(_freeze(v) for v in value)
+    return value
+
+
+class ContentPack:
+    """読み込み済みのコンテンツパック。タイプ別レコードは要求時に読み取り専用化してキャッシュする"""
+
+    def __init__(self, pack):
+        self.version = pack["version"]
+        self._types = pack["types"]
+        self._records = {}
+        self._lock = threading.Lock()
+        self.common_cta = pack["common_cta"]
+        self.tipi_questions = _freeze(pack["tipi_questions"])
+        self.fate_meanings = _freeze(pack["fate_meanings"])
+        self.compatibility_map = types.MappingProxyType(
+            {int(k): _freeze(v) for k, v in pack["compatibility_map"].items()}
+        )
+
+    def get_type(self, type_id):
+        """タイプ(0始まり)のレコード。'gan' と共通の 'cta_text' を補って返す"""
+        record = self._records.get(type_id)
+        if record is None:
+            raw = dict(self._types[str(type_id)])
+            raw.setdefault("cta_text", self.common_cta)
+            raw["gan"] = type_id
+            record = _freeze(raw)
+            with self._lock:
+                record = self._records.setdefault(type_id, record)
+        return record
+
+    def type_ids(self):
+        return range(TYPE_COUNT)
+
+
+def load_content_pack(path=CONTENT_PACK_PATH):
+    """ファイルを読み込んで検証済みの ContentPack を返す（キャッシュしない）"""
+    with open(path, encoding="utf-8") as f:
+        pack = json.load(f)
+    return ContentPack(validate_pack(pack))
+
+
+_pack = None
+_pack_lock = threading.Lock()
+
+
+def get_content_pack():
+    """プロセス内で共有するコンテンツパック（初回呼び出し時に1度だけ読み込む）"""
+    global _pack
+    if _pack is None:
+        with _pack_lock:
+            if _pack is None:
+                _pack = load_content_pack()
+    return _pack
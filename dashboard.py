@@ -0,0 +1,68 @@
+"""
+タイプ・FATE Code の分布ダッシュボード（社内向け）
+
+population.py の事前集計を読み込んで、生まれ年・生まれ月・年齢帯で切り分けて表示する。
+画面操作のたびに行うのは集計済み配列の足し算だけで、エンジンは回さない。
+
+    streamlit run dashboard.py
+"""
+import datetime
+
+import pandas as pd
+import streamlit as st
+
+from content_pack import get_content_pack
+from fortune_engine import FATE_CODES
+from population import get_population
+
+st.set_page_config(page_title="分布ダッシュボード | 裏・ステータス診断", layout="wide")
+
+
+@st.cache_resource
+def type_labels():
+    pack = get_content_pack()
+    return [f"{i + 1}: {pack.get_type(i)['name']}" for i in pack.type_ids()]
+
+
+population = get_population()
+this_year = datetime.date.today().year
+
+st.title("タイプ・FATE Code 分布")
+st.caption(f"{population.start_year}〜{population.end_year}年の全日付を1日1人として数えた分布です")
+
+with st.sidebar:
+    years = st.slider("生まれ年", population.start_year, population.end_year,
+                      (max(population.start_year, this_year - 80), min(population.end_year, this_year)))
+    months = st.multiselect("生まれ月", list(range(1, 13)), format_func=lambda m: f"{m}月")
+    axis = st.radio("切り口", ["生まれ年", "生まれ月", "年齢帯"], horizontal=True)
+    measure = st.radio("集計対象", ["タイプ", "FATE Code"], horizontal=True)
+    as_share = st.toggle("割合で表示", value=True)
+
+columns = type_labels() if measure == "タイプ" else list(FATE_CODES)
+pick = 0 if measure == "タイプ" else 1
+
+if axis == "生まれ年":
+    matrix = population.by_year(years, months)[pick]
+    index = list(range(years[0], years[0] + len(matrix)))
+elif axis == "生まれ月":
+    matrix = population.by_month(years)[pick]
+    index = [f"{m}月" for m in range(1, 13)]
+else:
+    # 年齢帯は今年を基準に生まれ年を決めるので、生まれ年の指定は使わない
+    bands = population.by_age_band(this_year, months)
+    axis_sum = 1 if measure == "タイプ" else 0
+    matrix = [counts.sum(axis=axis_sum) for counts in bands.values()]
+    index = list(bands)
+
+frame = pd.DataFrame(matrix, index=index, columns=columns)
+if as_share:
+    frame = frame.div(frame.sum(axis=1).where(lambda s: s > 0), axis=0) * 100
+
+total = population.counts(years, months if axis != "生まれ月" else None)
+st.metric("対象の日数", f"{int(total.sum()):,}")
+st.bar_chart(frame, height=420)
+st.dataframe(frame.round(2) if as_share else frame, use_container_width=True)
+
+st.markdown("#### タイプ × FATE Code")
+cross = pd.DataFrame(total, index=type_labels(), columns=list(FATE_CODES))
+st.dataframe(cross, use_container_width=True)
@@ -0,0 +1,229 @@
+"""
+診断イベントのログ（Parquet への非同期書き出し）
+
+フォーム送信ごとにエンジンの結果・Big Five・所要時間を1件のイベントとして記録する。
+名前と生年月日はそのまま残さず、HMAC-SHA256 のハッシュ（と生まれ年）だけを持つ。
+再実行側は上限付きのキューに入れるだけで I/O を待たない。バックグラウンドのスレッドが
+まとめて Parquet に書き、行数か経過時間でファイルを切り替える。
+キューが一杯のときはイベントを捨てて dropped を数える。
+
+既定では記録しない。有効にするにはハッシュの鍵も必要で、鍵が無ければ警告を出して無効のままにする
+（生まれ年が分かれば生年月日の候補は365通りしかないので、鍵は全レプリカ共通の秘密の値にすること）。
+
+    FATE_EVENT_LOG=1         有効にする
+    FATE_EVENT_SALT=...      ハッシュの鍵（必須。同じ鍵なら再起動やレプリカをまたいで突き合わせられる）
+    FATE_EVENT_DIR=events    出力先（相対パスはアプリのディレクトリ基準）
+"""
+import atexit
+import datetime
+import hashlib
+import hmac
+import logging
+import os
+import queue
+import threading
+import time
+
+logger = logging.getLogger("fate.events")
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+EVENT_DIR = os.path.join(BASE_DIR, os.environ.get("FATE_EVENT_DIR", "events"))
+QUEUE_SIZE = int(os.environ.get("FATE_EVENT_QUEUE", "10000"))
+BATCH_SIZE = 1000
+FLUSH_SECONDS = 5.0
+ROTATE_ROWS = int(os.environ.get("FATE_EVENT_ROTATE_ROWS", "100000"))
+ROTATE_SECONDS = int(os.environ.get("FATE_EVENT_ROTATE_SECONDS", "3600"))
+
+_SALT = os.environ.get("FATE_EVENT_SALT", "").encode("utf-8")
+ENABLED = os.environ.get("FATE_EVENT_LOG", "0") != "0"
+if ENABLED and not _SALT:
+    logger.warning("FATE_EVENT_SALT が未設定のため、診断イベントは記録しません")
+    ENABLED = False
+
+TIPI_KEYS = tuple(f"Q{i}" for i in range(1, 11))
+SCORE_KEYS = ("Identity", "Create", "Economy", "Status", "Vitality")
+BIG5_KEYS = ("Extraversion", "Agreeableness", "Conscientiousness", "Neuroticism", "Openness")
+
+
+def hash_value(value):
+    """個人を特定できる入力の代わりに残すハッシュ（16進32文字）"""
+    return hmac.new(_SALT, value.encode("utf-8"), hashlib.sha256).hexdigest()[:32]
+
+
+def _schema():
+    import pyarrow as pa
+    return pa.schema(
+        [
+            ("ts", pa.timestamp("ms", tz="UTC")),
+            ("name_hash", pa.string()),
+            ("dob_hash", pa.string()),
+            ("birth_year", pa.int16()),
+            ("type_id", pa.int8()),
+            ("fate_code", pa.string()),
+        ]
+        + [(key, pa.int8()) for key in SCORE_KEYS]
+        + [(key, pa.float32()) for key in BIG5_KEYS]
+        + [(key, pa.int8()) for key in TIPI_KEYS]
+        + [
+            ("diagnose_ms", pa.float32()),
+            ("render_ms", pa.float32()),
+            ("content_version", pa.string()),
+            ("engine_version", pa.int16()),
+        ]
+    )
+
+
+def diagnosis_event(user_name, date_obj, answers, diagnosis, diagnose_seconds, render_seconds,
+                    content_version, engine_version):
+    """app.py の1回の診断を1行分の dict にする（名前・生年月日はハッシュ化）"""
+    result = diagnosis["result"]
+    event = {
+        "ts": datetime.datetime.now(datetime.timezone.utc),
+        "name_hash": hash_value(user_name) if user_name else None,
+        "dob_hash": hash_value(date_obj.isoformat()),
+        "birth_year": date_obj.year,
+        "type_id": result["gan"] + 1,
+        "fate_code": result["fate_code"],
+        "diagnose_ms": diagnose_seconds * 1000,
+        "render_ms": render_seconds * 1000,
+        "content_version": content_version,
+        "engine_version": engine_version,
+    }
+    event.update(result["scores"])
+    event.update(diagnosis["big5_norm"])
+    event.update({key: int(answers[key]) for key in TIPI_KEYS})
+    return event
+
+
+# ==========================================
+# 1. Sink
+# ==========================================
+class EventSink:
+    """上限付きキュー + バックグラウンドの Parquet 書き出しスレッド"""
+
+    def __init__(self, directory=EVENT_DIR, queue_size=QUEUE_SIZE):
+        self.directory = directory
+        self.emitted = 0
+        self.written = 0
+        self.dropped = 0
+        self.files = 0
+        self._queue = queue.Queue(maxsize=queue_size)
+        self._count_lock = threading.Lock()
+        self._stop = threading.Event()
+        self._writer = None
+        self._path = None
+        self._opened_at = 0.0
+        self._rows_in_file = 0
+        self._thread = threading.Thread(target=self._run, name="fate-event-writer", daemon=True)
+        self._thread.start()
+
+    def emit(self, event):
+        """イベントをキューに入れる。一杯なら捨てて False（呼び出し側は待たない）"""
+        try:
+            self._queue.put_nowait(event)
+        except queue.Full:
+            with self._count_lock:
+                self.dropped += 1
+            return False
+        with self._count_lock:
+            self.emitted += 1
+        return True
+
+    def stats(self):
+        return {
+            "emitted": self.emitted,
+            "written": self.written,
+            "dropped": self.dropped,
+            "queued": self._queue.qsize(),
+            "files": self.files,
+        }
+
+    def close(self, timeout=10.0):
+        """残りを書き出してファイルを閉じる"""
+        self._stop.set()
+        self._thread.join(timeout)
+
+    # --- writer thread ---
+    def _run(self):
+        batch = []
+        deadline = time.monotonic() + FLUSH_SECONDS
+        while not (self._stop.is_set() and self._queue.empty()):
+            try:
+                batch.append(self._queue.get(timeout=max(0.0, min(1.0, deadline - time.monotonic()))))
+            except queue.Empty:
+                pass
+            if len(batch) >= BATCH_SIZE or (batch and time.monotonic() >= deadline) or self._stop.is_set():
+                self._write(batch)
+                batch = []
+            if time.monotonic() >= deadline:
+                deadline = time.monotonic() + FLUSH_SECONDS
+                if self._writer is not None and time.time() - self._opened_at >= ROTATE_SECONDS:
+                    self._rotate()
+        self._write(batch)
+        self._rotate()
+
+    def _write(self, batch):
+        if not batch:
+            return
+        try:
+            import pyarrow as pa
+            if self._writer is None:
+                self._open()
+            table = pa.Table.from_pylist(batch, schema=self._writer.schema)
+            self._writer.write_table(table)
+            self.written += len(batch)
+            self._rows_in_file += len(batch)
+            if self._rows_in_file >= ROTATE_ROWS:
+                self._rotate()
+        except Exception:
+            # 書き出しの失敗でアプリを止めない。失った件数は dropped に数える
+            with self._count_lock:
+                self.dropped += len(batch)
+            logger.exception("イベントを書き出せませんでした (%d 件)", len(batch))
+
+    def _open(self):
+        import pyarrow.parquet as pq
+        os.makedirs(self.directory, exist_ok=True)
+        name = time.strftime("events-%Y%m%d-%H%M%S") + f"-{os.getpid()}-{self.files:04d}.parquet"
+        self._path = os.path.join(self.directory, name)
+        # 書き込み中は .tmp にしておき、フッターを書いて閉じてから正式な名前にする
+        self._writer = pq.ParquetWriter(self._path + ".tmp", _schema(), compression="zstd")
+        self._opened_at = time.time()
+        self._rows_in_file = 0
+
+    def _rotate(self):
+        if self._writer is None:
+            return
+        self._writer.close()
+        os.replace(self._path + ".tmp", self._path)
+        self.files += 1
+        logger.info("event file closed: %s (%d rows)", self._path, self._rows_in_file)
+        self._writer = None
+
+
+_sink = None
+_sink_lock = threading.Lock()
+
+
+def get_sink():
+    """プロセス内で共有するシンク。無効化されていれば None"""
+    global _sink
+    if not ENABLED:
+        return None
+    if _sink is None:
+        with _sink_lock:
+            if _sink is None:
+                _sink = EventSink()
+                atexit.register(_sink.close)
+    return _sink
+
+
+def emit(event):
+    sink = get_sink()
+    if sink is not None:
+        sink.emit(event)
+
+
+def stats():
+    sink = _sink
+    return sink.stats() if sink is not None else {}
@@ -0,0 +1,256 @@
+"""
+大量データ向けの一括スコアリング
+
+保存済みの (生年月日, TIPI回答) を行ごとにループせず、NumPy 配列のまま一括で処理する。
+運命側は fortune_engine の参照テーブルを日付の序数でまとめて引き、出生時刻があれば
+エンジンと同じ時柱の表 (HOUR_COUNT_DELTA) と fate_code_index で配列のまま補正する。
+Big Five 側は calculate_big5 と同じ式を配列演算で計算する（規準があれば同じ表を配列で引く）。
+
+CLI:
+    python fortune_batch.py input.csv output.parquet --dob-column dob --chunksize 200000
+"""
+import argparse
+import os
+import sys
+
+import numpy as np
+import pandas as pd
+
+from fortune_engine import (
+    COUNT_COLUMNS, FATE_CODES, FLAG_ENERGY_HIGH, FLAG_TERM_DAY, HOUR_COUNT_DELTA, HOUR_ZHI, SCORE_KEYS, SCORE_OF_COUNT,
+    fate_code_index, get_engine, get_fortune_table,
+)
+from norms import get_norms
+
+TIPI_KEYS = tuple(f"Q{i}" for i in range(1, 11))
+BIG5_KEYS = ("Extraversion", "Agreeableness", "Conscientiousness", "Neuroticism", "Openness")
+
+# 素点(2〜14) → 1-5段階。calculate_big5 の round() と完全に同じ値を表引きで返す
+_BIG5_NORM_LUT = np.array([round(1 + (v - 2) * 4 / 12, 1) for v in range(15)])
+_FATE_CODE_LUT = np.array(FATE_CODES + ("",))
+_HOUR_ZHI = np.array(HOUR_ZHI, dtype=np.intp)
+_HOUR_COUNT_DELTA = np.array(HOUR_COUNT_DELTA, dtype=np.int16)
+_SCORE_OF_COUNT = np.array(SCORE_OF_COUNT, dtype=np.int8)
+_INVALID = -1
+
+
+# ==========================================
+# 1. Array API
+# ==========================================
+def to_datetime64(dates):
+    """生年月日の列を datetime64[D] の配列にそろえる（不正な値は NaT）"""
+    if isinstance(dates, np.ndarray) and np.issubdtype(dates.dtype, np.datetime64):
+        return dates.astype("datetime64[D]")
+    s = dates if isinstance(dates, pd.Series) else pd.Series(dates)
+    if pd.api.types.is_datetime64_any_dtype(s):
+        return s.to_numpy(dtype="datetime64[D]")
+    if pd.api.types.is_numeric_dtype(s):
+        s = s.astype("Int64")
+    # "19970324" / "1997/03/24" / "1997-03-24" をすべて8桁に正規化してから解釈する
+    digits = s.astype(str).str.replace(r"\D", "", regex=True)
+    parsed = pd.to_datetime(digits, format="%Y%m%d", errors="coerce")
+    return parsed.to_numpy(dtype="datetime64[D]")
+
+
+def to_minutes(times):
+    """
+    出生時刻の列 ("0830" / "08:30" / 830) を 0時からの経過分の float 配列にする（空・不正な値は NaN）
+    """
+    s = times if isinstance(times, pd.Series) else pd.Series(times)
+    if pd.api.types.is_numeric_dtype(s):
+        s = s.astype("Int64").astype(str).str.zfill(4)
+    else:
+        # 数値と文字列の混在（830 と "0830"）は数値だけ4桁に揃える
+        s = s.map(lambda v: f"{int(v):04d}" if isinstance(v, (int, float, np.number)) and v == v else v)
+    digits = s.astype(str).str.strip().str.replace(r"^(\d{1,2})[:：](\d{2})$", lambda m: m[1].zfill(2) + m[2], regex=True)
+    ok = digits.str.fullmatch(r"\d{4}")
+    hour = pd.to_numeric(digits.str[:2].where(ok), errors="coerce")
+    minute = pd.to_numeric(digits.str[2:].where(ok), errors="coerce")
+    valid = (hour < 24) & (minute < 60)
+    return (hour * 60 + minute).where(valid).to_numpy(dtype=np.float64, na_value=np.nan)
+
+
+def analyze_many(dates, minutes=None):
+    """
+    analyze_basic の配列版。
+    戻り値は列名 → 配列の dict（valid, gan, Identity〜Vitality, fate_code）。
+    日付として解釈できない行は valid=False、数値列は -1、fate_code は空文字になる。
+    minutes は出生時刻 (0時からの経過分, 不明は NaN) の配列。指定した行は時柱も数える。
+    """
+    days = to_datetime64(dates)
+    n = len(days)
+    valid = ~np.isnat(days)
+
+    table = get_fortune_table()
+    idx = np.zeros(n, dtype=np.int64)
+    idx[valid] = (days[valid] - np.datetime64(table.start, "D")).astype(np.int64)
+    in_table = valid & (idx >= 0) & (idx < table.days)
+    safe_idx = np.where(in_table, idx, 0)
+
+    result = {"valid": valid}
+    for name in ("gan",) + SCORE_KEYS + ("fate_code",):
+        column = np.frombuffer(table.columns[name], dtype=np.uint8)
+        result[name] = np.where(in_table, column[safe_idx].astype(np.int8), np.int8(_INVALID))
+
+    engine_rows = valid & ~in_table
+    minute = None
+    if minutes is not None:
+        minute = np.asarray(minutes, dtype=np.float64)
+        timed = in_table & ~np.isnan(minute)
+        flags = np.frombuffer(table.columns["flags"], dtype=np.uint8)[safe_idx]
+        # 節入りの当日は時刻で月柱が変わるのでエンジンに回す
+        term = timed & (flags & FLAG_TERM_DAY > 0)
+        engine_rows |= term
+        rows = np.flatnonzero(timed & ~term)
+        if len(rows):
+            zhi = _HOUR_ZHI[(minute[rows] // 60).astype(np.intp)]
+            delta = _HOUR_COUNT_DELTA[result["gan"][rows], zhi]
+            counts = [
+                np.frombuffer(table.columns[name], dtype=np.uint8)[safe_idx[rows]] + delta[:, k]
+                for k, name in enumerate(COUNT_COLUMNS)
+            ]
+            for key, c in zip(SCORE_KEYS, counts):
+                result[key][rows] = _SCORE_OF_COUNT[c]
+            energy_high = (flags[rows] & FLAG_ENERGY_HIGH).astype(np.int16)
+            result["fate_code"][rows] = fate_code_index(counts, energy_high)
+
+    # テーブル範囲外の日付（と出生時刻つきの節入り当日）だけはエンジンで1件ずつ計算する
+    outside = np.flatnonzero(engine_rows)
+    if len(outside):
+        engine = get_engine()
+        code_index = {code: i for i, code in enumerate(FATE_CODES)}
+        for i in outside:
+            m = None if minute is None or np.isnan(minute[i]) else int(minute[i])
+            r = engine.analyze_date(days[i].item(), m)
+            result["gan"][i] = r["gan"]
+            for key in SCORE_KEYS:
+                result[key][i] = r["scores"][key]
+            result["fate_code"][i] = code_index[r["fate_code"]]
+
+    result["fate_code"] = _FATE_CODE_LUT[result["fate_code"]]
+    return result
+
+
+def _answer_columns(answers):
+    """DataFrame / dict / (n, 10) 配列のいずれからも Q1〜Q10 の float 配列を取り出す"""
+    if isinstance(answers, np.ndarray) and answers.ndim == 2:
+        if answers.shape[1] != len(TIPI_KEYS):
+            raise ValueError(f"回答配列の列数は {len(TIPI_KEYS)} である必要があります: {answers.shape}")
+        return {key: answers[:, i].astype(float) for i, key in enumerate(TIPI_KEYS)}
+    return {key: np.asarray(answers[key], dtype=float) for key in TIPI_KEYS}
+
+
+def calculate_big5_many(answers, birth_years=None, use_norms=True):
+    """
+    calculate_big5 の配列版。(scores_raw, scores_norm) をそれぞれ特性名 → 配列の dict で返す。
+    回答が1〜7の整数でない行は raw が -1、norm が NaN になる。
+    birth_years は年齢帯の規準を引くための生まれ年の配列（省略時は全体の規準）。
+    """
+    q = _answer_columns(answers)
+    valid = np.ones(len(q["Q1"]), dtype=bool)
+    for col in q.values():
+        valid &= np.isfinite(col) & (col >= 1) & (col <= 7) & (col == np.round(col))
+    q = {key: np.where(valid, col, 4).astype(np.int16) for key, col in q.items()}
+
+    scores_raw = {
+        "Extraversion": q["Q1"] + (8 - q["Q6"]),
+        "Agreeableness": (8 - q["Q2"]) + q["Q7"],
+        "Conscientiousness": q["Q3"] + (8 - q["Q8"]),
+        "Neuroticism": q["Q4"] + (8 - q["Q9"]),
+        "Openness": q["Q5"] + (8 - q["Q10"])
+    }
+    scores_raw = {k: np.where(valid, v, np.int16(_INVALID)) for k, v in scores_raw.items()}
+    norms = get_norms() if use_norms else None
+    if norms is not None:
+        return scores_raw, norms.score_many(scores_raw, birth_years)
+    scores_norm = {k: np.where(valid, _BIG5_NORM_LUT[v], np.nan) for k, v in scores_raw.items()}
+    return scores_raw, scores_norm
+
+
+def score_frame(df, dob_column="dob", time_column="birth_time"):
+    """DataFrame 1チャンク分に運命・Big Five の結果列を追加して返す（出生時刻の列があれば時柱も使う）"""
+    out = df.copy()
+    minutes = to_minutes(df[time_column]) if time_column in df.columns else None
+    fate = analyze_many(df[dob_column], minutes)
+    for name, values in fate.items():
+        out[name] = values
+    if all(key in df.columns for key in TIPI_KEYS):
+        days = to_datetime64(df[dob_column])
+        birth_years = np.where(np.isnat(days), np.nan, days.astype("datetime64[Y]").astype(np.int64) + 1970)
+        _, big5_norm = calculate_big5_many(df, birth_years)
+        for name in BIG5_KEYS:
+            out[name] = big5_norm[name]
+    return out
+
+
+# ==========================================
+# 2. Chunked CSV / Parquet CLI
+# ==========================================
+def _is_parquet(path):
+    return os.path.splitext(path)[1].lower() in (".parquet", ".pq")
+
+
+def iter_chunks(path, chunksize):
+    """
+    入力ファイルを chunksize 行ずつ DataFrame で読み出す（全体をメモリに載せない）。
+    CSV は列の型をチャンクごとに推測させず、回答 (Q1〜Q10) は float、それ以外はすべて文字列で読む
+    （生年月日・出生時刻の "0830" を数値にしない。Parquet に書くときも全チャンクが同じスキーマになる）
+    """
+    if _is_parquet(path):
+        import pyarrow.parquet as pq
+        for batch in pq.ParquetFile(path).iter_batches(batch_size=chunksize):
+            yield batch.to_pandas()
+    else:
+        columns = pd.read_csv(path, nrows=0).columns
+        dtype = {name: np.float64 if name in TIPI_KEYS else str for name in columns}
+        yield from pd.read_csv(path, chunksize=chunksize, dtype=dtype)
+
+
+class ChunkWriter:
+    """チャンクごとに追記する書き出し先（拡張子で CSV / Parquet を切り替える）"""
+
+    def __init__(self, path):
+        self.path = path
+        self.rows = 0
+        self._parquet_writer = None
+
+    def write(self, df):
+        if _is_parquet(self.path):
+            import pyarrow as pa
+            import pyarrow.parquet as pq
+            table = pa.Table.from_pandas(df, preserve_index=False)
+            if self._parquet_writer is None:
+                self._parquet_writer = pq.ParquetWriter(self.path, table.schema)
+            self._parquet_writer.write_table(table.cast(self._parquet_writer.schema))
+        else:
+            df.to_csv(self.path, mode="w" if self.rows == 0 else "a", header=self.rows == 0, index=False)
+        self.rows += len(df)
+
+    def close(self):
+        if self._parquet_writer is not None:
+            self._parquet_writer.close()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="生年月日とTIPI回答をまとめてスコアリングする")
+    parser.add_argument("input", help="入力ファイル (.csv / .parquet)")
+    parser.add_argument("output", help="出力ファイル (.csv / .parquet)")
+    parser.add_argument("--dob-column", default="dob", help="生年月日の列名 (既定: dob)")
+    parser.add_argument("--time-column", default="birth_time", help="出生時刻 (HHMM) の列名。列が無ければ時柱なし (既定: birth_time)")
+    parser.add_argument("--chunksize", type=int, default=200_000, help="1チャンクの行数 (既定: 200000)")
+    args = parser.parse_args(argv)
+
+    writer = ChunkWriter(args.output)
+    try:
+        for chunk in iter_chunks(args.input, args.chunksize):
+            if args.dob_column not in chunk.columns:
+                parser.error(f"列 '{args.dob_column}' が入力にありません")
+            writer.write(score_frame(chunk, args.dob_column, args.time_column))
+            print(f"{writer.rows} rows", file=sys.stderr)
+    finally:
+        writer.close()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,399 @@
+"""
+裏・ステータス診断 運命解析エンジン
+
+app.py から切り出した解析ロジック本体。Streamlit に依存しないため、
+バッチ処理やCLIからも import して使える。
+"""
+import array
+import datetime
+import os
+import struct
+import threading
+
+from content_pack import get_content_pack
+from norms import get_norms
+from solar_terms import MINUTES_PER_DAY, get_solar_terms
+
+# ==========================================
+# 1. Constants
+# ==========================================
+GAN_ELEMENTS = ["甲", "乙", "丙", "丁", "戊", "己", "庚", "辛", "壬", "癸"]
+GAN_FIVE = [0, 0, 1, 1, 2, 2, 3, 3, 4, 4] 
+ZHI_FIVE = [4, 2, 0, 0, 2, 1, 1, 2, 3, 3, 2, 4] 
+# 節入りの目安日。solar_terms の時刻表 (1900〜2100年) の範囲外の年だけで使う
+SOLAR_TERMS = [6, 4, 6, 5, 6, 6, 7, 8, 8, 8, 7, 7] 
+# 年干 → 寅月の月干
+MONTH_BASE_GAN = (2, 2, 4, 4, 6, 6, 8, 8, 0, 0)
+SCORE_KEYS = ("Identity", "Create", "Economy", "Status", "Vitality")
+FATE_CODES = tuple(a + b + c + d for a in "LS" for b in "RG" for c in "ID" for d in "MY")
+# 時刻 (0〜23時) → 時支。子の刻は 23:00〜0:59
+HOUR_ZHI = tuple(((hour + 1) // 2) % 12 for hour in range(24))
+# 日干 × 時支 → 時干（五鼠遁: 甲・己の日は甲子の刻から始まる）
+HOUR_GAN = tuple(tuple((day_gan % 5 * 2 + zhi) % 10 for zhi in range(12)) for day_gan in range(10))
+ENERGY_STRENGTH = [
+    [3, 2, 3, 3, 2, 1, 1, 1, 1, 1, 2, 3], [3, 2, 3, 3, 2, 1, 1, 1, 1, 1, 2, 3],
+    [1, 1, 3, 3, 2, 3, 3, 2, 1, 1, 1, 1], [1, 1, 3, 3, 2, 3, 3, 2, 1, 1, 1, 1],
+    [1, 2, 3, 3, 3, 3, 3, 2, 1, 1, 1, 1], [1, 2, 3, 3, 3, 3, 3, 2, 1, 1, 1, 1],
+    [1, 2, 1, 1, 2, 3, 3, 2, 3, 3, 2, 1], [1, 2, 1, 1, 2, 3, 3, 2, 3, 3, 2, 1],
+    [3, 2, 1, 1, 2, 1, 1, 1, 3, 3, 2, 3], [3, 2, 1, 1, 2, 1, 1, 1, 3, 3, 2, 3]
+]
+
+# ==========================================
+# 2. Logic Engines (Fortune & Science)
+# ==========================================
+
+def parse_birth_time(text):
+    """
+    出生時刻 "0830" / "08:30" / "8:30" → 0時からの経過分。空なら None（時刻不明）、不正なら ValueError
+    """
+    text = (text or "").strip().replace("：", ":")
+    if not text:
+        return None
+    hour, sep, minute = text.partition(":")
+    if not sep:
+        if len(text) != 4:
+            raise ValueError(f"出生時刻は HHMM の4桁で指定してください: {text}")
+        hour, minute = text[:2], text[2:]
+    if not (hour.isdigit() and minute.isdigit() and len(minute) == 2):
+        raise ValueError(f"出生時刻を解釈できません: {text}")
+    hour, minute = int(hour), int(minute)
+    if not (0 <= hour < 24 and 0 <= minute < 60):
+        raise ValueError(f"出生時刻が範囲外です: {text}")
+    return hour * 60 + minute
+
+
+def _linear_big5(raw):
+    """素点 → 規準が無いときの 1-5段階"""
+    return round(1 + (raw - 2) * 4 / 12, 1)
+
+
+# 回答が 1〜7 の整数なら素点は 2〜14 なので先に引いておく（round を1件ごとに呼ぶと重い）。
+# それ以外の素点もこれまでどおり式で計算する
+_LINEAR_BIG5 = {v: _linear_big5(v) for v in range(2, 15)}
+
+
+def calculate_big5(answers, birth_year=None):
+    """
+    TIPI-Jの回答からビッグファイブスコアを算出。
+    規準 (norms.py) があれば同じ年齢帯の中での百分位を、無ければ素点を線形に 1-5段階へ写す
+    """
+    scores_raw = {
+        "Extraversion": answers["Q1"] + (8 - answers["Q6"]),
+        "Agreeableness": (8 - answers["Q2"]) + answers["Q7"],
+        "Conscientiousness": answers["Q3"] + (8 - answers["Q8"]),
+        "Neuroticism": answers["Q4"] + (8 - answers["Q9"]),
+        "Openness": answers["Q5"] + (8 - answers["Q10"])
+    }
+    norms = get_norms()
+    if norms is not None:
+        return scores_raw, norms.score(scores_raw, birth_year)
+    # 1-5段階へ正規化
+    scores_norm = {k: _LINEAR_BIG5[v] if v in _LINEAR_BIG5 else _linear_big5(v) for k, v in scores_raw.items()}
+    return scores_raw, scores_norm
+
+def analyze_big5_gap(scores_norm, fate_type_id):
+    """宿命(Type)と現在(Big5)のギャップからフック文章を生成"""
+    is_gap = False
+    # 簡易ギャップ判定ロジック
+    if fate_type_id in [0, 2, 6] and scores_norm["Extraversion"] < 2.5: is_gap = True
+    elif fate_type_id in [1, 9] and scores_norm["Agreeableness"] < 2.5: is_gap = True
+    elif fate_type_id in [4, 7] and scores_norm["Conscientiousness"] < 2.5: is_gap = True
+    
+    if is_gap: return " 注意：あなたの本来の才能が、現在60%死んでいます。"
+    else: return "✨ 素晴らしい：宿命通りに才能が発揮されています。ただし…"
+
+class FortuneEngineIntegrated:
+    """四柱推命ベースの運命解析エンジン"""
+    def __init__(self):
+        self.base_date = datetime.date(1900, 1, 1)
+        self.solar_terms = get_solar_terms()
+
+    def get_sexagenary_cycle(self, date_obj):
+        days_diff = (date_obj - self.base_date).days
+        return (10 + days_diff) % 60
+
+    def get_month_pillar(self, year, month, day, minute=None):
+        """
+        月柱 (干, 支)。月の境目は節入りの時刻表で判定する。
+        minute (0時からの経過分, 日本時間) を渡すと節入り当日も時刻まで比較し、
+        省略時は節入り当日を新しい月として扱う。
+        """
+        term = self.solar_terms.minutes(year, month)
+        if term is None:
+            is_after_setsuiri = day >= SOLAR_TERMS[month - 1]
+        elif minute is None:
+            is_after_setsuiri = day > term // MINUTES_PER_DAY
+        else:
+            is_after_setsuiri = (day - 1) * MINUTES_PER_DAY + minute >= term
+        year_gan_idx = (year - 3) % 10
+        month_start_gan = MONTH_BASE_GAN[year_gan_idx]
+        calc_month = month if is_after_setsuiri else month - 1
+        if calc_month == 0: calc_month = 12
+        month_offset = (calc_month + 10) % 12 
+        m_gan = (month_start_gan + month_offset) % 10
+        m_zhi = (2 + month_offset) % 12 
+        return m_gan, m_zhi
+
+    def get_star_category(self, day_gan, target_gan_five):
+        return SCORE_KEYS[STAR_CATEGORY[day_gan][target_gan_five]]
+
+    def analyze_basic(self, dob_str, minute=None):
+        y, m, d = map(int, dob_str.split('/'))
+        return self.analyze_date(datetime.date(y, m, d), minute)
+
+    def pillar_counts(self, date_obj, minute=None):
+        """
+        四柱から (日干, 通変の集計 [SCORE_KEYS の順], 日主の強さが I か) を求める。
+        minute (0時からの経過分, 日本時間) を渡すと時柱も数え、月柱も節入りの時刻まで比較する。
+        """
+        y, m, d = date_obj.year, date_obj.month, date_obj.day
+        day_seq = self.get_sexagenary_cycle(date_obj)
+        gan = day_seq % 10
+        zhi = day_seq % 12
+        m_gan, m_zhi = self.get_month_pillar(y, m, d, minute)
+        y_gan = (y - 3) % 10
+        y_zhi = (y - 3) % 12
+
+        category = STAR_CATEGORY[gan]
+        counts = [0, 0, 0, 0, 0]
+        counts[category[GAN_FIVE[y_gan]]] += 1
+        counts[category[GAN_FIVE[m_gan]]] += 1
+        counts[category[ZHI_FIVE[y_zhi]]] += 1
+        counts[category[ZHI_FIVE[m_zhi]]] += 2
+        counts[category[ZHI_FIVE[zhi]]] += 1
+        if minute is not None:
+            for k, delta in enumerate(HOUR_COUNT_DELTA[gan][HOUR_ZHI[minute // 60]]):
+                counts[k] += delta
+
+        energy_strength = ENERGY_STRENGTH[gan]
+        energy_high = energy_strength[zhi] + energy_strength[m_zhi] + energy_strength[y_zhi] >= 6
+        return gan, counts, energy_high
+
+    def analyze_date(self, date_obj, minute=None):
+        """date オブジェクトを直接受け取る版（文字列の再パースを省く）。minute は出生時刻（任意）"""
+        return build_result(*self.pillar_counts(date_obj, minute))
+
+
+# ==========================================
+# 2.5 Derivation Tables (single & batch)
+# ==========================================
+def _star_category(me, target):
+    if me == target: return 0
+    elif (me + 1) % 5 == target: return 1
+    elif (target + 1) % 5 == me: return 4
+    elif (me + 2) % 5 == target: return 2
+    elif (target + 2) % 5 == me: return 3
+    return 0
+
+
+# 日干 × 相手の五行 → 通変の分類 (SCORE_KEYS の番号)
+STAR_CATEGORY = tuple(tuple(_star_category(GAN_FIVE[day_gan], five) for five in range(5)) for day_gan in range(10))
+
+
+def _hour_delta(day_gan, hour_zhi):
+    delta = [0, 0, 0, 0, 0]
+    delta[STAR_CATEGORY[day_gan][GAN_FIVE[HOUR_GAN[day_gan][hour_zhi]]]] += 1
+    delta[STAR_CATEGORY[day_gan][ZHI_FIVE[hour_zhi]]] += 1
+    return tuple(delta)
+
+
+# 日干 × 時支 → 時柱（干・支 各1）が通変の集計に足す量。時柱の干は日干と時支で決まるので表にできる
+HOUR_COUNT_DELTA = tuple(tuple(_hour_delta(day_gan, zhi) for zhi in range(12)) for day_gan in range(10))
+# 通変の数 → 1〜5段階（四柱すべてで最大8）
+SCORE_OF_COUNT = (1, 2, 3, 4, 5, 5, 5, 5, 5)
+
+
+def fate_code_index(counts, energy_high):
+    """
+    通変の集計と日主の強さ → FATE_CODES の番号。
+    int でも NumPy の配列でもそのまま計算できる式にしてあり、fortune_batch も同じ関数を使う。
+    """
+    identity, create, economy, status, vitality = counts
+    return (
+        (vitality < create) * 8
+        + (status + vitality < economy + create) * 4
+        + (1 - energy_high) * 2
+        + (identity * 1.5 < economy + status) * 1
+    )
+
+
+def build_result(gan, counts, energy_high):
+    """pillar_counts の結果 → analyze_date の戻り値"""
+    identity, create, economy, status, vitality = counts
+    return {
+        "gan": gan,
+        "scores": {
+            "Identity": SCORE_OF_COUNT[identity],
+            "Create": SCORE_OF_COUNT[create],
+            "Economy": SCORE_OF_COUNT[economy],
+            "Status": SCORE_OF_COUNT[status],
+            "Vitality": SCORE_OF_COUNT[vitality],
+        },
+        "fate_code": FATE_CODES[fate_code_index(counts, energy_high)],
+        "partners": list(get_content_pack().compatibility_map.get(gan, ())),
+    }
+
+# ==========================================
+# 3. Precomputed Lookup Table
+# ==========================================
+# エンジンの判定ロジックを変えたら必ず上げる（ディスク上の古いテーブルを無効化するため）
+ENGINE_VERSION = 2
+
+TABLE_START = datetime.date(1900, 1, 1)
+TABLE_END = datetime.date(2100, 12, 31)
+# 出生時刻つきの診断は日付ごとの通変の集計に時柱の分を足して求めるので、集計とフラグも持っておく
+COUNT_COLUMNS = tuple(f"count_{key}" for key in SCORE_KEYS)
+TABLE_COLUMNS = ("gan",) + SCORE_KEYS + ("fate_code",) + COUNT_COLUMNS + ("flags",)
+FLAG_ENERGY_HIGH = 1
+# 節入りの当日。時刻によって月柱が変わるので、出生時刻つきはエンジンで計算する
+FLAG_TERM_DAY = 2
+
+_TABLE_MAGIC = b"FTB2"
+_TABLE_HEADER = struct.Struct("<4sIII")  # magic, ENGINE_VERSION, 開始日の序数, 日数
+
+
+class FortuneTable:
+    """全日付の解析結果を列ごとの配列で保持する参照テーブル（日付の序数で O(1) 参照）"""
+
+    def __init__(self, columns, start=TABLE_START):
+        self.columns = columns
+        self.start = start
+        self.start_ordinal = start.toordinal()
+        self.days = len(columns["gan"])
+        self.end = start + datetime.timedelta(days=self.days - 1)
+        self._gan = columns["gan"]
+        self._scores = [columns[k] for k in SCORE_KEYS]
+        self._code = columns["fate_code"]
+        self._counts = [columns[k] for k in COUNT_COLUMNS]
+        self._flags = columns["flags"]
+
+    @classmethod
+    def build(cls, start=TABLE_START, end=TABLE_END, engine=None):
+        """エンジンを全日付に対して1回ずつ回してテーブルを作る"""
+        engine = engine or get_engine()
+        columns = {name: array.array("B") for name in TABLE_COLUMNS}
+        score_columns = [columns[k] for k in SCORE_KEYS]
+        count_columns = [columns[k] for k in COUNT_COLUMNS]
+        date_obj = start
+        one_day = datetime.timedelta(days=1)
+        while date_obj <= end:
+            gan, counts, energy_high = engine.pillar_counts(date_obj)
+            columns["gan"].append(gan)
+            for c, score_col, count_col in zip(counts, score_columns, count_columns):
+                score_col.append(SCORE_OF_COUNT[c])
+                count_col.append(c)
+            columns["fate_code"].append(fate_code_index(counts, energy_high))
+            term_day = engine.solar_terms.term_day(date_obj.year, date_obj.month) == date_obj.day
+            columns["flags"].append(FLAG_ENERGY_HIGH * energy_high | FLAG_TERM_DAY * term_day)
+            date_obj += one_day
+        return cls(columns, start)
+
+    @classmethod
+    def load(cls, path):
+        """save() で書き出したファイルを読み込む。バージョン違い・破損時は ValueError"""
+        with open(path, "rb") as f:
+            blob = f.read()
+        if len(blob) < _TABLE_HEADER.size:
+            raise ValueError(f"テーブルファイルが壊れています: {path}")
+        magic, version, start_ordinal, days = _TABLE_HEADER.unpack_from(blob)
+        if magic != _TABLE_MAGIC or version != ENGINE_VERSION:
+            raise ValueError(f"テーブルファイルの形式またはバージョンが一致しません: {path}")
+        if len(blob) != _TABLE_HEADER.size + days * len(TABLE_COLUMNS):
+            raise ValueError(f"テーブルファイルのサイズが不正です: {path}")
+        columns = {}
+        offset = _TABLE_HEADER.size
+        for name in TABLE_COLUMNS:
+            col = array.array("B")
+            col.frombytes(blob[offset:offset + days])
+            columns[name] = col
+            offset += days
+        return cls(columns, datetime.date.fromordinal(start_ordinal))
+
+    def save(self, path):
+        """列をそのままバイナリで書き出す（1日あたり13バイト）"""
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, "wb") as f:
+            f.write(_TABLE_HEADER.pack(_TABLE_MAGIC, ENGINE_VERSION, self.start_ordinal, self.days))
+            for name in TABLE_COLUMNS:
+                self.columns[name].tofile(f)
+        os.replace(tmp_path, path)
+
+    def index_of(self, date_obj):
+        """テーブル上の行番号。範囲外なら None"""
+        i = date_obj.toordinal() - self.start_ordinal
+        return i if 0 <= i < self.days else None
+
+    def analyze_date(self, date_obj, minute=None):
+        """FortuneEngineIntegrated.analyze_date と同一の結果を返す（範囲外・出生時刻つきの節入り当日はエンジンで計算）"""
+        i = date_obj.toordinal() - self.start_ordinal
+        if not 0 <= i < self.days:
+            return get_engine().analyze_date(date_obj, minute)
+        if minute is not None:
+            flags = self._flags[i]
+            if flags & FLAG_TERM_DAY:
+                return get_engine().analyze_date(date_obj, minute)
+            gan = self._gan[i]
+            d_identity, d_create, d_economy, d_status, d_vitality = HOUR_COUNT_DELTA[gan][HOUR_ZHI[minute // 60]]
+            identity, create, economy, status, vitality = self._counts
+            counts = (identity[i] + d_identity, create[i] + d_create, economy[i] + d_economy,
+                      status[i] + d_status, vitality[i] + d_vitality)
+            return build_result(gan, counts, flags & FLAG_ENERGY_HIGH)
+        gan = self._gan[i]
+        identity, create, economy, status, vitality = self._scores
+        return {
+            "gan": gan,
+            "scores": {
+                "Identity": identity[i],
+                "Create": create[i],
+                "Economy": economy[i],
+                "Status": status[i],
+                "Vitality": vitality[i],
+            },
+            "fate_code": FATE_CODES[self._code[i]],
+            "partners": list(get_content_pack().compatibility_map.get(gan, ())),
+        }
+
+    def analyze_basic(self, dob_str, minute=None):
+        y, m, d = map(int, dob_str.split('/'))
+        return self.analyze_date(datetime.date(y, m, d), minute)
+
+
+_engine = None
+_table = None
+_table_lock = threading.Lock()
+
+
+def get_engine():
+    """プロセス内で共有するエンジンのインスタンス"""
+    global _engine
+    if _engine is None:
+        _engine = FortuneEngineIntegrated()
+    return _engine
+
+
+def get_fortune_table():
+    """
+    プロセス内で共有する参照テーブル。初回呼び出し時に1度だけ構築する。
+    環境変数 FATE_TABLE_PATH が指定されていれば、そこから読み込み（無ければ書き出し）する。
+    """
+    global _table
+    if _table is not None:
+        return _table
+    with _table_lock:
+        if _table is None:
+            path = os.environ.get("FATE_TABLE_PATH")
+            table = None
+            if path and os.path.exists(path):
+                try:
+                    table = FortuneTable.load(path)
+                except (OSError, ValueError):
+                    table = None
+            if table is None:
+                table = FortuneTable.build()
+                if path:
+                    try:
+                        table.save(path)
+                    except OSError:
+                        pass
+            _table = table
+    return _table
@@ -0,0 +1,136 @@
+"""
+結果ページの HTML フラグメント
+
+render_result_component が毎回 f-string で組み立てて約30回の st.markdown に分けて
+送っていた HTML のうち、タイプIDと FATE Code だけで決まる部分を1度だけ組み立てて
+プロセス内にキャッシュする。描画時に差し込むのは LINE リンクやチャートなどの
+ユーザー固有の小さな部分だけ。
+見た目はすべて styles/app.css のクラスで指定し、インラインの style は持たない
+（タイプ別のテーマ色も stylesheet.py が .type-theme-<ID> として生成する）。
+"""
+import collections
+import threading
+
+TypeFragments = collections.namedtuple("TypeFragments", ["hero", "story"])
+
+_cache = {}
+_cache_lock = threading.Lock()
+
+
+def _cached(key, build):
+    html = _cache.get(key)
+    if html is None:
+        html = build()
+        with _cache_lock:
+            html = _cache.setdefault(key, html)
+    return html
+
+
+def _paragraphs(text):
+    # st.write と同じく改行を段落内の改行として扱う
+    return "<p>" + text.replace("\n", "<br>") + "</p>"
+
+
+# ==========================================
+# 1. Per-Type Sections
+# ==========================================
+def _theme_class(content):
+    return f"type-theme-{content['gan'] + 1}"
+
+
+def _build_hero(content):
+    phrases_html = "".join([f"<div class='phrase-bubble'>{p}</div>" for p in content['phrases']])
+    return (
+        "<h3>【表の顔】社会的役割としてのあなた</h3>"
+        f'<div class="read-card read-card-hero {_theme_class(content)}">'
+        f"<div class='type-name-huge'>{content['name']}</div>"
+        f"<div class='catch-subtitle'>{content['catch']}</div>"
+        f"<div class='phrase-container'>{phrases_html}</div>"
+        "</div>"
+    )
+
+
+def _build_story(content):
+    def heading(title):
+        return f"<h3>{title}</h3>"
+
+    good = '<br>'.join(['・' + i for i in content['impression_good']])
+    bad = '<br>'.join(['・' + i for i in content['impression_bad']])
+    trivia = "".join(f"<p>✔ {t}</p>" for t in content['trivia'])
+    return (
+        f'<div class="read-card {_theme_class(content)}">'
+        + heading("【表の性格】宿命")
+        + f"<div class='story-intro'>{content['intro']}</div>"
+        + "<hr>"
+        + heading("① 対人関係のスタイル") + _paragraphs(content['social_style'])
+        + heading("② 隠された本音と欠点") + _paragraphs(content['inner_drive'])
+        + heading("③ ストレス時の『影』") + _paragraphs(content['shadow_phase'])
+        + heading("④ 周囲からの評判")
+        + "<div class='impression-grid'>"
+        + f"<div class='impression-box impression-good'><b>Good</b><br>{good}</div>"
+        + f"<div class='impression-box impression-bad'><b>Bad</b><br>{bad}</div>"
+        + "</div>"
+        + heading("⑤ あなたの『あるある』") + trivia
+        + f"<div class='golden-rule'><b>GOLDEN RULE</b><br><br><span class='golden-rule-text'>{content['golden_rule_long']}</span></div>"
+        + "</div>"
+    )
+
+
+def type_fragments(type_id, content):
+    """タイプ固有の静的セクション（ヒーローカード・ストーリー）。type_id をキーにキャッシュ"""
+    return _cached(("type", type_id), lambda: TypeFragments(_build_hero(content), _build_story(content)))
+
+
+def fate_code_fragment(fate_code, fate_meanings):
+    """FATE Code 解析セクション（16通りしかないのでコードをキーにキャッシュ）"""
+    def build():
+        boxes = "".join(
+            f"<div class='fate-meaning-box'><span class='fate-char'>{char}</span> {fate_meanings.get(char, '不明')}</div>"
+            for char in fate_code
+        )
+        return (
+            "<h3>🧬 【あなたのFATE Code解析】</h3>"
+            '<div class="read-card read-card-compact">'
+            f"<p>あなたのコード: <b>{fate_code}</b></p>{boxes}"
+            "</div>"
+        )
+    return _cached(("fate", fate_code), build)
+
+
+# ==========================================
+# 2. Shared Sections
+# ==========================================
+CHART_INTRO_HTML = (
+    "<h3>【裏の顔】現在の性格（潜在的な本質とズレ）</h3>"
+    '<div class="chart-desc">'
+    "<b>オレンジ（表の顔）</b>に対し、<b>青（裏の顔）が大きすぎる場合は『才能の暴走（空回り）』、小さすぎる場合は『ポテンシャル不足』</b>を示します。<br>"
+    "この『出力のズレ』を調整し、あなたの本来の力を100%発揮させるための『精密心理分析ロジック』がここにあります。"
+    "</div>"
+)
+
+# CTA ブロックは LINE リンクの前後で分割しておき、描画時はリンクを挟んで連結するだけにする
+_CTA_HEAD = (
+    '<div class="cta-box">'
+    '<div class="cta-badge">🔒 LINE限定：心理学ロジックで解き明かす『あなたの真実』</div>'
+    '<div class="cta-list">'
+    '<div class="cta-item"><span class="cta-tag">【警告】</span>あなたの才能が『自滅』するパターンの特定</div>'
+    '<div class="cta-item"><span class="cta-tag">【仕事】</span>努力は不要。あなたの『性格の悪さ』をお金に変える錬金術</div>'
+    '<div class="cta-item"><span class="cta-tag">【恋愛】</span>※閲覧注意※ あなたが本能的に惹かれる『破滅させる相手』</div>'
+    '</div>'
+    '<div class="cta-bonus cta-bonus-matrix"><div class="cta-bonus-title">【相性】全タイプ網羅！<br>『運命の相関マトリクス図』</div></div>'
+    '<div class="cta-bonus cta-bonus-card"><div class="cta-bonus-title">【登録特典】あなたの『表と裏』を一枚に！<br>『ステータス診断カード』</div><div class="cta-bonus-note">※ 登録後すぐに自動で送られます。<br>SNSでシェアして本当の自分を表現しよう。</div></div>'
+    '<div class="cta-blur">ここにあなたの性格の裏側に関する詳細なレポートが表示されます。なぜあなたは人間関係で同じ失敗を繰り返してしまうのか？その原因は幼少期の体験にあるかもしれません。このレポートを読むことで、あなたは二度と同じ過ちを繰り返さず、本来の輝きを取り戻すことができるでしょう...</div>'
+    '<div class="lock-overlay cta-lock">'
+    '<a href="'
+)
+_CTA_TAIL = (
+    '" target="_blank" class="cta-lock-link">'
+    '<div class="cta-lock-button">'
+    '<span class="cta-lock-label">🔒 現在の性格の詳細なレポートを今すぐ読む（無料）</span>'
+    '</div></a></div></div>'
+)
+
+
+def cta_fragment(line_link):
+    """LINE 誘導の CTA ブロック（リンクだけ差し込む）"""
+    return _CTA_HEAD + line_link + _CTA_TAIL
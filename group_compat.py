@@ -0,0 +1,210 @@
+"""
+チーム（グループ）の相性分析
+
+N人分の (生年月日, 任意の TIPI 回答) から N×N の相性スコア (0〜100) を求める。
+運命側は日干どうしの関係（五行の相生・相剋を get_star_category で判定、干合、相性表）を
+10×10 の表にしておき、日干の配列で表引きする。Big Five 側は5次元のユークリッド距離を
+行列積で求める。数千人規模でも N×N×5 の中間配列を作らないよう、行をブロックに分けて処理する。
+
+CLI:
+    python group_compat.py team.csv --matrix matrix.npy --top 20
+"""
+import argparse
+import collections
+import functools
+import os
+import re
+import sys
+
+import numpy as np
+
+from content_pack import get_content_pack
+from fortune_engine import GAN_FIVE, get_engine
+
+# 自分から見た相手の五行（通変星のカテゴリ）ごとの点数。相手側から見た点数と平均する
+ELEMENT_POINTS = {"Identity": 60, "Create": 75, "Vitality": 75, "Economy": 40, "Status": 40}
+# 干合（甲己・乙庚・丙辛・丁壬・戊癸 = 十干の差が5）
+GAN_COMBINE_BONUS = 20
+# compatibility_map に載っている組み合わせ
+PARTNER_BONUS = 15
+# 両者とも TIPI 回答があるときの運命スコアの比重（残りが Big Five の近さ）
+FATE_WEIGHT = 0.6
+
+BIG5_KEYS = ("Extraversion", "Agreeableness", "Conscientiousness", "Neuroticism", "Openness")
+# 1〜5段階の5特性で取り得る最大距離
+MAX_BIG5_DISTANCE = float(np.sqrt(len(BIG5_KEYS) * 4 ** 2))
+BLOCK_SIZE = int(os.environ.get("FATE_GROUP_BLOCK", "512"))
+TYPE_COUNT = 10
+
+Members = collections.namedtuple("Members", ["names", "gan", "big5", "dropped"])
+
+
+# ==========================================
+# 1. Pair Tables
+# ==========================================
+def _partner_gans(partners):
+    """["No.6 オカン", ...] → {5, ...}（表示用の文字列からタイプ番号を取り出す）"""
+    return {int(m.group(1)) - 1 for m in (re.match(r"No\.(\d+)", p) for p in partners) if m}
+
+
+@functools.lru_cache(maxsize=1)
+def fate_pair_table():
+    """日干 × 日干 → 運命側の相性スコア (10×10, float32, 対称)"""
+    engine = get_engine()
+    compat = get_content_pack().compatibility_map
+    partners = {gan: _partner_gans(compat.get(gan, ())) for gan in range(TYPE_COUNT)}
+    table = np.zeros((TYPE_COUNT, TYPE_COUNT), dtype=np.float32)
+    for a in range(TYPE_COUNT):
+        for b in range(TYPE_COUNT):
+            score = (ELEMENT_POINTS[engine.get_star_category(a, GAN_FIVE[b])]
+                     + ELEMENT_POINTS[engine.get_star_category(b, GAN_FIVE[a])]) / 2
+            if abs(a - b) == 5:
+                score += GAN_COMBINE_BONUS
+            if b in partners[a] or a in partners[b]:
+                score += PARTNER_BONUS
+            table[a, b] = min(score, 100)
+    return table
+
+
+# ==========================================
+# 2. Members
+# ==========================================
+def load_members(df, dob_column="dob", name_column="name"):
+    """
+    DataFrame → Members。TIPI 回答 (Q1〜Q10) の列は任意で、無い人の Big Five は NaN。
+    生年月日が解釈できない行は除外し、その行番号を dropped に入れる。
+    """
+    import fortune_batch
+
+    fate = fortune_batch.analyze_many(df[dob_column])
+    keep = fate["valid"]
+    if all(key in df.columns for key in fortune_batch.TIPI_KEYS):
+        _, norm = fortune_batch.calculate_big5_many(df)
+        big5 = np.column_stack([norm[key] for key in BIG5_KEYS]).astype(np.float32)
+    else:
+        big5 = np.full((len(df), len(BIG5_KEYS)), np.nan, dtype=np.float32)
+    if name_column in df.columns:
+        names = df[name_column].fillna("").astype(str).to_numpy()
+    else:
+        names = np.array([f"#{i + 1}" for i in range(len(df))])
+    return Members(names[keep], fate["gan"][keep].astype(np.intp), big5[keep], np.flatnonzero(~keep))
+
+
+# ==========================================
+# 3. Blocked Matrix
+# ==========================================
+def iter_blocks(members, block_size=BLOCK_SIZE):
+    """(行の開始, 行の終了, その行範囲の相性スコア uint8[B, N]) を順に返す"""
+    gan = members.gan
+    table = fate_pair_table()
+    has_big5 = ~np.isnan(members.big5).any(axis=1)
+    big5 = np.where(has_big5[:, None], members.big5, 0).astype(np.float32)
+    # |a - b|^2 = |a|^2 + |b|^2 - 2a・b（B×N×5 の差分配列を作らずに距離を求める）
+    sq = (big5 ** 2).sum(axis=1)
+    for start in range(0, len(gan), block_size):
+        stop = min(start + block_size, len(gan))
+        fate = table[gan[start:stop, None], gan[None, :]]
+        dist2 = sq[start:stop, None] + sq[None, :] - 2 * (big5[start:stop] @ big5.T)
+        similarity = 1 - np.sqrt(np.maximum(dist2, 0)) / MAX_BIG5_DISTANCE
+        both = has_big5[start:stop, None] & has_big5[None, :]
+        score = np.where(both, FATE_WEIGHT * fate + (1 - FATE_WEIGHT) * 100 * similarity, fate)
+        yield start, stop, np.rint(score).astype(np.uint8)
+
+
+def compatibility_matrix(members, out=None, block_size=BLOCK_SIZE):
+    """
+    N×N の相性行列 (uint8)。out に np.lib.format.open_memmap などを渡せば、
+    行列全体をメモリに載せずにブロックごとに書き込む。
+    """
+    n = len(members.gan)
+    if out is None:
+        out = np.empty((n, n), dtype=np.uint8)
+    for start, stop, block in iter_blocks(members, block_size):
+        out[start:stop] = block
+    return out
+
+
+def summarize(members, top=10, block_size=BLOCK_SIZE):
+    """
+    行列を保持せずにブロック単位で集計する。
+    mean / best / best_score は各メンバーの平均相性・最良の相手・そのスコア、
+    type_matrix はタイプ × タイプの平均 (10×10, 該当ペアが無ければ NaN)、
+    top_pairs はスコア上位の (i, j, スコア)（i < j）。
+    """
+    n = len(members.gan)
+    mean = np.zeros(n, dtype=np.float32)
+    best = np.full(n, -1, dtype=np.intp)
+    best_score = np.zeros(n, dtype=np.uint8)
+    type_sum = np.zeros(TYPE_COUNT * TYPE_COUNT)
+    type_count = np.zeros(TYPE_COUNT * TYPE_COUNT)
+    top_i = top_j = np.empty(0, dtype=np.intp)
+    top_s = np.empty(0, dtype=np.uint8)
+    columns = np.arange(n)
+
+    for start, stop, block in iter_blocks(members, block_size):
+        rows = np.arange(start, stop)
+        off_diagonal = columns[None, :] != rows[:, None]
+        if n > 1:
+            mean[start:stop] = (block.sum(axis=1, dtype=np.int64) - block[rows - start, rows]) / (n - 1)
+            masked = np.where(off_diagonal, block.astype(np.int16), -1)
+            best[start:stop] = masked.argmax(axis=1)
+            best_score[start:stop] = masked.max(axis=1)
+
+        pair_type = (members.gan[start:stop, None] * TYPE_COUNT + members.gan[None, :])[off_diagonal]
+        type_sum += np.bincount(pair_type, weights=block[off_diagonal], minlength=type_sum.size)
+        type_count += np.bincount(pair_type, minlength=type_count.size)
+
+        if top:
+            bi, bj = np.nonzero(columns[None, :] > rows[:, None])
+            scores = block[bi, bj]
+            if len(scores) > top:
+                keep = np.argpartition(scores, -top)[-top:]
+                bi, bj, scores = bi[keep], bj[keep], scores[keep]
+            top_i = np.concatenate([top_i, bi + start])
+            top_j = np.concatenate([top_j, bj])
+            top_s = np.concatenate([top_s, scores])
+            order = np.argsort(-top_s.astype(np.int16), kind="stable")[:top]
+            top_i, top_j, top_s = top_i[order], top_j[order], top_s[order]
+
+    with np.errstate(invalid="ignore"):
+        type_matrix = (type_sum / type_count).reshape(TYPE_COUNT, TYPE_COUNT)
+    return {
+        "mean": mean,
+        "best": best,
+        "best_score": best_score,
+        "type_matrix": type_matrix,
+        "top_pairs": list(zip(top_i.tolist(), top_j.tolist(), top_s.tolist())),
+    }
+
+
+# ==========================================
+# 4. CLI
+# ==========================================
+def main(argv=None):
+    import pandas as pd
+
+    parser = argparse.ArgumentParser(description="チーム全員の相性行列を計算する")
+    parser.add_argument("input", help="メンバー一覧 (.csv: name, dob, 任意で Q1〜Q10)")
+    parser.add_argument("--dob-column", default="dob", help="生年月日の列名 (既定: dob)")
+    parser.add_argument("--matrix", help="N×N の相性行列を書き出す .npy（メモリマップで書き込む）")
+    parser.add_argument("--top", type=int, default=20, help="表示する上位ペアの数 (既定: 20)")
+    parser.add_argument("--block-size", type=int, default=BLOCK_SIZE)
+    args = parser.parse_args(argv)
+
+    df = pd.read_csv(args.input, dtype={args.dob_column: str})
+    members = load_members(df, args.dob_column)
+    if len(members.dropped):
+        print(f"生年月日を解釈できない {len(members.dropped)} 行を除外しました", file=sys.stderr)
+    if args.matrix:
+        n = len(members.gan)
+        out = np.lib.format.open_memmap(args.matrix, mode="w+", dtype=np.uint8, shape=(n, n))
+        compatibility_matrix(members, out, args.block_size)
+        out.flush()
+    summary = summarize(members, args.top, args.block_size)
+    for i, j, score in summary["top_pairs"]:
+        print(f"{score:3d}  {members.names[i]} × {members.names[j]}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,258 @@
+"""
+再実行ごとの区間計測とオンデマンドのプロファイラ
+
+エンジン・Big Five・画像・チャート・HTML など描画の各段階を span() で囲んで計測し、
+1回の再実行ぶんをまとめて構造化ログ (JSON 1行) に出す。段階ごとの直近の計測値は
+プロセス内に保持し、p50 / p99 を Prometheus のテキスト形式で取り出せる。
+管理者用クエリパラメータが指定された再実行だけ cProfile を取ってファイルに書き出す。
+FATE_TRACEMALLOC=1 のときはウォームアップ後を基準に tracemalloc で増えたメモリを追い、
+1セッションあたりのバイト数と増加の多い箇所を出せる。
+"""
+import collections
+import contextlib
+import cProfile
+import hmac
+import io
+import json
+import logging
+import os
+import pstats
+import threading
+import time
+import tracemalloc
+
+logger = logging.getLogger("fate.timing")
+
+# 段階ごとに保持する直近の計測数（分位点はこの範囲で計算する）
+RESERVOIR_SIZE = int(os.environ.get("FATE_TIMING_RESERVOIR", "2048"))
+QUANTILES = (0.5, 0.9, 0.99)
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+# 相対パスは作業ディレクトリではなく app のディレクトリ基準（event_log の events/ と同じ）
+PROFILE_DIR = os.path.join(BASE_DIR, os.environ.get("FATE_PROFILE_DIR", "profiles"))
+MEMORY_TRACING = os.environ.get("FATE_TRACEMALLOC", "0") == "1"
+TRACEMALLOC_FRAMES = int(os.environ.get("FATE_TRACEMALLOC_FRAMES", "1"))
+
+
+class StageStats:
+    def __init__(self):
+        self.count = 0
+        self.total = 0.0
+        self.recent = collections.deque(maxlen=RESERVOIR_SIZE)
+
+    def add(self, seconds):
+        self.count += 1
+        self.total += seconds
+        self.recent.append(seconds)
+
+    def quantile(self, q):
+        if not self.recent:
+            return 0.0
+        ordered = sorted(self.recent)
+        return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+
+_stats = collections.defaultdict(StageStats)
+_stats_lock = threading.Lock()
+_local = threading.local()
+
+
+# ==========================================
+# 1. Spans
+# ==========================================
+def record(stage, seconds):
+    with _stats_lock:
+        _stats[stage].add(seconds)
+    spans = getattr(_local, "spans", None)
+    if spans is not None:
+        spans.append((stage, seconds))
+
+
+@contextlib.contextmanager
+def span(stage):
+    """with span("engine"): ... の区間を計測する"""
+    t = time.perf_counter()
+    try:
+        yield
+    finally:
+        record(stage, time.perf_counter() - t)
+
+
+@contextlib.contextmanager
+def rerun_scope(script="app"):
+    """
+    1回の再実行全体。中で計測した span をまとめて1行のログにする。
+    再実行の中で入れ子に呼ばれた場合（フラグメントの通常の描画）は外側の1行にまとめ、
+    フラグメントだけが再実行されたときに単独の1行になる。
+    """
+    if getattr(_local, "spans", None) is not None:
+        yield
+        return
+    _local.spans = []
+    t = time.perf_counter()
+    try:
+        yield
+    finally:
+        total = time.perf_counter() - t
+        spans, _local.spans = _local.spans, None
+        record("rerun", total)
+        logger.info(json.dumps({
+            "event": "rerun",
+            "script": script,
+            "total_ms": round(total * 1000, 3),
+            "spans": [{"stage": s, "ms": round(d * 1000, 3)} for s, d in spans],
+        }, ensure_ascii=False))
+
+
+# ==========================================
+# 2. Prometheus Snapshot
+# ==========================================
+def snapshot():
+    """段階名 → {count, sum, p50, p90, p99}"""
+    with _stats_lock:
+        return {
+            stage: {
+                "count": s.count,
+                "sum": s.total,
+                **{f"p{int(q * 100)}": s.quantile(q) for q in QUANTILES},
+            }
+            for stage, s in _stats.items()
+        }
+
+
+def prometheus_text(extra_counters=None):
+    """Prometheus のテキスト形式。extra_counters は {メトリクス名: 値}"""
+    lines = [
+        "# HELP fate_stage_seconds Per-stage render time in seconds.",
+        "# TYPE fate_stage_seconds summary",
+    ]
+    for stage, s in sorted(snapshot().items()):
+        for q in QUANTILES:
+            lines.append(f'fate_stage_seconds{{stage="{stage}",quantile="{q}"}} {s[f"p{int(q * 100)}"]:.6f}')
+        lines.append(f'fate_stage_seconds_sum{{stage="{stage}"}} {s["sum"]:.6f}')
+        lines.append(f'fate_stage_seconds_count{{stage="{stage}"}} {s["count"]}')
+    for name, value in (extra_counters or {}).items():
+        lines.append(f"# TYPE {name} gauge")
+        lines.append(f"{name} {value}")
+    return "\n".join(lines) + "\n"
+
+
+# ==========================================
+# 3. On-demand Profiler
+# ==========================================
+def is_admin(query_params):
+    """FATE_ADMIN_TOKEN が設定され、?admin= がそれと一致するときだけ True"""
+    token = os.environ.get("FATE_ADMIN_TOKEN")
+    given = query_params.get("admin")
+    if not token or not isinstance(given, str):
+        return False
+    # 一致するまでの文字数で応答時間が変わらないよう定数時間で比べる
+    return hmac.compare_digest(given.encode(), token.encode())
+
+
+class RerunProfile:
+    """1回の再実行を cProfile で記録し、.prof と上位関数のテキストを残す"""
+
+    def __init__(self):
+        self.profiler = cProfile.Profile()
+        self.path = None
+        self.summary = ""
+
+    def __enter__(self):
+        self.profiler.enable()
+        return self
+
+    def __exit__(self, *exc):
+        self.profiler.disable()
+        os.makedirs(PROFILE_DIR, exist_ok=True)
+        # .prof は snakeviz / flameprof などでフレームグラフとして開ける
+        self.path = os.path.join(PROFILE_DIR, time.strftime("rerun-%Y%m%d-%H%M%S") + f"-{os.getpid()}.prof")
+        self.profiler.dump_stats(self.path)
+        out = io.StringIO()
+        pstats.Stats(self.profiler, stream=out).sort_stats("cumulative").print_stats(40)
+        self.summary = out.getvalue()
+        logger.info(json.dumps({"event": "profile", "path": self.path}))
+        return False
+
+
+# ==========================================
+# 4. Memory per Session (tracemalloc)
+# ==========================================
+_memory_baseline = None
+_memory_lock = threading.Lock()
+# tracemalloc 自身と import 機構の確保は集計から外す
+_MEMORY_FILTERS = (
+    tracemalloc.Filter(False, tracemalloc.__file__),
+    tracemalloc.Filter(False, "<frozen importlib._bootstrap>"),
+    tracemalloc.Filter(False, "<frozen importlib._bootstrap_external>"),
+    tracemalloc.Filter(False, "<unknown>"),
+)
+
+
+def start_memory_tracing(frames=TRACEMALLOC_FRAMES):
+    """
+    tracemalloc を開始し、この時点のスナップショットを基準にする（2回目以降は何もしない）。
+    共有キャッシュを作り終えた後に呼べば、基準からの増加がほぼセッションごとの確保になる。
+    """
+    global _memory_baseline
+    if _memory_baseline is not None:
+        return
+    with _memory_lock:
+        if _memory_baseline is None:
+            if not tracemalloc.is_tracing():
+                tracemalloc.start(frames)
+            _memory_baseline = tracemalloc.take_snapshot().filter_traces(_MEMORY_FILTERS)
+
+
+def active_session_count():
+    """Streamlit サーバー上のアクティブなセッション数（サーバー外では None）"""
+    try:
+        from streamlit import runtime
+        if not runtime.exists():
+            return None
+        return runtime.get_instance()._session_mgr.num_active_sessions()
+    except Exception:
+        return None
+
+
+def memory_report(sessions=None, top=15):
+    """
+    基準からの増加量と、それをセッション数で割ったバイト数。
+    sessions を省略すると Streamlit のアクティブセッション数を使う。tracemalloc 無効時は None。
+    """
+    if _memory_baseline is None or not tracemalloc.is_tracing():
+        return None
+    if sessions is None:
+        sessions = active_session_count()
+    snapshot = tracemalloc.take_snapshot().filter_traces(_MEMORY_FILTERS)
+    diff = snapshot.compare_to(_memory_baseline, "lineno")
+    baseline_bytes = sum(stat.size for stat in _memory_baseline.statistics("filename"))
+    current_bytes = sum(stat.size for stat in snapshot.statistics("filename"))
+    growth = current_bytes - baseline_bytes
+    return {
+        "baseline_bytes": baseline_bytes,
+        "current_bytes": current_bytes,
+        "peak_bytes": tracemalloc.get_traced_memory()[1],
+        "growth_bytes": growth,
+        "sessions": sessions,
+        "bytes_per_session": round(growth / sessions) if sessions else None,
+        "top": [
+            {"where": str(stat.traceback), "size_diff": stat.size_diff, "count_diff": stat.count_diff}
+            for stat in diff[:top]
+        ],
+    }
+
+
+def format_memory_report(report):
+    """memory_report() を人が読むテキストにする"""
+    if report is None:
+        return "tracemalloc は無効です（FATE_TRACEMALLOC=1 で起動してください）"
+    lines = [
+        f"baseline   {report['baseline_bytes'] / 2**20:10.2f} MiB",
+        f"current    {report['current_bytes'] / 2**20:10.2f} MiB  (peak {report['peak_bytes'] / 2**20:.2f} MiB)",
+        f"growth     {report['growth_bytes'] / 2**20:10.2f} MiB  / {report['sessions']} sessions",
+    ]
+    if report["bytes_per_session"] is not None:
+        lines.append(f"per session {report['bytes_per_session'] / 1024:9.1f} KiB")
+    lines.append("")
+    lines.extend(f"{item['size_diff'] / 1024:+10.1f} KiB {item['count_diff']:+8d}  {item['where']}" for item in report["top"])
+    return "\n".join(lines)
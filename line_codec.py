@@ -0,0 +1,363 @@
+"""
+LINE 連携メッセージのエンコード / デコード
+
+受け手（GAS / バックエンド）が自由文をパースし直さなくて済むよう、line_link が組み立てる
+メッセージの形式をここで明示的に定義する。
+
+- legacy:  従来の「NAME: ... / BIRTH: ... / TYPE: ... / EX: ...」形式
+- compact: バージョン付きの短い形式。生年月日・タイプ・スコアを固定長のバイナリ + CRC32 にして
+           base64url にした1行のトークンと NAME 行だけを送る。URL エンコード後の長さは
+           legacy の数分の1になる。名前はユーザーが自由に書き換える欄なのでトークンの外に置く
+
+    NAME: 太郎
+    FS1.<base64url>    # 行頭の FS<バージョン>. で形式を判別する
+
+デコーダは1件ずつの decode_message と、滞留したメッセージをまとめて検証・重複除去する
+decode_many を持つ。動作確認用に、LINE の Webhook の代わりになるローカルサーバーも付けてある。
+
+CLI:
+    python line_codec.py decode backlog.txt > decoded.jsonl
+    python line_codec.py serve --port 8787 --output received.jsonl
+    python line_codec.py replay backlog.txt --url http://127.0.0.1:8787/webhook
+"""
+import argparse
+import base64
+import binascii
+import collections
+import datetime
+import json
+import struct
+import sys
+import threading
+import urllib.parse
+import zlib
+
+from line_link import DEFAULT_NAME, FOOTER_LINE, HEADER_LINES, LINE_OA_URL
+
+COMPACT_VERSION = 1
+COMPACT_PREFIX = f"FS{COMPACT_VERSION}."
+# version, 日付の序数(3バイト), タイプ, フラグ, EX/OP/AG/CO/NE の10倍値
+_COMPACT_HEAD = struct.Struct(">B3sBB5B")
+_CRC = struct.Struct(">I")
+_FLAG_SCORES = 0x01
+
+SCORE_KEYS = ("EX", "OP", "AG", "CO", "NE")
+BIG5_NAMES = ("Extraversion", "Openness", "Agreeableness", "Conscientiousness", "Neuroticism")
+
+
+class LineCodecError(ValueError):
+    """メッセージを解釈できない・検証に失敗した"""
+
+
+class LinePayload(collections.namedtuple("LinePayload", ["name", "birth", "type_id", "scores"])):
+    """
+    1件分の連携データ。birth は "19970324" 形式、scores は EX/OP/AG/CO/NE の順の
+    1.0〜5.0（TIPI 未回答なら None）。
+    """
+    __slots__ = ()
+
+    def big5_norm(self):
+        return None if self.scores is None else dict(zip(BIG5_NAMES, self.scores))
+
+    def to_dict(self):
+        return {"name": self.name, "birth": self.birth, "type_id": self.type_id, "big5": self.big5_norm()}
+
+
+# ==========================================
+# 1. Encoding
+# ==========================================
+def _scores_tuple(big5_norm):
+    if not big5_norm:
+        return None
+    return tuple(float(big5_norm.get(name, 3.0)) for name in BIG5_NAMES)
+
+
+def encode_legacy(payload):
+    """従来形式のメッセージ（line_link.build_line_message と同じ文字列）"""
+    lines = list(HEADER_LINES) + [
+        f"NAME: {payload.name or DEFAULT_NAME}",
+        f"BIRTH: {payload.birth}",
+        f"TYPE: {payload.type_id}",
+    ]
+    if payload.scores is not None:
+        lines += [f"{key}: {value}" for key, value in zip(SCORE_KEYS, payload.scores)]
+    return "\n".join(lines + [FOOTER_LINE])
+
+
+def encode_token(payload):
+    """compact 形式のトークン FS1.xxxx（名前は含まない）"""
+    try:
+        ordinal = datetime.date(int(payload.birth[:4]), int(payload.birth[4:6]), int(payload.birth[6:8])).toordinal()
+    except (TypeError, ValueError):
+        raise LineCodecError(f"BIRTH が8桁の日付ではありません: {payload.birth!r}") from None
+    flags = 0
+    tenths = (0,) * 5
+    if payload.scores is not None:
+        flags |= _FLAG_SCORES
+        tenths = tuple(int(round(v * 10)) for v in payload.scores)
+    try:
+        body = _COMPACT_HEAD.pack(COMPACT_VERSION, ordinal.to_bytes(3, "big"), payload.type_id, flags, *tenths)
+    except (struct.error, OverflowError):
+        raise LineCodecError(f"TYPE / スコアが compact 形式の範囲外です: {payload}") from None
+    body += _CRC.pack(zlib.crc32(body))
+    return COMPACT_PREFIX + base64.urlsafe_b64encode(body).rstrip(b"=").decode("ascii")
+
+
+COMPACT_HEADER_LINES = (HEADER_LINES[0], HEADER_LINES[2])
+
+
+def encode_compact(payload):
+    """compact 形式のメッセージ（送信を促す見出し + NAME 行 + トークン）"""
+    return "\n".join(COMPACT_HEADER_LINES + (f"NAME: {payload.name or DEFAULT_NAME}", encode_token(payload)))
+
+
+def encode_link(payload, fmt="legacy"):
+    message = encode_compact(payload) if fmt == "compact" else encode_legacy(payload)
+    return LINE_OA_URL + urllib.parse.quote(message)
+
+
+def payload_from_result(user_name, dob_str, type_id, big5_norm=None):
+    """render_result_component に渡る値から LinePayload を作る"""
+    return LinePayload(user_name or DEFAULT_NAME, dob_str, int(type_id), _scores_tuple(big5_norm))
+
+
+# ==========================================
+# 2. Decoding
+# ==========================================
+def _decode_token(token, name):
+    encoded = token[len(COMPACT_PREFIX):]
+    try:
+        raw = base64.urlsafe_b64decode(encoded + "=" * (-len(encoded) % 4))
+    except (binascii.Error, ValueError):
+        raise LineCodecError("compact トークンの base64 が不正です") from None
+    if len(raw) != _COMPACT_HEAD.size + _CRC.size:
+        raise LineCodecError("compact トークンの長さが不正です")
+    # 以降はコピーせずに memoryview 上で読む
+    view = memoryview(raw)
+    end = _COMPACT_HEAD.size
+    if zlib.crc32(view[:end]) != _CRC.unpack_from(view, end)[0]:
+        raise LineCodecError("チェックサムが一致しません")
+    version, ordinal, type_id, flags, *tenths = _COMPACT_HEAD.unpack_from(view)
+    if version != COMPACT_VERSION:
+        raise LineCodecError(f"未対応のバージョンです: {version}")
+    try:
+        birth = datetime.date.fromordinal(int.from_bytes(ordinal, "big"))
+    except ValueError:
+        raise LineCodecError("日付が不正です") from None
+    scores = tuple(t / 10 for t in tenths) if flags & _FLAG_SCORES else None
+    return LinePayload(name, f"{birth.year:04d}{birth.month:02d}{birth.day:02d}", type_id, scores)
+
+
+def _decode_legacy(lines):
+    fields = {}
+    for line in lines:
+        key, sep, value = line.partition(": ")
+        if sep and key.isupper():
+            fields[key] = value.strip()
+    try:
+        name, birth, type_text = fields["NAME"], fields["BIRTH"], fields["TYPE"]
+    except KeyError as e:
+        raise LineCodecError(f"{e.args[0]} 行がありません") from None
+    if not type_text.isdigit():
+        raise LineCodecError(f"TYPE が数値ではありません: {type_text!r}")
+    scores = None
+    if any(key in fields for key in SCORE_KEYS):
+        try:
+            scores = tuple(float(fields[key]) for key in SCORE_KEYS)
+        except (KeyError, ValueError):
+            raise LineCodecError("EX/OP/AG/CO/NE の行が揃っていません") from None
+    return LinePayload(name, birth, int(type_text), scores)
+
+
+def decode_message(text):
+    """
+    メッセージ本文（または LINE の URL 全体）を LinePayload にする。
+    compact / legacy は自動で判別する。形式が不正なら LineCodecError。
+    """
+    if text.startswith(LINE_OA_URL):
+        text = urllib.parse.unquote(text[len(LINE_OA_URL):])
+    lines = text.split("\n")
+    for line in lines:
+        if line.startswith("FS") and line[2:].partition(".")[0].isdigit():
+            if not line.startswith(COMPACT_PREFIX):
+                raise LineCodecError(f"未対応の compact 形式です: {line.partition('.')[0]}")
+            name = next((l[len("NAME: "):].strip() for l in lines if l.startswith("NAME: ")), DEFAULT_NAME)
+            return _decode_token(line.strip(), name)
+    return _decode_legacy(lines)
+
+
+# ==========================================
+# 3. Validation & Batch
+# ==========================================
+def validate(payload, check_type=True):
+    """値の範囲を検証する。check_type なら生年月日から求めたタイプと一致するかも見る"""
+    if not 1 <= payload.type_id <= 10:
+        raise LineCodecError(f"TYPE が範囲外です: {payload.type_id}")
+    birth = payload.birth
+    if len(birth) != 8 or not birth.isdigit():
+        raise LineCodecError(f"BIRTH が8桁の数字ではありません: {birth!r}")
+    try:
+        date_obj = datetime.date(int(birth[:4]), int(birth[4:6]), int(birth[6:]))
+    except ValueError:
+        raise LineCodecError(f"存在しない日付です: {birth}") from None
+    if payload.scores is not None and not all(1.0 <= v <= 5.0 for v in payload.scores):
+        raise LineCodecError(f"スコアが 1.0〜5.0 の範囲外です: {payload.scores}")
+    if check_type:
+        from fortune_engine import get_fortune_table
+        expected = get_fortune_table().analyze_date(date_obj)["gan"] + 1
+        if expected != payload.type_id:
+            raise LineCodecError(f"TYPE {payload.type_id} が生年月日のタイプ {expected} と一致しません")
+    return payload
+
+
+BatchResult = collections.namedtuple("BatchResult", ["payloads", "duplicates", "errors"])
+
+
+def decode_many(messages, check_type=True, seen=None):
+    """
+    メッセージ列をまとめてデコード・検証し、同じ内容の重複を除く。
+    errors は (入力中の位置, 理由) のリスト。seen に set を渡せば呼び出しをまたいで重複を判定する。
+    """
+    seen = set() if seen is None else seen
+    payloads, errors = [], []
+    duplicates = 0
+    for i, text in enumerate(messages):
+        try:
+            payload = validate(decode_message(text), check_type)
+        except LineCodecError as e:
+            errors.append((i, str(e)))
+            continue
+        if payload in seen:
+            duplicates += 1
+            continue
+        seen.add(payload)
+        payloads.append(payload)
+    return BatchResult(payloads, duplicates, errors)
+
+
+def read_backlog(path):
+    """1行1メッセージ（改行を含む legacy 形式は URL エンコード済みリンク）のファイルを読む"""
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            line = line.rstrip("\n")
+            if line:
+                yield line
+
+
+# ==========================================
+# 4. Local Stand-in Webhook
+# ==========================================
+def make_webhook_server(host, port, output=None, check_type=True):
+    """
+    LINE Messaging API の Webhook の代わりになるローカルサーバー。
+    POST /webhook に {"events": [{"type": "message", "message": {"type": "text", "text": ...}}]}
+    を受け取り、デコードした結果を output (JSON Lines) に追記する。
+    """
+    from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+    seen = set()
+    lock = threading.Lock()
+    out = open(output, "a", encoding="utf-8") if output else None
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_POST(self):
+            if self.path != "/webhook":
+                self.send_error(404)
+                return
+            try:
+                body = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))))
+                texts = [e["message"]["text"] for e in body.get("events", ())
+                         if e.get("type") == "message" and e.get("message", {}).get("type") == "text"]
+            except (ValueError, KeyError, TypeError, AttributeError):
+                self.send_error(400, "invalid webhook body")
+                return
+            with lock:
+                result = decode_many(texts, check_type, seen)
+                if out is not None:
+                    out.writelines(json.dumps(p.to_dict(), ensure_ascii=False) + "\n" for p in result.payloads)
+                    out.flush()
+            reply = json.dumps({
+                "accepted": len(result.payloads),
+                "duplicates": result.duplicates,
+                "invalid": len(result.errors),
+            }).encode("utf-8")
+            self.send_response(200)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(reply)))
+            self.end_headers()
+            self.wfile.write(reply)
+
+        def log_message(self, format, *args):
+            pass
+
+    server = ThreadingHTTPServer((host, port), Handler)
+    server.output_file = out
+    return server
+
+
+def replay(messages, url, batch_size=1000):
+    """メッセージを batch_size 件ずつ Webhook 形式で送り、応答を合計して返す"""
+    import urllib.request
+
+    totals = collections.Counter()
+    batch = []
+
+    def flush():
+        body = json.dumps({"events": [
+            {"type": "message", "message": {"type": "text", "text": text}} for text in batch
+        ]}, ensure_ascii=False).encode("utf-8")
+        request = urllib.request.Request(url, data=body, headers={"Content-Type": "application/json"})
+        with urllib.request.urlopen(request) as response:
+            totals.update(json.loads(response.read()))
+        batch.clear()
+
+    for text in messages:
+        batch.append(text)
+        if len(batch) >= batch_size:
+            flush()
+    if batch:
+        flush()
+    return dict(totals)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="LINE 連携メッセージのデコード・検証")
+    sub = parser.add_subparsers(dest="command", required=True)
+    p = sub.add_parser("decode", help="滞留メッセージをデコードして JSON Lines で出力する")
+    p.add_argument("backlog", help="1行1メッセージのファイル")
+    p.add_argument("--no-type-check", action="store_true", help="生年月日とタイプの整合性を確認しない")
+    p = sub.add_parser("serve", help="ローカルの Webhook 代替サーバーを起動する")
+    p.add_argument("--host", default="127.0.0.1")
+    p.add_argument("--port", type=int, default=8787)
+    p.add_argument("--output", help="受け取った結果を追記する JSON Lines")
+    p.add_argument("--no-type-check", action="store_true")
+    p = sub.add_parser("replay", help="滞留メッセージを Webhook に送る")
+    p.add_argument("backlog")
+    p.add_argument("--url", default="http://127.0.0.1:8787/webhook")
+    p.add_argument("--batch-size", type=int, default=1000)
+    args = parser.parse_args(argv)
+
+    if args.command == "decode":
+        result = decode_many(read_backlog(args.backlog), not args.no_type_check)
+        for payload in result.payloads:
+            sys.stdout.write(json.dumps(payload.to_dict(), ensure_ascii=False) + "\n")
+        for i, reason in result.errors:
+            print(f"line {i + 1}: {reason}", file=sys.stderr)
+        print(f"{len(result.payloads)} decoded, {result.duplicates} duplicates, {len(result.errors)} invalid",
+              file=sys.stderr)
+    elif args.command == "serve":
+        server = make_webhook_server(args.host, args.port, args.output, not args.no_type_check)
+        print(f"listening on http://{args.host}:{args.port}/webhook", file=sys.stderr)
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            server.server_close()
+    else:
+        print(json.dumps(replay(read_backlog(args.backlog), args.url, args.batch_size)))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
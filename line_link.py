@@ -0,0 +1,75 @@
+"""
+LINE 連携（GAS 解析用）のメッセージとリンクの組み立て
+
+render_result_component の中にあった f-string をそのまま関数にしたもの。
+名前以外の部分は (生年月日, タイプ, Big Five) だけで決まるので、URLエンコード済みの
+前半・後半を作っておき、描画時は名前だけをエンコードして挟めるようにしてある。
+FATE_LINE_FORMAT=compact にすると、line_codec の短い形式（チェックサム付きトークン）で送る。
+"""
+import collections
+import os
+import urllib.parse
+
+LINE_OA_URL = "https://line.me/R/oaMessage/@736ihkeb/?"
+DEFAULT_NAME = "名無し"
+# "legacy"（従来の自由文） / "compact"（line_codec のトークン形式）
+LINE_FORMAT = os.environ.get("FATE_LINE_FORMAT", "legacy")
+
+HEADER_LINES = (
+    "【診断データ送信】",
+    "詳細レポートとステータスカードを作成します。",
+    "このまま送信してください👇",
+    "----------------",
+)
+FOOTER_LINE = "----------------"
+
+LinkParts = collections.namedtuple("LinkParts", ["head", "tail"])
+
+
+def _score_lines(big5_norm):
+    if not big5_norm:
+        return []
+    # 短縮キーでスコアを埋め込む
+    return [
+        f"EX: {big5_norm.get('Extraversion', 3.0)}",
+        f"OP: {big5_norm.get('Openness', 3.0)}",
+        f"AG: {big5_norm.get('Agreeableness', 3.0)}",
+        f"CO: {big5_norm.get('Conscientiousness', 3.0)}",
+        # Neuroticismは反転せず生の値を送る（GAS側で処理統一するため）
+        f"NE: {big5_norm.get('Neuroticism', 3.0)}",
+    ]
+
+
+def build_line_message(user_name, dob_str, type_id, big5_norm=None):
+    """メッセージ作成（GAS解析用フォーマット）。名前が空なら「名無し」"""
+    if LINE_FORMAT == "compact":
+        import line_codec
+        return line_codec.encode_compact(line_codec.payload_from_result(user_name, dob_str, type_id, big5_norm))
+    safe_name = user_name if user_name else DEFAULT_NAME
+    lines = list(HEADER_LINES) + [
+        f"NAME: {safe_name}",
+        f"BIRTH: {dob_str}",
+        f"TYPE: {type_id}",
+    ] + _score_lines(big5_norm) + [FOOTER_LINE]
+    return "\n".join(lines)
+
+
+def build_line_link(user_name, dob_str, type_id, big5_norm=None):
+    return LINE_OA_URL + urllib.parse.quote(build_line_message(user_name, dob_str, type_id, big5_norm))
+
+
+def build_link_parts(dob_str, type_id, big5_norm=None):
+    """名前の前後で分けたエンコード済みメッセージ（quote は1文字単位なので連結しても同じ結果になる）"""
+    if LINE_FORMAT == "compact":
+        import line_codec
+        token = line_codec.encode_token(line_codec.payload_from_result(None, dob_str, type_id, big5_norm))
+        head = "\n".join(line_codec.COMPACT_HEADER_LINES) + "\nNAME: "
+        return LinkParts(urllib.parse.quote(head), urllib.parse.quote("\n" + token))
+    head = "\n".join(HEADER_LINES) + "\nNAME: "
+    tail = "\n" + "\n".join([f"BIRTH: {dob_str}", f"TYPE: {type_id}"] + _score_lines(big5_norm) + [FOOTER_LINE])
+    return LinkParts(urllib.parse.quote(head), urllib.parse.quote(tail))
+
+
+def link_from_parts(parts, user_name):
+    safe_name = user_name if user_name else DEFAULT_NAME
+    return LINE_OA_URL + parts.head + urllib.parse.quote(safe_name) + parts.tail
@@ -0,0 +1,250 @@
+"""
+Big Five の規準（ノルム）
+
+TIPI の素点は特性ごとに 2〜14 の13通りしかないため、参照データの素点の度数を
+[層, 特性, 素点] の表に数えておけば、経験累積分布 (CDF) による百分位は表を1回引くだけで求まる。
+層は 0 が全体、1 以降が生まれ年から決める年齢帯（人数の少ない年齢帯は全体の分布で代用）。
+百分位 p (0〜1, 同点は半分として数える mid-rank) を 1 + 4p で 1-5段階に写し、
+これまでの 1-5段階 (calculate_big5) と同じ範囲のまま「ほかの人と比べた位置」を表す。
+
+規準ファイル (data/big5_norms.npz) が無い場合は従来の線形の式にフォールバックする。
+numpy は規準を読む・数えるときにだけ import する（既定の構成では fortune_engine 経由で
+app.py の起動に numpy を持ち込まない）。
+規準を更新したら rescore で過去のデータを一括で採点し直す。
+
+    FATE_BIG5_NORMS=data/big5_norms.npz   規準ファイルのパス（"0" で無効）
+
+CLI:
+    python norms.py build events/*.parquet [--output data/big5_norms.npz]
+    python norms.py rescore input.parquet output.parquet
+"""
+import argparse
+import bisect
+import datetime
+import os
+import sys
+import threading
+
+NORMS_PATH = os.environ.get(
+    "FATE_BIG5_NORMS", os.path.join(os.path.dirname(os.path.abspath(__file__)), "data", "big5_norms.npz")
+)
+BIG5_KEYS = ("Extraversion", "Agreeableness", "Conscientiousness", "Neuroticism", "Openness")
+RAW_MIN, RAW_MAX = 2, 14
+RAW_COUNT = RAW_MAX - RAW_MIN + 1
+# これより回答者の少ない年齢帯は、その年齢帯の分布ではなく全体の分布で採点する
+MIN_STRATUM_SIZE = 200
+_FORMAT_VERSION = 1
+
+
+def _scores_from_counts(counts):
+    """度数 [層, 特性, 素点] → mid-rank 百分位を 1-5段階にした表（小数1桁）"""
+    import numpy as np
+    counts = counts.astype(np.float64)
+    total = counts.sum(axis=-1, keepdims=True)
+    below = np.cumsum(counts, axis=-1) - counts
+    with np.errstate(invalid="ignore", divide="ignore"):
+        p = (below + counts / 2) / total
+    return np.round(1 + 4 * np.nan_to_num(p, nan=0.5), 1)
+
+
+def _strata_many(age_edges, birth_years, n, as_of_year=None):
+    """Norms.stratum の配列版（生まれ年が不明・未来の行は全体 = 0）"""
+    import numpy as np
+    if birth_years is None:
+        return np.zeros(n, dtype=np.intp)
+    years = np.asarray(birth_years, dtype=np.float64)
+    ages = (as_of_year or datetime.date.today().year) - years
+    known = np.isfinite(years) & (years > 0) & (ages >= 0)
+    strata = np.searchsorted(np.array(age_edges), np.where(known, ages, 0), side="right")
+    return np.where(known, strata, 0)
+
+
+class Norms:
+    """
+    counts[層, 特性, 素点 - 2] の度数と、年齢帯の下限年齢 age_edges から引く規準。
+    層 0 が全体、層 i (1 以上) は age_edges[i - 1] 歳以上の年齢帯。
+    """
+
+    def __init__(self, counts, age_edges):
+        import numpy as np
+        self.counts = np.asarray(counts, dtype=np.uint32)
+        self.age_edges = tuple(int(a) for a in age_edges)
+        sizes = self.counts[:, 0].sum(axis=-1)
+        # 人数の少ない年齢帯は全体の分布で置き換えた表を引く
+        effective = self.counts.copy()
+        effective[1:][sizes[1:] < MIN_STRATUM_SIZE] = self.counts[0]
+        self.score_table = _scores_from_counts(effective)
+        # 1件ずつの採点は NumPy を経由せずタプルを直接引く
+        self._rows = tuple(tuple(tuple(float(v) for v in trait) for trait in layer) for layer in self.score_table)
+
+    @property
+    def size(self):
+        """参照データの人数"""
+        return int(self.counts[0, 0].sum())
+
+    def save(self, path=NORMS_PATH):
+        import numpy as np
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        tmp_path = f"{path}.tmp.npz"
+        np.savez_compressed(tmp_path, counts=self.counts, age_edges=np.array(self.age_edges, dtype=np.int16),
+                            meta=np.array([_FORMAT_VERSION]))
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, path=NORMS_PATH):
+        """保存済みの規準を読む。形式が違えば ValueError"""
+        import numpy as np
+        with np.load(path) as data:
+            if data["meta"].tolist() != [_FORMAT_VERSION]:
+                raise ValueError(f"規準ファイルの形式が一致しません: {path}")
+            counts, age_edges = data["counts"], data["age_edges"]
+        if counts.shape != (len(age_edges) + 1, len(BIG5_KEYS), RAW_COUNT):
+            raise ValueError(f"規準ファイルの大きさが一致しません: {path}")
+        return cls(counts, age_edges)
+
+    # --- 1件 ---
+    def stratum(self, birth_year=None, as_of_year=None):
+        """生まれ年 → 層の番号（不明なら全体 = 0）"""
+        if not birth_year:
+            return 0
+        age = (as_of_year or datetime.date.today().year) - birth_year
+        if age < 0:
+            return 0
+        return bisect.bisect_right(self.age_edges, age)
+
+    def score(self, scores_raw, birth_year=None, as_of_year=None):
+        """素点の dict → 1-5段階の dict（calculate_big5 の scores_norm と同じ形）"""
+        layer = self._rows[self.stratum(birth_year, as_of_year)]
+        return {key: layer[i][scores_raw[key] - RAW_MIN] for i, key in enumerate(BIG5_KEYS)}
+
+    # --- 配列 ---
+    def score_many(self, scores_raw, birth_years=None, as_of_year=None):
+        """素点の配列 dict → 1-5段階の配列 dict。素点が範囲外の行は NaN"""
+        import numpy as np
+        n = len(scores_raw[BIG5_KEYS[0]])
+        strata = _strata_many(self.age_edges, birth_years, n, as_of_year)
+        out = {}
+        for i, key in enumerate(BIG5_KEYS):
+            raw = np.asarray(scores_raw[key], dtype=np.int64)
+            valid = (raw >= RAW_MIN) & (raw <= RAW_MAX)
+            values = self.score_table[strata, i, np.where(valid, raw - RAW_MIN, 0)]
+            out[key] = np.where(valid, values, np.nan)
+        return out
+
+
+# ==========================================
+# 1. Build
+# ==========================================
+def _birth_years(df):
+    """dob 列か birth_year 列から生まれ年の配列（無ければ None）"""
+    import numpy as np
+    if "birth_year" in df.columns:
+        return df["birth_year"].to_numpy(dtype=np.float64, na_value=np.nan)
+    if "dob" in df.columns:
+        import fortune_batch
+        days = fortune_batch.to_datetime64(df["dob"])
+        years = days.astype("datetime64[Y]").astype(np.int64) + 1970
+        return np.where(np.isnat(days), np.nan, years.astype(np.float64))
+    return None
+
+
+def count_frame(df, age_edges, as_of_year=None):
+    """DataFrame 1チャンク分の度数 [層, 特性, 素点]"""
+    import numpy as np
+    import fortune_batch
+    raw, _ = fortune_batch.calculate_big5_many(df, use_norms=False)
+    birth_years = _birth_years(df)
+    counts = np.zeros((len(age_edges) + 1, len(BIG5_KEYS), RAW_COUNT), dtype=np.uint32)
+    strata = _strata_many(age_edges, birth_years, len(df), as_of_year)
+    for i, key in enumerate(BIG5_KEYS):
+        values = raw[key]
+        valid = values >= RAW_MIN
+        flat = strata[valid] * RAW_COUNT + (values[valid] - RAW_MIN)
+        counts[:, i] += np.bincount(flat, minlength=counts.shape[0] * RAW_COUNT).reshape(-1, RAW_COUNT).astype(np.uint32)
+    # 層 0 (全体) は年齢の分かる人も分からない人も全員を数える
+    counts[0] = counts.sum(axis=0)
+    return counts
+
+
+def build(paths, as_of_year=None, chunksize=200_000):
+    """参照データ (Q1〜Q10 と dob または birth_year の列を持つ CSV / Parquet) から規準を作る"""
+    import numpy as np
+    import fortune_batch
+    from population import AGE_BANDS
+    age_edges = tuple(low for low, _, _ in AGE_BANDS)
+    counts = np.zeros((len(age_edges) + 1, len(BIG5_KEYS), RAW_COUNT), dtype=np.uint64)
+    for path in paths:
+        for chunk in fortune_batch.iter_chunks(path, chunksize):
+            counts += count_frame(chunk, age_edges, as_of_year)
+    return Norms(counts, age_edges)
+
+
+_norms = None
+_norms_loaded = False
+_norms_lock = threading.Lock()
+
+
+def get_norms():
+    """プロセス内で共有する規準。規準ファイルが無い・無効化されていれば None（線形の式を使う）"""
+    global _norms, _norms_loaded
+    if not _norms_loaded:
+        with _norms_lock:
+            if not _norms_loaded:
+                if NORMS_PATH != "0" and os.path.exists(NORMS_PATH):
+                    try:
+                        _norms = Norms.load(NORMS_PATH)
+                    except (OSError, ValueError, KeyError):
+                        _norms = None
+                _norms_loaded = True
+    return _norms
+
+
+# ==========================================
+# 2. CLI
+# ==========================================
+def rescore_frame(df, norms):
+    """Q1〜Q10 を持つ DataFrame の Big Five 列を規準で採点し直す"""
+    import fortune_batch
+    out = df.copy()
+    raw, _ = fortune_batch.calculate_big5_many(df, use_norms=False)
+    scored = norms.score_many(raw, _birth_years(df))
+    for key in BIG5_KEYS:
+        out[key] = scored[key]
+    return out
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Big Five の規準を作る・規準で採点し直す")
+    sub = parser.add_subparsers(dest="command", required=True)
+    p = sub.add_parser("build", help="参照データから規準を作って保存する")
+    p.add_argument("inputs", nargs="+", help="Q1〜Q10 と dob / birth_year の列を持つ .csv / .parquet")
+    p.add_argument("--output", default=NORMS_PATH)
+    p.add_argument("--as-of-year", type=int, default=None, help="年齢を数える基準年 (既定: 今年)")
+    p = sub.add_parser("rescore", help="過去のデータを規準で一括採点し直す")
+    p.add_argument("input")
+    p.add_argument("output")
+    p.add_argument("--norms", default=NORMS_PATH)
+    p.add_argument("--chunksize", type=int, default=200_000)
+    args = parser.parse_args(argv)
+
+    if args.command == "build":
+        norms = build(args.inputs, args.as_of_year)
+        norms.save(args.output)
+        strata = norms.counts[:, 0].sum(axis=-1).tolist()
+        print(f"{args.output}: {norms.size} respondents, per stratum {strata}", file=sys.stderr)
+        return 0
+
+    import fortune_batch
+    norms = Norms.load(args.norms)
+    writer = fortune_batch.ChunkWriter(args.output)
+    try:
+        for chunk in fortune_batch.iter_chunks(args.input, args.chunksize):
+            writer.write(rescore_frame(chunk, norms))
+            print(f"{writer.rows} rows", file=sys.stderr)
+    finally:
+        writer.close()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,160 @@
+"""
+生年月日の全範囲にわたるタイプ・FATE Code の分布
+
+対応範囲 (1900〜2100年) の全日付をエンジンで1度だけ解析し、
+(生まれ年, 生まれ月, タイプ, FATE Code) ごとの日数を uint8 の4次元配列にまとめて保存する。
+ダッシュボードやアドホックな集計はこの配列を足し合わせるだけで、エンジンを回し直さない。
+構築は年ごとに分けてプロセスプールで並列に行う。
+
+CLI:
+    python population.py build [--processes 4]
+"""
+import argparse
+import concurrent.futures
+import datetime
+import os
+import sys
+import threading
+
+import numpy as np
+
+from fortune_engine import ENGINE_VERSION, FATE_CODES, TABLE_END, TABLE_START, FortuneEngineIntegrated
+
+POPULATION_PATH = os.environ.get(
+    "FATE_POPULATION_PATH", os.path.join(os.path.dirname(os.path.abspath(__file__)), "data", "population.npz")
+)
+START_YEAR, END_YEAR = TABLE_START.year, TABLE_END.year
+TYPE_COUNT = 10
+# 1つの年を1タスクにすると細かすぎるので、この年数ずつワーカーに渡す
+YEARS_PER_TASK = 10
+
+# (下限年齢, 上限年齢, ラベル)。年齢は「基準年 - 生まれ年」で数える
+AGE_BANDS = (
+    (0, 9, "10歳未満"), (10, 19, "10代"), (20, 29, "20代"), (30, 39, "30代"),
+    (40, 49, "40代"), (50, 59, "50代"), (60, 69, "60代"), (70, 200, "70歳以上"),
+)
+
+
+# ==========================================
+# 1. Build (Process Pool)
+# ==========================================
+def _count_years(first_year, last_year):
+    """first_year〜last_year の (年, 月, タイプ, コード) ごとの日数"""
+    engine = FortuneEngineIntegrated()
+    code_index = {code: i for i, code in enumerate(FATE_CODES)}
+    cube = np.zeros((last_year - first_year + 1, 12, TYPE_COUNT, len(FATE_CODES)), dtype=np.uint8)
+    date_obj = datetime.date(first_year, 1, 1)
+    end = datetime.date(last_year, 12, 31)
+    one_day = datetime.timedelta(days=1)
+    while date_obj <= end:
+        result = engine.analyze_date(date_obj)
+        cube[date_obj.year - first_year, date_obj.month - 1, result["gan"], code_index[result["fate_code"]]] += 1
+        date_obj += one_day
+    return cube
+
+
+def build(processes=None, start_year=START_YEAR, end_year=END_YEAR):
+    """全範囲の分布を年単位に分けて並列に集計する"""
+    spans = [(y, min(y + YEARS_PER_TASK - 1, end_year)) for y in range(start_year, end_year + 1, YEARS_PER_TASK)]
+    with concurrent.futures.ProcessPoolExecutor(processes) as pool:
+        parts = pool.map(_count_years, *zip(*spans))
+        return Population(np.concatenate(list(parts)), start_year)
+
+
+# ==========================================
+# 2. Storage & Queries
+# ==========================================
+class Population:
+    """cube[生まれ年 - start_year, 月 - 1, タイプ(0始まり), FATE Code の番号] = 日数"""
+
+    def __init__(self, cube, start_year=START_YEAR):
+        self.cube = cube
+        self.start_year = start_year
+        self.end_year = start_year + cube.shape[0] - 1
+
+    def save(self, path=POPULATION_PATH):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = f"{path}.tmp.npz"
+        np.savez_compressed(tmp_path, cube=self.cube, meta=np.array([ENGINE_VERSION, self.start_year]))
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, path=POPULATION_PATH):
+        """保存済みの集計を読む。エンジンのバージョンが違えば ValueError"""
+        with np.load(path) as data:
+            version, start_year = data["meta"].tolist()
+            if version != ENGINE_VERSION:
+                raise ValueError(f"集計のエンジンバージョン {version} が現在の {ENGINE_VERSION} と一致しません: {path}")
+            return cls(data["cube"], start_year)
+
+    def select(self, years=None, months=None):
+        """生まれ年の範囲 (両端を含む) と月のリストで絞り込んだ部分配列 [年, 月, タイプ, コード]"""
+        first, last = years or (self.start_year, self.end_year)
+        cube = self.cube[max(first, self.start_year) - self.start_year:max(last - self.start_year + 1, 0)]
+        if months:
+            cube = cube[:, [m - 1 for m in months]]
+        return cube
+
+    def counts(self, years=None, months=None):
+        """タイプ × FATE Code の日数 (10×16)"""
+        return self.select(years, months).sum(axis=(0, 1), dtype=np.int64)
+
+    def by_year(self, years=None, months=None):
+        """生まれ年 × タイプ、生まれ年 × FATE Code の日数"""
+        cube = self.select(years, months).astype(np.int64)
+        return cube.sum(axis=(1, 3)), cube.sum(axis=(1, 2))
+
+    def by_month(self, years=None):
+        """生まれ月 × タイプ、生まれ月 × FATE Code の日数"""
+        cube = self.select(years).astype(np.int64)
+        return cube.sum(axis=(0, 3)), cube.sum(axis=(0, 2))
+
+    def by_age_band(self, reference_year=None, months=None):
+        """年齢帯のラベル → タイプ × FATE Code の日数（基準年は既定で今年）"""
+        reference_year = reference_year or datetime.date.today().year
+        return {
+            label: self.counts((reference_year - high, reference_year - low), months)
+            for low, high, label in AGE_BANDS
+        }
+
+
+_population = None
+_population_lock = threading.Lock()
+
+
+def get_population():
+    """
+    プロセス内で共有する集計。保存済みのファイルが無い・古い場合はその場で構築して保存する。
+    """
+    global _population
+    if _population is None:
+        with _population_lock:
+            if _population is None:
+                try:
+                    _population = Population.load()
+                except (OSError, ValueError, KeyError):
+                    _population = build()
+                    try:
+                        _population.save()
+                    except OSError:
+                        pass
+    return _population
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="タイプ・FATE Code の分布を集計する")
+    sub = parser.add_subparsers(dest="command", required=True)
+    p = sub.add_parser("build", help="全範囲を集計して保存する")
+    p.add_argument("--processes", type=int, default=None, help="ワーカー数 (既定: CPU 数)")
+    p.add_argument("--output", default=POPULATION_PATH)
+    args = parser.parse_args(argv)
+
+    population = build(args.processes)
+    population.save(args.output)
+    print(f"{args.output}: {population.start_year}-{population.end_year}, {int(population.cube.sum())} days",
+          file=sys.stderr)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
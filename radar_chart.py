@@ -0,0 +1,162 @@
+"""
+レーダーチャートの軽量 SVG レンダラー
+
+宿命スコアは 1〜5 の整数、Big Five は 1.0〜5.0 の 0.1 刻みしか取らないため、
+量子化したスコアの組をキーに LRU キャッシュし、同じチャートは二度描かない。
+Plotly の JSON と plotly.js を送る代わりに、数KBの <img> (SVG data URI) を返す。
+従来の Plotly 版 (FATE_RADAR_RENDERER=plotly) の Figure も同じキーでプロセス内に共有する。
+"""
+import base64
+import functools
+import math
+
+CATEGORIES = ['外向性', '開放性', '協調性', '勤勉性', '安定性']
+FATE_KEYS = ('Identity', 'Create', 'Economy', 'Status', 'Vitality')
+FATE_COLOR = '#E65100'
+BIG5_COLOR = '#1A237E'
+FATE_LABEL = '宿命(表)'
+BIG5_LABEL = '現在(裏)'
+
+WIDTH, HEIGHT = 400, 350
+CENTER_X, CENTER_Y = 200, 190
+RADIUS = 120
+MAX_VALUE = 5
+FONT_FAMILY = '"Helvetica Neue", Arial, "Hiragino Kaku Gothic ProN", "Hiragino Sans", Meiryo, sans-serif'
+
+
+# ==========================================
+# 1. Quantize
+# ==========================================
+def fate_key(fate_scores):
+    """宿命スコア dict → (整数 x5) のキャッシュキー"""
+    return tuple(int(fate_scores[k]) for k in FATE_KEYS)
+
+
+def big5_key(big5_norm):
+    """Big Five dict → 0.1刻みを10倍した整数 x5 のキャッシュキー（チャートと同じ並び・安定性は反転）"""
+    if not big5_norm:
+        return None
+    values = (
+        big5_norm['Extraversion'], big5_norm['Openness'], big5_norm['Agreeableness'],
+        big5_norm['Conscientiousness'], 6 - big5_norm['Neuroticism'],
+    )
+    return tuple(int(round(v * 10)) for v in values)
+
+
+# ==========================================
+# 2. SVG Builder
+# ==========================================
+def _point(axis, value):
+    # Plotly の既定と同じく、1軸目を右(0度)に置いて反時計回りに並べる
+    angle = 2 * math.pi * axis / len(CATEGORIES)
+    r = RADIUS * value / MAX_VALUE
+    return CENTER_X + r * math.cos(angle), CENTER_Y - r * math.sin(angle)
+
+
+def _polygon(values, **attrs):
+    points = " ".join(f"{x:.1f},{y:.1f}" for x, y in (_point(i, v) for i, v in enumerate(values)))
+    attr_text = " ".join(f'{k.replace("_", "-")}="{v}"' for k, v in attrs.items())
+    return f'<polygon points="{points}" {attr_text}/>'
+
+
+def _grid():
+    parts = []
+    for level in range(1, MAX_VALUE + 1):
+        parts.append(_polygon([level] * len(CATEGORIES), fill="none", stroke="#E0E0E0", stroke_width=1))
+        x, y = _point(0, level)
+        parts.append(f'<text x="{x + 2:.1f}" y="{y + 12:.1f}" font-size="10" fill="#999">{level}</text>')
+    for i, label in enumerate(CATEGORIES):
+        x, y = _point(i, MAX_VALUE)
+        parts.append(f'<line x1="{CENTER_X}" y1="{CENTER_Y}" x2="{x:.1f}" y2="{y:.1f}" stroke="#E0E0E0" stroke-width="1"/>')
+        lx, ly = _point(i, MAX_VALUE + 0.9)
+        anchor = "start" if lx > CENTER_X + 1 else ("end" if lx < CENTER_X - 1 else "middle")
+        parts.append(f'<text x="{lx:.1f}" y="{ly + 4:.1f}" font-size="13" fill="#333" text-anchor="{anchor}">{label}</text>')
+    return parts
+
+
+def _legend(series):
+    parts = []
+    x = WIDTH - 10
+    for label, color in reversed(series):
+        width = 22 + 13 * len(label)
+        x -= width
+        parts.append(f'<rect x="{x}" y="6" width="16" height="10" fill="{color}" fill-opacity="0.5" stroke="{color}"/>')
+        parts.append(f'<text x="{x + 20}" y="15" font-size="12" fill="#333">{label}</text>')
+    return parts
+
+
+@functools.lru_cache(maxsize=4096)
+def _render_svg(fate, big5):
+    series = [(FATE_LABEL, FATE_COLOR)]
+    shapes = [_polygon(fate, fill=FATE_COLOR, fill_opacity=0.5, stroke=FATE_COLOR, stroke_width=2)]
+    if big5 is not None:
+        series.append((BIG5_LABEL, BIG5_COLOR))
+        shapes.append(_polygon([v / 10 for v in big5], fill=BIG5_COLOR, fill_opacity=0.5, stroke=BIG5_COLOR, stroke_width=2))
+    body = "".join(_grid() + shapes + _legend(series))
+    return (
+        f'<svg xmlns="http://www.w3.org/2000/svg" viewBox="0 0 {WIDTH} {HEIGHT}" '
+        f'font-family=\'{FONT_FAMILY}\'>{body}</svg>'
+    )
+
+
+@functools.lru_cache(maxsize=4096)
+def _render_img_html(fate, big5):
+    encoded = base64.b64encode(_render_svg(fate, big5).encode("utf-8")).decode("ascii")
+    return (
+        f'<img src="data:image/svg+xml;base64,{encoded}" alt="レーダーチャート" class="radar-img">'
+    )
+
+
+@functools.lru_cache(maxsize=1024)
+def _plotly_figure(fate, big5):
+    # plotly の import は重いので、この描画方式を使うときまで遅らせる
+    import plotly.graph_objects as go
+
+    fig = go.Figure()
+    fig.add_trace(go.Scatterpolar(r=list(fate), theta=CATEGORIES, fill='toself', name=FATE_LABEL, line_color=FATE_COLOR))
+    if big5 is not None:
+        fig.add_trace(go.Scatterpolar(r=[v / 10 for v in big5], theta=CATEGORIES, fill='toself', name=BIG5_LABEL, line_color=BIG5_COLOR))
+    fig.update_layout(
+        polar=dict(
+            radialaxis=dict(visible=True, range=[0, MAX_VALUE], tickfont=dict(color='#999')),
+            bgcolor='rgba(0,0,0,0)'
+        ),
+        paper_bgcolor='rgba(0,0,0,0)',
+        plot_bgcolor='rgba(0,0,0,0)',
+        height=HEIGHT,
+        margin=dict(t=20, b=20, l=40, r=40),
+        legend=dict(orientation="h", yanchor="bottom", y=1.02, xanchor="right", x=1, font=dict(color='#333')),
+        font=dict(color='#333')
+    )
+    return fig
+
+
+# ==========================================
+# 3. Public API
+# ==========================================
+def radar_svg(fate_scores, big5_norm=None):
+    """SVG 文字列を返す（量子化したスコアをキーにキャッシュ）"""
+    return _render_svg(fate_key(fate_scores), big5_key(big5_norm))
+
+
+def radar_img_html(fate_scores, big5_norm=None):
+    """st.markdown にそのまま渡せる <img> タグを返す"""
+    return _render_img_html(fate_key(fate_scores), big5_key(big5_norm))
+
+
+def plotly_figure(fate_scores, big5_norm=None):
+    """
+    Plotly 版の Figure（量子化したスコアをキーに全セッションで共有）。
+    共有オブジェクトなので呼び出し側で書き換えないこと。
+    """
+    return _plotly_figure(fate_key(fate_scores), big5_key(big5_norm))
+
+
+def prewarm(fate_score_list):
+    """図鑑など事前に分かっているチャートをキャッシュに載せておく"""
+    for fate_scores in fate_score_list:
+        radar_img_html(fate_scores)
+
+
+def cache_info():
+    return _render_img_html.cache_info()
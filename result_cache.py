@@ -0,0 +1,118 @@
+"""
+セッションをまたいで共有する診断結果のキャッシュ
+
+同じ生年月日（・出生時刻）・同じ TIPI 回答の送信はユーザーをまたいで何度も来るため、
+正規化した入力をキーにエンジン結果・Big Five・LINE リンクの部品を LRU で保持する。
+ヒット / ミス / 追い出しの回数を数えて、本番での効き具合を確認できるようにしている。
+"""
+import collections
+import datetime
+import logging
+import os
+import threading
+
+from fortune_engine import calculate_big5, get_fortune_table
+from instrumentation import span
+from line_link import build_link_parts
+
+logger = logging.getLogger("fate.cache")
+
+TIPI_KEYS = tuple(f"Q{i}" for i in range(1, 11))
+DEFAULT_MAXSIZE = int(os.environ.get("FATE_RESULT_CACHE_SIZE", "10000"))
+# この回数ごとに統計をログに出す
+LOG_EVERY = 1000
+
+
+class LRUCache:
+    """スレッドセーフなサイズ上限付き LRU（カウンタ付き）"""
+
+    def __init__(self, maxsize=DEFAULT_MAXSIZE):
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._data = collections.OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            value = self._data.get(key)
+            if value is None:
+                self.misses += 1
+                return None
+            self._data.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def put(self, key, value):
+        with self._lock:
+            self._data[key] = value
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+                self.evictions += 1
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+            self.hits = self.misses = self.evictions = 0
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "size": len(self._data),
+                "maxsize": self.maxsize,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+            }
+
+
+_cache = LRUCache()
+
+
+def cache_key(date_obj, answers, minute=None):
+    """正規化したキー: (日付の序数, Q1〜Q10 の回答タプル, 出生時刻の分 or None)"""
+    return date_obj.toordinal(), tuple(int(answers[k]) for k in TIPI_KEYS), minute
+
+
+def _compute(date_obj, answers, minute=None):
+    with span("engine"):
+        result = get_fortune_table().analyze_date(date_obj, minute)
+    with span("big5"):
+        _, big5_norm = calculate_big5(answers, date_obj.year)
+    return {
+        "result": result,
+        "big5_norm": big5_norm,
+        "line_parts": build_link_parts(f"{date_obj.year:04d}{date_obj.month:02d}{date_obj.day:02d}", result["gan"] + 1, big5_norm),
+    }
+
+
+def diagnose(date_obj, answers, minute=None):
+    """
+    診断結果を返す（キャッシュ済みならそれを返す）。minute は出生時刻（0時からの分, 不明なら None）。
+    戻り値は共有オブジェクトなので呼び出し側で書き換えないこと。
+    """
+    return diagnose_by_key(cache_key(date_obj, answers, minute))
+
+
+def diagnose_by_key(key):
+    """
+    cache_key() のキーから診断結果を返す。セッションには結果そのものではなくこのキーだけを持たせ、
+    追い出された後の再実行でもキーから計算し直せるようにしている。
+    """
+    entry = _cache.get(key)
+    if entry is None:
+        ordinal, answers, minute = key
+        entry = _compute(datetime.date.fromordinal(ordinal), dict(zip(TIPI_KEYS, answers)), minute)
+        _cache.put(key, entry)
+    lookups = _cache.hits + _cache.misses
+    if lookups % LOG_EVERY == 0:
+        logger.info("result cache %s", _cache.stats())
+    return entry
+
+
+def stats():
+    return _cache.stats()
@@ -0,0 +1,327 @@
+"""
+タイプ・FATE Code・スコアの組み合わせ → 生年月日の逆引き
+
+「1990年代でタイプ3・FATE Code が LRDM になるのはどの日か」のような問いに、
+全日付を analyze_basic し直さずに答えるための索引。
+参照テーブル (FortuneTable) の全日付を (タイプ, FATE Code) のキーごとに並べ替え、
+キーごとの日付の並びをランレングス（開始日と件数）にして保存する。
+
+日干は10日で一巡するため、同じキー（=同じタイプ）の日付は必ず10日おきの格子の上にある。
+そこでランは「10日おきに同じキーが続く区間」として数える（7.3万日が約4.5万ラン）。
+5つのスコアの組み合わせ（プロファイル）は日支で毎日変わりランにならないので、キーには含めず
+日付順の列として別に持ち、スコアの条件はランを展開した日付にこの列を引いて絞り込む。
+結果は連続した日付の区間 (開始日, 終了日) にまとめて返す。出生時刻（時柱）なしの結果が対象。
+
+    FATE_REVERSE_INDEX_PATH=data/reverse_index.npz   保存先
+
+CLI:
+    python reverse_index.py build
+    python reverse_index.py query --type 3 --fate-code LRDM --from 19900101 --to 19991231
+    python reverse_index.py query --fate-code LRDM --score Identity=4 --score Create=2-5 --format json
+"""
+import argparse
+import collections
+import datetime
+import json
+import os
+import sys
+import threading
+
+import numpy as np
+
+from fortune_engine import ENGINE_VERSION, FATE_CODES, SCORE_KEYS, get_fortune_table
+
+REVERSE_INDEX_PATH = os.environ.get(
+    "FATE_REVERSE_INDEX_PATH", os.path.join(os.path.dirname(os.path.abspath(__file__)), "data", "reverse_index.npz")
+)
+TYPE_COUNT = 10
+SCORE_MIN, SCORE_MAX = 1, 5
+SCORE_LEVELS = SCORE_MAX - SCORE_MIN + 1
+PROFILE_COUNT = SCORE_LEVELS ** len(SCORE_KEYS)
+# 同じタイプ（日干）が巡ってくる間隔
+STRIDE = 10
+_FORMAT_VERSION = 2
+
+
+def encode_profile(scores):
+    """5スコアの並び → プロファイルの番号 (0〜3124)。配列でもそのまま計算できる"""
+    profile = 0
+    for score in scores:
+        profile = profile * SCORE_LEVELS + (score - SCORE_MIN)
+    return profile
+
+
+def decode_profiles(profiles):
+    """プロファイルの番号の配列 → [スコアの配列 × 5]（SCORE_KEYS の順）"""
+    profiles = np.asarray(profiles, dtype=np.int64)
+    scores = []
+    for _ in SCORE_KEYS:
+        scores.append(profiles % SCORE_LEVELS + SCORE_MIN)
+        profiles = profiles // SCORE_LEVELS
+    return scores[::-1]
+
+
+# 全プロファイルのスコア（スコアの条件 → 通すプロファイルの表を作るのに使う）
+_PROFILE_SCORES = decode_profiles(np.arange(PROFILE_COUNT))
+
+
+def _expand_ranges(starts, stops):
+    """[starts[i], stops[i]) を順につないだ添字の配列（Python のループを使わない）"""
+    lengths = stops - starts
+    total = int(lengths.sum())
+    if total == 0:
+        return np.zeros(0, dtype=np.int64)
+    first = np.repeat(starts - np.concatenate(([0], np.cumsum(lengths)[:-1])), lengths)
+    return first + np.arange(total)
+
+
+# ==========================================
+# 1. Build
+# ==========================================
+def build(table=None):
+    """参照テーブルの列からキーごとのランとプロファイルの列を作る（配列演算のみ）"""
+    table = table or get_fortune_table()
+
+    def column(name):
+        return np.frombuffer(table.columns[name], dtype=np.uint8).astype(np.int64)
+
+    keys = column("gan") * len(FATE_CODES) + column("fate_code")
+    order = np.argsort(keys, kind="stable")
+    sorted_keys, days = keys[order], order
+    # キーが変わるか、10日おきの並びが途切れたところで新しいランを始める
+    breaks = np.flatnonzero((np.diff(sorted_keys) != 0) | (np.diff(days) != STRIDE)) + 1
+    run_first = np.concatenate(([0], breaks))
+    run_lengths = np.diff(np.concatenate((run_first, [len(days)])))
+    unique_keys, key_first = np.unique(sorted_keys[run_first], return_index=True)
+    return ReverseIndex(
+        unique_keys.astype(np.uint8),
+        np.concatenate((key_first, [len(run_first)])).astype(np.uint32),
+        days[run_first].astype(np.uint32),
+        run_lengths.astype(np.uint16),
+        encode_profile([column(k) for k in SCORE_KEYS]).astype(np.uint16),
+        table.start,
+    )
+
+
+# ==========================================
+# 2. Storage & Queries
+# ==========================================
+class DateRanges(collections.namedtuple("DateRanges", ["starts", "ends"])):
+    """連続した日付の区間（両端を含む datetime64[D] の配列）"""
+
+    @property
+    def days(self):
+        return int((self.ends - self.starts).astype(np.int64).sum()) + len(self.starts)
+
+    def pairs(self):
+        """[(開始日, 終了日)] の date のリスト"""
+        return list(zip(self.starts.tolist(), self.ends.tolist()))
+
+
+class ReverseIndex:
+    """
+    keys[k] (= 日干 × 16 + FATE Code の番号) のランは runs[offsets[k]:offsets[k + 1]]。
+    ラン r は start + run_starts[r] 日目から STRIDE 日おきに run_lengths[r] 日。
+    profiles[d] は start + d 日目のプロファイルの番号。
+    """
+
+    def __init__(self, keys, offsets, run_starts, run_lengths, profiles, start):
+        self.keys = keys
+        self.offsets = offsets
+        self.run_starts = run_starts
+        self.run_lengths = run_lengths
+        self.profiles = profiles
+        self.start = start
+        self.days = len(profiles)
+        self.end = start + datetime.timedelta(days=self.days - 1)
+        self.key_gan = keys.astype(np.int64) // len(FATE_CODES)
+        self.key_code = keys.astype(np.int64) % len(FATE_CODES)
+
+    def save(self, path=REVERSE_INDEX_PATH):
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        tmp_path = f"{path}.tmp.npz"
+        # ランの開始日はキーの中で昇順なので、差分にすると圧縮がよく効く
+        deltas = np.diff(self.run_starts.astype(np.int64), prepend=0).astype(np.int32)
+        np.savez_compressed(tmp_path, keys=self.keys, offsets=self.offsets, run_deltas=deltas,
+                            run_lengths=self.run_lengths, profiles=self.profiles,
+                            meta=np.array([_FORMAT_VERSION, ENGINE_VERSION, self.start.toordinal()]))
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, path=REVERSE_INDEX_PATH):
+        """保存済みの索引を読む。形式かエンジンのバージョンが違えば ValueError"""
+        with np.load(path) as data:
+            version, engine_version, start_ordinal = data["meta"].tolist()
+            if version != _FORMAT_VERSION or engine_version != ENGINE_VERSION:
+                raise ValueError(f"索引の形式 {version} / エンジンバージョン {engine_version} が現在と一致しません: {path}")
+            run_starts = np.cumsum(data["run_deltas"], dtype=np.int64).astype(np.uint32)
+            return cls(data["keys"], data["offsets"], run_starts, data["run_lengths"], data["profiles"],
+                       datetime.date.fromordinal(start_ordinal))
+
+    @property
+    def size(self):
+        """保存する配列のバイト数（圧縮前）"""
+        return sum(a.nbytes for a in (self.keys, self.offsets, self.run_starts, self.run_lengths, self.profiles))
+
+    def match_keys(self, gan=None, fate_code=None):
+        """
+        条件に合うキーの番号の配列。
+        gan は日干 (0始まり)、fate_code は "LRDM" などの文字列で、どちらも単独の値かその集まり。
+        """
+        mask = np.ones(len(self.keys), dtype=bool)
+        if gan is not None:
+            mask &= np.isin(self.key_gan, [gan] if np.isscalar(gan) else list(gan))
+        if fate_code is not None:
+            codes = [fate_code] if isinstance(fate_code, str) else list(fate_code)
+            unknown = set(codes) - set(FATE_CODES)
+            if unknown:
+                raise ValueError(f"未知の FATE Code です: {', '.join(sorted(unknown))}")
+            mask &= np.isin(self.key_code, [FATE_CODES.index(c) for c in codes])
+        return np.flatnonzero(mask)
+
+    @staticmethod
+    def match_profiles(scores):
+        """
+        スコアの条件 {"Identity": 4, "Create": (2, 5), ...} → プロファイルごとに通すかどうかの表。
+        値は完全一致、タプルは両端を含む範囲
+        """
+        allowed = np.ones(PROFILE_COUNT, dtype=bool)
+        for name, value in scores.items():
+            if name not in SCORE_KEYS:
+                raise ValueError(f"未知のスコアです: {name}（{', '.join(SCORE_KEYS)}）")
+            low, high = value if isinstance(value, tuple) else (value, value)
+            column = _PROFILE_SCORES[SCORE_KEYS.index(name)]
+            allowed &= (column >= low) & (column <= high)
+        return allowed
+
+    def day_offsets(self, gan=None, fate_code=None, scores=None, start=None, end=None):
+        """条件に合う日付の、start からの日数（昇順）"""
+        allowed = self.match_profiles(scores) if scores else None
+        low = max(0, 0 if start is None else (start - self.start).days)
+        high = min(self.days - 1, self.days - 1 if end is None else (end - self.start).days)
+        if gan is None and fate_code is None:
+            # キーで絞らないときはランを展開せず、範囲内の全日付をプロファイルの列だけで絞る
+            offsets = np.arange(low, max(high + 1, low), dtype=np.int64)
+        else:
+            matched = self.match_keys(gan, fate_code)
+            runs = _expand_ranges(self.offsets[matched].astype(np.int64), self.offsets[matched + 1].astype(np.int64))
+            lengths = self.run_lengths[runs].astype(np.int64)
+            steps = np.arange(int(lengths.sum())) - np.repeat(np.cumsum(lengths) - lengths, lengths)
+            offsets = np.repeat(self.run_starts[runs].astype(np.int64), lengths) + STRIDE * steps
+            offsets = offsets[(offsets >= low) & (offsets <= high)]
+            offsets.sort()
+        if allowed is not None:
+            offsets = offsets[allowed[self.profiles[offsets]]]
+        return offsets
+
+    def query(self, gan=None, fate_code=None, scores=None, start=None, end=None):
+        """条件に合う日付を、start〜end (両端を含む) の範囲で連続した区間にまとめて返す"""
+        offsets = self.day_offsets(gan, fate_code, scores, start, end)
+        origin = np.datetime64(self.start, "D")
+        if not len(offsets):
+            empty = np.zeros(0, dtype="datetime64[D]")
+            return DateRanges(empty, empty)
+        breaks = np.flatnonzero(np.diff(offsets) != 1) + 1
+        firsts = offsets[np.concatenate(([0], breaks))]
+        lasts = offsets[np.concatenate((breaks - 1, [len(offsets) - 1]))]
+        return DateRanges(origin + firsts, origin + lasts)
+
+    def count(self, gan=None, fate_code=None, scores=None, start=None, end=None):
+        """条件に合う日数"""
+        return len(self.day_offsets(gan, fate_code, scores, start, end))
+
+
+_index = None
+_index_lock = threading.Lock()
+
+
+def get_reverse_index():
+    """
+    プロセス内で共有する索引。保存済みのファイルが無い・古い場合はその場で構築して保存する。
+    """
+    global _index
+    if _index is None:
+        with _index_lock:
+            if _index is None:
+                try:
+                    _index = ReverseIndex.load()
+                except (OSError, ValueError, KeyError):
+                    _index = build()
+                    try:
+                        _index.save()
+                    except OSError:
+                        pass
+    return _index
+
+
+# ==========================================
+# 3. CLI
+# ==========================================
+def _parse_date(text):
+    try:
+        return datetime.datetime.strptime(text, "%Y%m%d").date()
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"日付は「19970324」のような8桁で指定してください: {text}") from None
+
+
+def _parse_score(text):
+    """"Identity=4" / "Create=2-5" → (名前, 値 or (下限, 上限))"""
+    name, _, value = text.partition("=")
+    low, _, high = value.partition("-")
+    try:
+        return name, (int(low), int(high)) if high else int(low)
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"スコアは「Identity=4」か「Create=2-5」の形で指定してください: {text}") from None
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="タイプ・FATE Code・スコアから生年月日を逆引きする")
+    sub = parser.add_subparsers(dest="command", required=True)
+    p = sub.add_parser("build", help="参照テーブルから索引を作って保存する")
+    p.add_argument("--output", default=REVERSE_INDEX_PATH)
+    p = sub.add_parser("query", help="条件に合う生年月日の区間を出す")
+    p.add_argument("--type", type=int, action="append", dest="types", help="タイプ番号 1〜10（複数指定可）")
+    p.add_argument("--fate-code", action="append", dest="fate_codes", help="FATE Code（複数指定可）")
+    p.add_argument("--score", type=_parse_score, action="append", default=[], help="例: Identity=4, Create=2-5")
+    p.add_argument("--from", type=_parse_date, dest="start", help="開始日 (YYYYMMDD)")
+    p.add_argument("--to", type=_parse_date, dest="end", help="終了日 (YYYYMMDD)")
+    p.add_argument("--limit", type=int, default=0, help="出力する区間数の上限 (0 で無制限)")
+    p.add_argument("--format", choices=("text", "json"), default="text")
+    args = parser.parse_args(argv)
+
+    if args.command == "build":
+        index = build()
+        index.save(args.output)
+        print(f"{args.output}: {index.start}〜{index.end}, {len(index.keys)} keys, {len(index.run_starts)} runs, "
+              f"{os.path.getsize(args.output)} bytes", file=sys.stderr)
+        return 0
+
+    bad_types = [t for t in args.types or () if not 1 <= t <= TYPE_COUNT]
+    if bad_types:
+        parser.error(f"タイプ番号は 1〜{TYPE_COUNT} で指定してください: {', '.join(map(str, bad_types))}")
+    if args.start and args.end and args.start > args.end:
+        parser.error(f"--from ({args.start}) が --to ({args.end}) より後です")
+    index = get_reverse_index()
+    if (args.start and args.start > index.end) or (args.end and args.end < index.start):
+        parser.error(f"指定した期間が索引の範囲 ({index.start}〜{index.end}) の外です")
+    if (args.start and args.start < index.start) or (args.end and args.end > index.end):
+        print(f"索引の範囲 ({index.start}〜{index.end}) の外の日付は対象外です", file=sys.stderr)
+    gans = [t - 1 for t in args.types] if args.types else None
+    try:
+        ranges = index.query(gans, args.fate_codes, dict(args.score), args.start, args.end)
+    except ValueError as e:
+        parser.error(str(e))
+    pairs = ranges.pairs()[:args.limit or None]
+    if args.format == "json":
+        json.dump({"days": ranges.days, "ranges": len(ranges.starts),
+                   "results": [[s.isoformat(), e.isoformat()] for s, e in pairs]}, sys.stdout, ensure_ascii=False)
+        print()
+    else:
+        for s, e in pairs:
+            print(s.isoformat() if s == e else f"{s.isoformat()} - {e.isoformat()}")
+        print(f"{ranges.days} days in {len(ranges.starts)} ranges", file=sys.stderr)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
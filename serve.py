@@ -0,0 +1,77 @@
+"""
+本番用の起動スクリプト
+
+ウォームアップ（warmup.warm_up）を済ませてから、同じプロセスで Streamlit サーバーを起動する。
+キャッシュはプロセス内で共有されるため、最初のユーザーが構築コストを払わずに済む。
+内容ハッシュ付きのスタイルシート (static/app.<hash>.css) には長期キャッシュのヘッダーを付ける
+（Streamlit の静的配信は Cache-Control を付けないため、Starlette アプリにミドルウェアを足す）。
+
+    python serve.py [streamlit run のオプション...]
+"""
+import logging
+import os
+import sys
+
+import stylesheet
+import warmup
+
+logger = logging.getLogger("fate.serve")
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+APP_PATH = os.path.join(BASE_DIR, "app.py")
+# ファイル名が内容で変わるので、1年キャッシュしてよい
+IMMUTABLE_CACHE_CONTROL = b"public, max-age=31536000, immutable"
+
+
+class StaticCacheMiddleware:
+    """内容ハッシュ付きの静的ファイルの 200 応答に長期キャッシュの Cache-Control を付ける ASGI ミドルウェア"""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not stylesheet.is_hashed_asset(scope["path"]):
+            await self.app(scope, receive, send)
+            return
+
+        async def send_with_cache_control(message):
+            if message["type"] == "http.response.start" and message["status"] == 200:
+                headers = [(k, v) for k, v in message.get("headers", []) if k.lower() != b"cache-control"]
+                headers.append((b"cache-control", IMMUTABLE_CACHE_CONTROL))
+                message = {**message, "headers": headers}
+            await send(message)
+
+        await self.app(scope, receive, send_with_cache_control)
+
+
+def install_static_cache_headers():
+    """Streamlit が作る Starlette アプリに StaticCacheMiddleware を足す"""
+    try:
+        from streamlit.web.server.starlette import starlette_server
+    except ImportError:
+        logger.warning("Starlette サーバーが見つからないため、静的ファイルのキャッシュヘッダーを付けません")
+        return
+    create_app = starlette_server.create_starlette_app
+
+    def create_app_with_cache_headers(runtime):
+        app = create_app(runtime)
+        app.add_middleware(StaticCacheMiddleware)
+        return app
+
+    starlette_server.create_starlette_app = create_app_with_cache_headers
+
+
+def main():
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(name)s %(message)s")
+    # images/ などの相対パスを app.py と同じ基準で解決する
+    os.chdir(BASE_DIR)
+    warmup.warm_up()
+    install_static_cache_headers()
+
+    from streamlit.web import cli as stcli
+    sys.argv = ["streamlit", "run", APP_PATH, *sys.argv[1:]]
+    return stcli.main()
+
+
+if __name__ == "__main__":
+    sys.exit(main())
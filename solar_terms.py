@@ -0,0 +1,90 @@
+"""
+節入り（12節）の時刻表
+
+月柱の境目となる節入りの時刻を、年・月で O(1) に引けるようにしたもの。
+時刻表は tools/build_solar_terms.py が天文計算でオフラインに作り、data/solar_terms.bin
+（各月 1日 0:00 JST からの経過分を uint16 で並べただけの配列）として同梱する。
+実行時はファイルを1度読むだけで、太陽黄経の計算はしない。
+表の範囲外の年は従来の固定日 (fortune_engine.SOLAR_TERMS) にフォールバックする。
+"""
+import array
+import os
+import struct
+import sys
+import threading
+
+SOLAR_TERMS_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "data", "solar_terms.bin")
+
+_MAGIC = b"SOLT"
+_HEADER = struct.Struct("<4sHHH")  # magic, 形式のバージョン, 開始年, 年数
+_FORMAT_VERSION = 1
+MINUTES_PER_DAY = 24 * 60
+
+
+def term_longitude(month):
+    """month 月の節（1月 小寒 285° 〜 12月 大雪 255°）の太陽黄経"""
+    return (285 + 30 * (month - 1)) % 360
+
+
+class SolarTermTable:
+    """(年, 月) → その月の節入りが月初から何分後か（日本時間）"""
+
+    def __init__(self, start_year, minutes):
+        self.start_year = start_year
+        self.end_year = start_year + len(minutes) // 12 - 1
+        self._minutes = minutes
+
+    def minutes(self, year, month):
+        """月初 0:00 JST からの経過分。表の範囲外なら None"""
+        i = (year - self.start_year) * 12 + month - 1
+        if not 0 <= i < len(self._minutes):
+            return None
+        return self._minutes[i]
+
+    def term_day(self, year, month):
+        """節入りの日（その月の何日か）。表の範囲外なら None"""
+        m = self.minutes(year, month)
+        return None if m is None else m // MINUTES_PER_DAY + 1
+
+
+def write_table(path, start_year, minutes):
+    """tools/build_solar_terms.py から呼ぶ書き出し処理"""
+    if len(minutes) % 12:
+        raise ValueError("節入りの数が12の倍数ではありません")
+    data = array.array("H", minutes)
+    if sys.byteorder != "little":
+        data.byteswap()
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "wb") as f:
+        f.write(_HEADER.pack(_MAGIC, _FORMAT_VERSION, start_year, len(minutes) // 12))
+        data.tofile(f)
+
+
+def load_table(path=SOLAR_TERMS_PATH):
+    """時刻表を読み込む。形式が違えば ValueError"""
+    with open(path, "rb") as f:
+        blob = f.read()
+    if len(blob) < _HEADER.size:
+        raise ValueError(f"節入りの時刻表が壊れています: {path}")
+    magic, version, start_year, years = _HEADER.unpack_from(blob)
+    if magic != _MAGIC or version != _FORMAT_VERSION or len(blob) != _HEADER.size + years * 12 * 2:
+        raise ValueError(f"節入りの時刻表の形式が一致しません: {path}")
+    minutes = array.array("H")
+    minutes.frombytes(blob[_HEADER.size:])
+    if sys.byteorder != "little":
+        minutes.byteswap()
+    return SolarTermTable(start_year, minutes)
+
+
+_table = None
+_table_lock = threading.Lock()
+
+
+def get_solar_terms():
+    """プロセス内で共有する時刻表（初回呼び出し時に1度だけ読み込む）"""
+    global _table
+    if _table is None:
+        with _table_lock:
+            if _table is None:
+                _table = load_table()
+    return _table
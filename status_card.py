@@ -0,0 +1,303 @@
+"""
+ステータス診断カード (PNG) の生成
+
+タイプ画像・タイプ名・キャッチコピー・レーダーチャートの目盛りはタイプごとに決まるので、
+ベースレイヤーとしてタイプごとに1度だけ描き、PNG のままキャッシュ（メモリ + ディスク）しておく。
+カードはダウンロードボタンが押されたときにだけ作るので、起動時には用意せず、展開も使う分だけ行う。
+リクエストごとに描くのは名前・FATE Code・2つのレーダー多角形だけ。
+大量に作り直すときはプロセスプールで並列に生成する。
+
+日本語を描くにはフォントが必要。FATE_CARD_FONT で TrueType / OpenType フォントを指定する
+（未指定ならよくある場所の日本語フォントを探す。Streamlit Cloud では packages.txt の fonts-noto-cjk が入る）。
+日本語フォントが見つからなければ豆腐のカードは作らず CardFontError にする（app.py はボタンを出さない）。
+
+CLI:
+    python status_card.py members.csv cards/ --processes 4
+"""
+import argparse
+import collections
+import concurrent.futures
+import functools
+import hashlib
+import io
+import math
+import os
+import sys
+import threading
+
+from PIL import Image, ImageDraw, ImageFont
+
+import radar_chart
+from assets import CACHE_DIR, resolve_image_path
+from content_pack import get_content_pack
+
+CARD_WIDTH, CARD_HEIGHT = 1080, 1350
+HEADER_HEIGHT = 110
+IMAGE_BOX = (90, HEADER_HEIGHT + 30, 990, 760)
+RADAR_CENTER = (300, 1085)
+RADAR_RADIUS = 170
+# ベースレイヤーの見た目を変えたら上げる（ディスクキャッシュを作り直すため）
+LAYOUT_VERSION = 1
+PNG_COMPRESS_LEVEL = 3
+
+FONT_PATH = os.environ.get("FATE_CARD_FONT")
+FONT_CANDIDATES = (
+    "/usr/share/fonts/opentype/noto/NotoSansCJK-Bold.ttc",
+    "/usr/share/fonts/truetype/fonts-japanese-gothic.ttf",
+    "/usr/share/fonts/opentype/ipaexfont-gothic/ipaexg.ttf",
+    "/System/Library/Fonts/ヒラギノ角ゴシック W6.ttc",
+    "C:/Windows/Fonts/meiryob.ttc",
+)
+
+
+
+class CardFontError(RuntimeError):
+    """カードに使える日本語フォントが無い"""
+
+
+CardRequest = collections.namedtuple(
+    "CardRequest", ["type_id", "user_name", "fate_code", "fate_scores", "big5_norm"]
+)
+
+
+# ==========================================
+# 1. Fonts & Geometry
+# ==========================================
+@functools.lru_cache(maxsize=None)
+def font_path():
+    """カードに使う日本語フォントのパス（見つからなければ None）"""
+    if FONT_PATH:
+        return FONT_PATH if os.path.exists(FONT_PATH) else None
+    for path in FONT_CANDIDATES:
+        if os.path.exists(path):
+            return path
+    return None
+
+
+def font_available():
+    """カードを作れるか（app.py は作れないときダウンロードボタンを出さない）"""
+    return font_path() is not None
+
+
+@functools.lru_cache(maxsize=None)
+def _font_tag():
+    """ベースレイヤーのキャッシュキーに入れるフォントの識別子（フォントを替えたら描き直す）"""
+    path = font_path()
+    if path is None:
+        raise CardFontError("日本語フォントが見つかりません。FATE_CARD_FONT で指定するか fonts-noto-cjk を入れてください")
+    return hashlib.sha256(os.path.abspath(path).encode()).hexdigest()[:12]
+
+
+@functools.lru_cache(maxsize=None)
+def _font(size):
+    _font_tag()  # フォントが無ければここで CardFontError（Pillow の既定フォントでは日本語が豆腐になる）
+    return ImageFont.truetype(font_path(), size)
+
+
+def _radar_point(axis, value):
+    # radar_chart と同じく1軸目を右に置き、反時計回りに並べる
+    angle = 2 * math.pi * axis / len(radar_chart.CATEGORIES)
+    r = RADAR_RADIUS * value / radar_chart.MAX_VALUE
+    return RADAR_CENTER[0] + r * math.cos(angle), RADAR_CENTER[1] - r * math.sin(angle)
+
+
+def _radar_box():
+    """レーダーの多角形が収まる範囲（合成するレイヤーをカード全体より小さくするため）"""
+    pad = 8
+    return (RADAR_CENTER[0] - RADAR_RADIUS - pad, RADAR_CENTER[1] - RADAR_RADIUS - pad,
+            RADAR_CENTER[0] + RADAR_RADIUS + pad, RADAR_CENTER[1] + RADAR_RADIUS + pad)
+
+
+def _hex_rgba(color, alpha=255):
+    color = color.lstrip("#")
+    return tuple(int(color[i:i + 2], 16) for i in (0, 2, 4)) + (alpha,)
+
+
+# ==========================================
+# 2. Per-Type Base Layer
+# ==========================================
+def _draw_base(type_id):
+    content = get_content_pack().get_type(type_id - 1)
+    theme = _hex_rgba(content.get("color", "#333333"))
+    card = Image.new("RGBA", (CARD_WIDTH, CARD_HEIGHT), (250, 250, 250, 255))
+    draw = ImageDraw.Draw(card)
+
+    draw.rectangle((0, 0, CARD_WIDTH, HEADER_HEIGHT), fill=theme)
+    draw.text((CARD_WIDTH / 2, HEADER_HEIGHT / 2), "裏・ステータス診断カード", font=_font(46), fill="white", anchor="mm")
+
+    path = resolve_image_path(type_id)
+    if path is not None:
+        with Image.open(path) as image:
+            image = image.convert("RGBA")
+            image.thumbnail((IMAGE_BOX[2] - IMAGE_BOX[0], IMAGE_BOX[3] - IMAGE_BOX[1]), Image.LANCZOS)
+            x = IMAGE_BOX[0] + (IMAGE_BOX[2] - IMAGE_BOX[0] - image.width) // 2
+            y = IMAGE_BOX[1] + (IMAGE_BOX[3] - IMAGE_BOX[1] - image.height) // 2
+            card.alpha_composite(image, (x, y))
+
+    draw.text((CARD_WIDTH / 2, 800), f"Type {type_id}: {content['name']}", font=_font(48), fill=theme, anchor="mm")
+    draw.text((CARD_WIDTH / 2, 860), content["catch"], font=_font(30), fill="#555555", anchor="mm")
+
+    # レーダーの目盛りと軸ラベル
+    axes = len(radar_chart.CATEGORIES)
+    for level in range(1, radar_chart.MAX_VALUE + 1):
+        draw.polygon([_radar_point(i, level) for i in range(axes)], outline="#DDDDDD", width=2)
+    for i, label in enumerate(radar_chart.CATEGORIES):
+        draw.line([RADAR_CENTER, _radar_point(i, radar_chart.MAX_VALUE)], fill="#DDDDDD", width=2)
+        draw.text(_radar_point(i, radar_chart.MAX_VALUE + 1.1), label, font=_font(26), fill="#333333", anchor="mm")
+    return card
+
+
+# 展開した RGBA のベースレイヤーは1枚 5.6MB あるので、常に持つのは PNG のまま（1枚 300KB 前後）にし、
+# 展開したものは直近に使った数タイプ分だけ持つ
+BASE_LAYER_CACHE_SIZE = 3
+_base_pngs = {}
+_base_lock = threading.Lock()
+
+
+def base_png(type_id):
+    """タイプ(1始まり)のベースレイヤーの PNG。メモリ → ディスク → 描画の順に探す"""
+    key = (_font_tag(), type_id)
+    data = _base_pngs.get(key)
+    if data is not None:
+        return data
+    content_version = get_content_pack().version
+    cache_path = os.path.join(CACHE_DIR, f"card-base-v{LAYOUT_VERSION}-{content_version}-{key[0]}-{type_id}.png")
+    try:
+        with open(cache_path, "rb") as f:
+            data = f.read()
+    except OSError:
+        buf = io.BytesIO()
+        _draw_base(type_id).save(buf, format="PNG", compress_level=1)
+        data = buf.getvalue()
+        try:
+            os.makedirs(CACHE_DIR, exist_ok=True)
+            with open(cache_path, "wb") as f:
+                f.write(data)
+        except OSError:
+            pass
+    with _base_lock:
+        return _base_pngs.setdefault(key, data)
+
+
+def base_layer(type_id):
+    """展開したベースレイヤー（共有するので書き換えずに copy() して使う）"""
+    return _base_layer(type_id, _font_tag())
+
+
+@functools.lru_cache(maxsize=BASE_LAYER_CACHE_SIZE)
+def _base_layer(type_id, font_tag):
+    with Image.open(io.BytesIO(base_png(type_id))) as image:
+        return image.convert("RGBA")
+
+
+def prewarm():
+    """全タイプのベースレイヤーを PNG で用意しておく（ディスクキャッシュも作る）"""
+    for type_id in range(1, 11):
+        base_png(type_id)
+
+
+# ==========================================
+# 3. Per-User Overlay
+# ==========================================
+# カードは1枚300KB前後なので、連打やリロード分だけ持っておけば足りる
+@functools.lru_cache(maxsize=64)
+def _render(type_id, user_name, fate_code, fate, big5):
+    """量子化済みのスコア (radar_chart.fate_key / big5_key) からカードを描く"""
+    card = base_layer(type_id).copy()
+    series = [(fate, radar_chart.FATE_COLOR)]
+    if big5 is not None:
+        series.append(([v / 10 for v in big5], radar_chart.BIG5_COLOR))
+    for values, color in series:
+        # ImageDraw は半透明の塗りを重ねずに上書きするので、多角形ごとに合成する
+        box = _radar_box()
+        overlay = Image.new("RGBA", (box[2] - box[0], box[3] - box[1]), (0, 0, 0, 0))
+        points = [(x - box[0], y - box[1]) for x, y in (_radar_point(i, v) for i, v in enumerate(values))]
+        ImageDraw.Draw(overlay).polygon(points, fill=_hex_rgba(color, 110), outline=_hex_rgba(color), width=4)
+        card.alpha_composite(overlay, box[:2])
+
+    draw = ImageDraw.Draw(card)
+    draw.text((760, 990), "NAME", font=_font(26), fill="#999999", anchor="mm")
+    draw.text((760, 1040), user_name or "名無し", font=_font(44), fill="#222222", anchor="mm")
+    draw.text((760, 1120), "FATE CODE", font=_font(26), fill="#999999", anchor="mm")
+    draw.text((760, 1180), fate_code, font=_font(72), fill="#D32F2F", anchor="mm")
+
+    buf = io.BytesIO()
+    card.convert("RGB").save(buf, format="PNG", compress_level=PNG_COMPRESS_LEVEL)
+    return buf.getvalue()
+
+
+def render_card(request):
+    """CardRequest → PNG のバイト列（同じ内容のカードは再描画しない）"""
+    return _render(request.type_id, request.user_name or "", request.fate_code,
+                   radar_chart.fate_key(request.fate_scores), radar_chart.big5_key(request.big5_norm))
+
+
+def card_png(type_id, user_name, fate_code, fate_scores, big5_norm=None):
+    return render_card(CardRequest(type_id, user_name, fate_code, fate_scores, big5_norm))
+
+
+# ==========================================
+# 4. Batch (Process Pool)
+# ==========================================
+def _render_to_file(job):
+    request, path = job
+    with open(path, "wb") as f:
+        f.write(render_card(request))
+    return path
+
+
+def render_many(jobs, processes=None, chunksize=32):
+    """
+    (CardRequest, 出力パス) の列をプロセスプールで描画する。
+    各ワーカーは初期化時にベースレイヤーの PNG を読み込む（ディスクキャッシュがあればそれを使う）。
+    """
+    prewarm()  # 親で作ってディスクに置いておけば、ワーカーは読むだけで済む
+    with concurrent.futures.ProcessPoolExecutor(processes, initializer=prewarm) as pool:
+        yield from pool.map(_render_to_file, jobs, chunksize=chunksize)
+
+
+def main(argv=None):
+    import pandas as pd
+
+    import fortune_batch
+
+    parser = argparse.ArgumentParser(description="メンバー一覧からステータス診断カードをまとめて作る")
+    parser.add_argument("input", help="入力 CSV (name, dob, 任意で Q1〜Q10)")
+    parser.add_argument("output_dir", help="PNG の出力先ディレクトリ")
+    parser.add_argument("--dob-column", default="dob", help="生年月日の列名 (既定: dob)")
+    parser.add_argument("--processes", type=int, default=None, help="ワーカー数 (既定: CPU 数)")
+    args = parser.parse_args(argv)
+    if not font_available():
+        print("日本語フォントが見つかりません。FATE_CARD_FONT で指定するか fonts-noto-cjk を入れてください", file=sys.stderr)
+        return 1
+
+    df = pd.read_csv(args.input, dtype={args.dob_column: str})
+    output_dir = os.path.abspath(args.output_dir)
+    # images/ と .asset_cache/ を app.py と同じ基準で解決する
+    os.chdir(os.path.dirname(os.path.abspath(__file__)))
+    scored = fortune_batch.score_frame(df, args.dob_column)
+    has_big5 = all(key in scored.columns for key in fortune_batch.BIG5_KEYS)
+    os.makedirs(output_dir, exist_ok=True)
+
+    def jobs():
+        for i, row in enumerate(scored.itertuples(index=False)):
+            row = row._asdict()
+            if not row["valid"]:
+                continue
+            big5_norm = None
+            if has_big5 and all(row[k] == row[k] for k in fortune_batch.BIG5_KEYS):  # NaN を除く
+                big5_norm = {k: row[k] for k in fortune_batch.BIG5_KEYS}
+            name = row.get("name")
+            request = CardRequest(
+                int(row["gan"]) + 1, name if isinstance(name, str) else "", row["fate_code"],
+                {k: int(row[k]) for k in radar_chart.FATE_KEYS}, big5_norm,
+            )
+            yield request, os.path.join(output_dir, f"card-{i:06d}.png")
+
+    count = sum(1 for _ in render_many(jobs(), args.processes))
+    print(f"{count} cards", file=sys.stderr)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,156 @@
+"""
+スタイルシートの配信
+
+styles/app.css と、コンテンツパックのタイプ別テーマ色から作るルールを縮小して、
+内容のハッシュを含むファイル名 (static/app.<hash>.css) で書き出す。
+app.py は Streamlit の静的ファイル配信 (server.enableStaticServing) から <link> で読み込ませるので、
+再実行ごとに送るのは数十バイトのタグだけになる。ファイル名は内容が変われば必ず変わるため、
+serve.py はこのファイルに長期キャッシュ (immutable) のヘッダーを付けている。
+静的配信が無効な環境（AppTest など）では従来どおり <style> で埋め込む。
+
+CLI:
+    python stylesheet.py build
+"""
+import argparse
+import collections
+import hashlib
+import os
+import re
+import sys
+import threading
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+STYLE_SOURCE = os.path.join(BASE_DIR, "styles", "app.css")
+# Streamlit は app.py と同じ階層の static/ を app/static/ として配信する
+STATIC_DIR = os.path.join(BASE_DIR, "static")
+STATIC_URL = "app/static"
+HASH_LENGTH = 12
+HASHED_NAME = re.compile(r"^app\.[0-9a-f]{%d}\.css$" % HASH_LENGTH)
+
+_COMMENT = re.compile(r"/\*.*?\*/", re.S)
+# 文字列リテラル（"..." / '...'）とそれ以外を分け、文字列の中は触らない
+_STRING = re.compile(r"""("(?:[^"\\]|\\.)*"|'(?:[^'\\]|\\.)*')""")
+_SPACE = re.compile(r"\s+")
+_AROUND_PUNCT = re.compile(r"\s*([{};:,>])\s*")
+
+
+def minify_css(text):
+    """コメントと余分な空白、ブロック末尾の ; を取り除く"""
+    parts = _STRING.split(_COMMENT.sub("", text))
+    for i in range(0, len(parts), 2):
+        chunk = _SPACE.sub(" ", parts[i])
+        parts[i] = _AROUND_PUNCT.sub(r"\1", chunk).replace(";}", "}")
+    return "".join(parts).strip()
+
+
+def theme_rules(pack):
+    """タイプごとのテーマ色（ヒーローカードの上端と見出しの下線）"""
+    rules = []
+    for type_id in pack.type_ids():
+        color = pack.get_type(type_id).get("color", "#333")
+        rules.append(
+            f".type-theme-{type_id + 1}.read-card-hero{{border-top:10px solid {color}}}"
+            f".type-theme-{type_id + 1} h3{{border-color:{color}}}"
+        )
+    return "".join(rules)
+
+
+def build_css(pack=None, source=STYLE_SOURCE):
+    """配信する CSS 本文（縮小済み）"""
+    if pack is None:
+        from content_pack import get_content_pack
+        pack = get_content_pack()
+    with open(source, encoding="utf-8") as f:
+        return minify_css(f.read()) + theme_rules(pack)
+
+
+# ==========================================
+# 1. Hashed Asset
+# ==========================================
+class Stylesheet(collections.namedtuple("Stylesheet", ["css", "filename", "written"])):
+    """縮小済みの CSS とその配信用ファイル名。written は static/ に書き出せたかどうか"""
+
+    @property
+    def href(self):
+        return f"{STATIC_URL}/{self.filename}"
+
+    def link_tag(self):
+        return f'<link rel="stylesheet" href="{self.href}">'
+
+    def style_tag(self):
+        return f"<style>{self.css}</style>"
+
+
+def hashed_filename(css):
+    return f"app.{hashlib.sha256(css.encode('utf-8')).hexdigest()[:HASH_LENGTH]}.css"
+
+
+def write_stylesheet(css, static_dir=STATIC_DIR):
+    """static/ に内容ハッシュ付きの名前で書き出し、古いハッシュのファイルを消す"""
+    filename = hashed_filename(css)
+    path = os.path.join(static_dir, filename)
+    os.makedirs(static_dir, exist_ok=True)
+    if not os.path.exists(path):
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            f.write(css)
+        os.replace(tmp_path, path)
+    for name in os.listdir(static_dir):
+        if name != filename and HASHED_NAME.match(name):
+            try:
+                os.remove(os.path.join(static_dir, name))
+            except OSError:
+                pass
+    return filename
+
+
+def is_hashed_asset(path):
+    """URL のパスが内容ハッシュ付きのスタイルシートを指していれば True（serve.py のヘッダー付与用）"""
+    head, _, name = path.rpartition("/")
+    return head.endswith("/" + STATIC_URL) and bool(HASHED_NAME.match(name))
+
+
+_stylesheet = None
+_stylesheet_lock = threading.Lock()
+
+
+def get_stylesheet():
+    """プロセス内で共有するスタイルシート（初回呼び出し時に1度だけ組み立てて書き出す）"""
+    global _stylesheet
+    if _stylesheet is None:
+        with _stylesheet_lock:
+            if _stylesheet is None:
+                css = build_css()
+                try:
+                    filename, written = write_stylesheet(css), True
+                except OSError:
+                    # 書き込めない環境では <style> の埋め込みに切り替える
+                    filename, written = hashed_filename(css), False
+                _stylesheet = Stylesheet(css, filename, written)
+    return _stylesheet
+
+
+def head_html(static_serving):
+    """ページに入れるタグ。静的配信が有効でファイルがあれば <link>、なければ <style>"""
+    sheet = get_stylesheet()
+    return sheet.link_tag() if static_serving and sheet.written else sheet.style_tag()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="スタイルシートを縮小して static/ に書き出す")
+    sub = parser.add_subparsers(dest="command", required=True)
+    p = sub.add_parser("build", help="static/app.<hash>.css を書き出す")
+    p.add_argument("--static-dir", default=STATIC_DIR)
+    args = parser.parse_args(argv)
+
+    css = build_css()
+    filename = write_stylesheet(css, args.static_dir)
+    with open(STYLE_SOURCE, encoding="utf-8") as f:
+        source_size = len(f.read().encode("utf-8"))
+    print(f"{os.path.join(args.static_dir, filename)}: {len(css.encode('utf-8'))} bytes (source {source_size} bytes)",
+          file=sys.stderr)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,90 @@
+"""
+チーム相性タブ（app.py から、タブが開かれたときにだけ import する）
+
+相性の計算 (group_compat)・pandas・plotly とキャッシュ関数の定義はここに置き、
+タブを開かない再実行では読み込みもデコレーターの評価も行わない。
+アップロードされた CSV はセッションに残し、タブを切り替えて戻っても同じ結果を表示する。
+"""
+import io
+
+import streamlit as st
+
+# これ以下の人数ならメンバー単位、超えたらタイプ単位のヒートマップを描く
+TEAM_HEATMAP_MAX_MEMBERS = 200
+# アップロードされた CSV（ファイル名, 中身）を持つセッションのキー
+UPLOAD_STATE_KEY = "team_csv_upload"
+
+
+@st.cache_resource(max_entries=8, show_spinner="相性を計算中...")
+def analyze_team(csv_bytes):
+    """
+    アップロードされた CSV → 相性の集計（同じファイルの再実行では再計算しない）。
+    cache_data のように呼び出しごとに複製せず共有するので、戻り値は書き換えないこと。
+    """
+    import pandas as pd
+    import group_compat
+
+    df = pd.read_csv(io.BytesIO(csv_bytes), dtype={"dob": str})
+    members = group_compat.load_members(df)
+    summary = group_compat.summarize(members, top=10)
+    matrix = None
+    if len(members.gan) <= TEAM_HEATMAP_MAX_MEMBERS:
+        matrix = group_compat.compatibility_matrix(members)
+    return {"members": members, "summary": summary, "matrix": matrix}
+
+
+def render_team_view(team):
+    """チーム相性のヒートマップと上位ペア"""
+    import plotly.graph_objects as go
+
+    members, summary = team["members"], team["summary"]
+    if len(members.dropped):
+        st.warning(f"生年月日を解釈できない {len(members.dropped)} 行を除外しました")
+    st.markdown(f"**{len(members.gan)} 人**")
+    if len(members.gan) < 2:
+        return
+
+    if team["matrix"] is not None:
+        labels = [f"{name} (T{gan + 1})" for name, gan in zip(members.names, members.gan)]
+        z, x, y = team["matrix"], labels, labels
+    else:
+        st.caption("人数が多いため、タイプ × タイプの平均相性を表示しています")
+        labels = [f"Type {i + 1}" for i in range(10)]
+        z, x, y = summary["type_matrix"], labels, labels
+    fig = go.Figure(go.Heatmap(z=z, x=x, y=y, zmin=0, zmax=100, colorscale="RdYlGn"))
+    fig.update_layout(height=600, margin=dict(t=20, b=20, l=20, r=20), yaxis=dict(autorange="reversed"))
+    st.plotly_chart(fig, use_container_width=True, key="team_heatmap")
+
+    st.markdown("#### 相性の良いペア")
+    st.dataframe(
+        [{"メンバーA": members.names[i], "メンバーB": members.names[j], "相性": score} for i, j, score in summary["top_pairs"]],
+        hide_index=True, use_container_width=True,
+    )
+
+
+def _store_upload():
+    """アップローダーの変更時だけ中身をセッションに写す（× で消したときは消す）"""
+    uploaded = st.session_state.get("team_csv")
+    st.session_state[UPLOAD_STATE_KEY] = (uploaded.name, uploaded.getvalue()) if uploaded is not None else None
+
+
+def team_tab():
+    """
+    タブの中身。アップローダーはタブが閉じている間は描画されず Streamlit に状態を捨てられるので、
+    表示はアップローダーではなくセッションに写した CSV から組み立てる
+    """
+    st.markdown("### チーム相性マトリクス")
+    st.caption("name, dob（8桁）と任意で Q1〜Q10 の列を持つ CSV をアップロードしてください")
+    st.file_uploader("メンバー一覧 (CSV)", type=["csv"], key="team_csv", on_change=_store_upload)
+    upload = st.session_state.get(UPLOAD_STATE_KEY)
+    if upload is None:
+        return
+    name, csv_bytes = upload
+    if st.session_state.get("team_csv") is None:
+        st.caption(f"前回アップロードした {name} を表示しています")
+    try:
+        team = analyze_team(csv_bytes)
+    except (ValueError, KeyError) as e:
+        st.error(f"CSV を読み込めませんでした: {e}")
+    else:
+        render_team_view(team)
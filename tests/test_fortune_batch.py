@@ -0,0 +1,83 @@
+"""配列版 (analyze_many / calculate_big5_many) が1件ずつの計算と同じ結果を返すこと"""
+import datetime
+import random
+
+import numpy as np
+import pandas as pd
+
+from fortune_batch import BIG5_KEYS, TIPI_KEYS, analyze_many, calculate_big5_many, score_frame, to_minutes
+from fortune_engine import SCORE_KEYS, calculate_big5, get_engine
+
+
+def _random_dates(rng, n):
+    start = datetime.date(1890, 1, 1).toordinal()  # 参照テーブルの範囲外も含める
+    end = datetime.date(2110, 12, 31).toordinal()
+    return [datetime.date.fromordinal(rng.randint(start, end)) for _ in range(n)]
+
+
+def _assert_row_matches(result, i, expected):
+    assert result["valid"][i]
+    assert result["gan"][i] == expected["gan"]
+    assert [result[key][i] for key in SCORE_KEYS] == [expected["scores"][key] for key in SCORE_KEYS]
+    assert result["fate_code"][i] == expected["fate_code"]
+
+
+def test_analyze_many_matches_engine():
+    rng = random.Random(1)
+    dates = _random_dates(rng, 3000)
+    result = analyze_many([d.strftime("%Y%m%d") for d in dates])
+    engine = get_engine()
+    for i, date_obj in enumerate(dates):
+        _assert_row_matches(result, i, engine.analyze_date(date_obj))
+
+
+def test_analyze_many_with_birth_time_matches_engine():
+    rng = random.Random(2)
+    # 節入りの当日を多く含むよう、月初の日付を混ぜる
+    dates = _random_dates(rng, 2000) + [datetime.date(rng.randint(1900, 2100), rng.randint(1, 12), rng.randint(3, 9))
+                                        for _ in range(2000)]
+    minutes = [rng.randrange(1440) for _ in dates]
+    result = analyze_many(np.array(dates, dtype="datetime64[D]"), np.array(minutes, dtype=np.float64))
+    engine = get_engine()
+    for i, (date_obj, minute) in enumerate(zip(dates, minutes)):
+        _assert_row_matches(result, i, engine.analyze_date(date_obj, minute))
+
+
+def test_analyze_many_marks_invalid_rows():
+    result = analyze_many(["19970324", "19971332", "", "abc"])
+    assert result["valid"].tolist() == [True, False, False, False]
+    assert result["gan"][1] == -1 and result["fate_code"][1] == ""
+
+
+def test_to_minutes_formats():
+    values = to_minutes(pd.Series(["0830", "8:30", "08:30", "2400", "", None, "0060"], dtype=object))
+    assert values[:3].tolist() == [510.0, 510.0, 510.0]
+    assert np.isnan(values[3:]).all()
+
+
+def test_calculate_big5_many_matches_single():
+    rng = random.Random(3)
+    rows = [{key: rng.randint(1, 7) for key in TIPI_KEYS} for _ in range(2000)]
+    birth_years = [rng.choice([None, rng.randint(1940, 2010)]) for _ in rows]
+    raw, norm = calculate_big5_many(pd.DataFrame(rows), np.array([np.nan if y is None else y for y in birth_years]))
+    for i, (answers, year) in enumerate(zip(rows, birth_years)):
+        expected_raw, expected_norm = calculate_big5(answers, year)
+        assert [raw[key][i] for key in BIG5_KEYS] == [expected_raw[key] for key in BIG5_KEYS]
+        assert [norm[key][i] for key in BIG5_KEYS] == [expected_norm[key] for key in BIG5_KEYS]
+
+
+def test_calculate_big5_many_marks_invalid_answers():
+    rows = [{key: 4 for key in TIPI_KEYS} for _ in range(3)]
+    rows[1]["Q3"] = 8
+    rows[2]["Q5"] = None
+    _, norm = calculate_big5_many(pd.DataFrame(rows))
+    assert not np.isnan(norm["Extraversion"][0])
+    assert np.isnan(norm["Extraversion"][1]) and np.isnan(norm["Openness"][2])
+
+
+def test_score_frame_keeps_passthrough_columns():
+    df = pd.DataFrame({"name": ["a", "b"], "dob": ["19970324", "20000101"], "birth_time": ["0830", "23:30"]})
+    out = score_frame(df)
+    assert out["birth_time"].tolist() == ["0830", "23:30"]
+    engine = get_engine()
+    _assert_row_matches(out, 1, engine.analyze_date(datetime.date(2000, 1, 1), 23 * 60 + 30))
@@ -0,0 +1,64 @@
+"""参照テーブル (FortuneTable) がエンジンの analyze_date と同じ結果を返すこと"""
+import datetime
+
+import pytest
+
+from fortune_engine import FortuneEngineIntegrated, FortuneTable, get_fortune_table
+
+ONE_DAY = datetime.timedelta(days=1)
+# 時支の境目（23時・0時台と各時刻の頭と末尾）
+MINUTES = (0, 59, 60, 119, 600, 779, 1380, 1439)
+
+
+@pytest.fixture(scope="module")
+def engine():
+    return FortuneEngineIntegrated()
+
+
+@pytest.fixture(scope="module")
+def table():
+    return get_fortune_table()
+
+
+def test_every_day_matches_engine(engine, table):
+    date_obj = table.start
+    while date_obj <= table.end:
+        assert table.analyze_date(date_obj) == engine.analyze_date(date_obj), date_obj
+        date_obj += ONE_DAY
+
+
+def test_birth_time_matches_engine(engine, table):
+    # 節入りの当日を必ず含むよう、毎月 1〜10日を数年おきに見る
+    for year in range(table.start.year, table.end.year + 1, 7):
+        for month in range(1, 13):
+            for day in range(1, 11):
+                date_obj = datetime.date(year, month, day)
+                for minute in MINUTES:
+                    assert table.analyze_date(date_obj, minute) == engine.analyze_date(date_obj, minute), (date_obj, minute)
+
+
+def test_outside_table_falls_back_to_engine(engine, table):
+    for date_obj in (table.start - ONE_DAY, table.end + ONE_DAY):
+        assert table.index_of(date_obj) is None
+        assert table.analyze_date(date_obj) == engine.analyze_date(date_obj)
+        assert table.analyze_date(date_obj, 600) == engine.analyze_date(date_obj, 600)
+
+
+def test_analyze_basic_parses_like_engine(engine, table):
+    assert table.analyze_basic("1997/03/24") == engine.analyze_basic("1997/03/24")
+
+
+def test_save_and_load_round_trip(table, tmp_path):
+    path = tmp_path / "table.bin"
+    table.save(path)
+    loaded = FortuneTable.load(path)
+    assert loaded.start == table.start and loaded.days == table.days
+    assert all(loaded.columns[name] == table.columns[name] for name in table.columns)
+
+
+def test_load_rejects_truncated_file(table, tmp_path):
+    path = tmp_path / "table.bin"
+    table.save(path)
+    path.write_bytes(path.read_bytes()[:-1])
+    with pytest.raises(ValueError):
+        FortuneTable.load(path)
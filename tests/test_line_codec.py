@@ -0,0 +1,65 @@
+"""LINE 連携メッセージのエンコード → デコードで内容が変わらないこと"""
+import base64
+import datetime
+import random
+
+import pytest
+
+from fortune_engine import get_fortune_table
+from line_codec import (
+    COMPACT_PREFIX, LineCodecError, LinePayload, decode_many, decode_message, encode_compact, encode_legacy,
+    encode_link, encode_token, validate,
+)
+
+
+def _random_payloads(n, seed=0):
+    rng = random.Random(seed)
+    table = get_fortune_table()
+    payloads = []
+    for _ in range(n):
+        date_obj = table.start + datetime.timedelta(days=rng.randrange(table.days))
+        type_id = table.analyze_date(date_obj)["gan"] + 1
+        scores = None if rng.random() < 0.2 else tuple(rng.randint(10, 50) / 10 for _ in range(5))
+        name = rng.choice(["太郎", "Hanako", "名無し", "a: b", "🌸"])
+        payloads.append(LinePayload(name, date_obj.strftime("%Y%m%d"), type_id, scores))
+    return payloads
+
+
+@pytest.mark.parametrize("encode", [encode_compact, encode_legacy])
+def test_round_trip(encode):
+    for payload in _random_payloads(500):
+        assert decode_message(encode(payload)) == payload
+
+
+@pytest.mark.parametrize("fmt", ["compact", "legacy"])
+def test_round_trip_through_link(fmt):
+    for payload in _random_payloads(100, seed=1):
+        decoded = decode_message(encode_link(payload, fmt))
+        assert validate(decoded) == payload
+
+
+def test_checksum_detects_corruption():
+    token = encode_token(_random_payloads(1)[0])
+    raw = bytearray(base64.urlsafe_b64decode(token[len(COMPACT_PREFIX):] + "=" * (-len(token) % 4)))
+    for i in range(len(raw) - 4):  # CRC 自体を除く各バイトを1ビットずつ壊す
+        broken = bytearray(raw)
+        broken[i] ^= 0x01
+        text = COMPACT_PREFIX + base64.urlsafe_b64encode(bytes(broken)).rstrip(b"=").decode("ascii")
+        with pytest.raises(LineCodecError):
+            decode_message(f"NAME: x\n{text}")
+
+
+def test_validate_rejects_mismatched_type():
+    payload = _random_payloads(1)[0]
+    wrong = payload._replace(type_id=payload.type_id % 10 + 1)
+    with pytest.raises(LineCodecError):
+        validate(decode_message(encode_compact(wrong)))
+
+
+def test_decode_many_drops_duplicates_and_reports_errors():
+    payloads = _random_payloads(3, seed=2)
+    messages = [encode_compact(p) for p in payloads] + [encode_legacy(payloads[0]), "NAME: x\nFS1.AAAA"]
+    result = decode_many(messages)
+    assert result.payloads == payloads
+    assert result.duplicates == 1
+    assert [i for i, _ in result.errors] == [4]
@@ -0,0 +1,88 @@
+"""逆引き索引の問い合わせが参照テーブルの総当たりと一致すること"""
+import datetime
+import random
+
+import numpy as np
+import pytest
+
+from fortune_engine import FATE_CODES, SCORE_KEYS, get_fortune_table
+from reverse_index import REVERSE_INDEX_PATH, ReverseIndex, build
+
+
+@pytest.fixture(scope="module")
+def table():
+    return get_fortune_table()
+
+
+@pytest.fixture(scope="module")
+def index(table):
+    return build(table)
+
+
+@pytest.fixture(scope="module")
+def columns(table):
+    return {name: np.frombuffer(table.columns[name], dtype=np.uint8) for name in ("gan", "fate_code") + SCORE_KEYS}
+
+
+def _brute_force(table, columns, gan, fate_code, scores, start, end):
+    mask = np.ones(table.days, dtype=bool)
+    if gan is not None:
+        mask &= np.isin(columns["gan"], gan)
+    if fate_code is not None:
+        mask &= np.isin(columns["fate_code"], [FATE_CODES.index(c) for c in fate_code])
+    for name, (low, high) in scores.items():
+        mask &= (columns[name] >= low) & (columns[name] <= high)
+    offsets = np.flatnonzero(mask)
+    low = 0 if start is None else (start - table.start).days
+    high = table.days - 1 if end is None else (end - table.start).days
+    return offsets[(offsets >= low) & (offsets <= high)]
+
+
+def _random_query(rng, table):
+    gan = rng.choice([None, [rng.randrange(10)], rng.sample(range(10), 3)])
+    fate_code = rng.choice([None, [rng.choice(FATE_CODES)], rng.sample(FATE_CODES, 2)])
+    scores = {}
+    for name in rng.sample(SCORE_KEYS, rng.randint(0, 2)):
+        low = rng.randint(1, 5)
+        scores[name] = (low, rng.randint(low, 5))
+    start = end = None
+    if rng.random() < 0.7:
+        first = rng.randrange(table.days)
+        start = table.start + datetime.timedelta(days=first)
+        end = start + datetime.timedelta(days=rng.randrange(table.days - first))
+    return gan, fate_code, scores, start, end
+
+
+def test_queries_match_brute_force(table, index, columns):
+    rng = random.Random(0)
+    for _ in range(300):
+        gan, fate_code, scores, start, end = _random_query(rng, table)
+        expected = _brute_force(table, columns, gan, fate_code, scores, start, end)
+        assert np.array_equal(index.day_offsets(gan, fate_code, scores, start, end), expected), (gan, fate_code, scores, start, end)
+
+
+def test_query_ranges_cover_matching_days(table, index, columns):
+    ranges = index.query([2], ["LRDM"], None, datetime.date(1990, 1, 1), datetime.date(1999, 12, 31))
+    expected = _brute_force(table, columns, [2], ["LRDM"], {}, datetime.date(1990, 1, 1), datetime.date(1999, 12, 31))
+    days = np.concatenate([np.arange(s, e + np.timedelta64(1, "D")) for s, e in zip(ranges.starts, ranges.ends)])
+    assert ranges.days == len(expected)
+    assert np.array_equal(days, np.datetime64(table.start, "D") + expected)
+
+
+def test_exact_score_matches_range(index):
+    assert index.count(scores={"Identity": 4}) == index.count(scores={"Identity": (4, 4)})
+
+
+def test_shipped_index_is_current(index):
+    # エンジンやテーブルを変えたら data/reverse_index.npz も作り直すこと（python reverse_index.py build）
+    shipped = ReverseIndex.load(REVERSE_INDEX_PATH)
+    assert shipped.start == index.start
+    for name in ("keys", "offsets", "run_starts", "run_lengths", "profiles"):
+        assert np.array_equal(getattr(shipped, name), getattr(index, name)), name
+
+
+def test_unknown_conditions_raise(index):
+    with pytest.raises(ValueError):
+        index.query(fate_code="XXXX")
+    with pytest.raises(ValueError):
+        index.query(scores={"Luck": 3})
@@ -0,0 +1,144 @@
+"""
+起動時のウォームアップと起動タイミングのレポート
+
+エンジンの参照テーブル・コンテンツパック・画像マニフェスト・HTMLフラグメント・
+図鑑のレーダーチャート・スタイルシートを、最初のユーザーのリクエストではなくサーバー起動時に作っておく。
+serve.py から起動すればサーバーが接続を受け付ける前に、streamlit run app.py で
+起動した場合でも最初の再実行で1度だけ実行される（以降は何もしない）。
+各段階の所要時間と「プロセス起動 → 最初の診断結果表示」までの時間をログに出す。
+"""
+import json
+import logging
+import os
+import threading
+import time
+
+logger = logging.getLogger("fate.startup")
+
+# /proc が読めない環境ではこのモジュールの import 時刻を起点にする
+_IMPORT_TIME = time.time()
+
+_lock = threading.Lock()
+_report = None
+_first_result_at = None
+
+
+def process_start_time():
+    """プロセスの起動時刻 (UNIX時刻)"""
+    try:
+        with open("/proc/self/stat") as f:
+            start_ticks = int(f.read().rsplit(")", 1)[1].split()[19])
+        with open("/proc/stat") as f:
+            boot_time = next(int(line.split()[1]) for line in f if line.startswith("btime"))
+        return boot_time + start_ticks / os.sysconf("SC_CLK_TCK")
+    except (OSError, ValueError, IndexError, StopIteration):
+        return _IMPORT_TIME
+
+
+# ==========================================
+# 1. Warm-up Stages
+# ==========================================
+def _warm_content():
+    from content_pack import get_content_pack
+    get_content_pack()
+
+
+def _warm_engine():
+    from fortune_engine import get_fortune_table
+    from norms import get_norms
+    get_fortune_table()
+    get_norms()
+
+
+def _warm_assets():
+    from assets import get_manifest
+    get_manifest()
+
+
+def _warm_fragments():
+    from content_pack import get_content_pack
+    from fortune_engine import FATE_CODES
+    from fragments import fate_code_fragment, type_fragments
+    pack = get_content_pack()
+    for type_id in pack.type_ids():
+        type_fragments(type_id + 1, pack.get_type(type_id))
+    for code in FATE_CODES:
+        fate_code_fragment(code, pack.fate_meanings)
+
+
+def _warm_radar():
+    import radar_chart
+    from content_pack import get_content_pack
+    pack = get_content_pack()
+    radar_chart.prewarm(pack.get_type(type_id)["default_scores"] for type_id in pack.type_ids())
+
+
+def _warm_stylesheet():
+    from stylesheet import get_stylesheet
+    get_stylesheet()
+
+
+STAGES = (
+    ("content_pack", _warm_content),
+    ("fortune_table", _warm_engine),
+    ("assets", _warm_assets),
+    ("fragments", _warm_fragments),
+    ("radar", _warm_radar),
+    ("stylesheet", _warm_stylesheet),
+)
+
+
+def warm_up():
+    """全キャッシュを構築する。2回目以降は何もせず、最初のレポートを返す"""
+    global _report
+    if _report is not None:
+        return _report
+    with _lock:
+        if _report is None:
+            started = time.perf_counter()
+            stages = {}
+            for name, stage in STAGES:
+                t = time.perf_counter()
+                stage()
+                stages[name] = round(time.perf_counter() - t, 4)
+            _report = {
+                "stages": stages,
+                "warm_up_seconds": round(time.perf_counter() - started, 4),
+                "ready_after_process_start": round(time.time() - process_start_time(), 4),
+            }
+            _emit("warm_up", _report)
+    return _report
+
+
+# ==========================================
+# 2. Startup Report
+# ==========================================
+def mark_first_result():
+    """最初の診断結果を描画したときに呼ぶ。プロセス起動からの経過時間を1度だけ記録する"""
+    global _first_result_at
+    if _first_result_at is not None:
+        return
+    with _lock:
+        if _first_result_at is None:
+            _first_result_at = time.time()
+            _emit("first_result", {"time_to_first_result": round(_first_result_at - process_start_time(), 4)})
+
+
+def startup_report():
+    """これまでに記録した起動タイミング"""
+    report = dict(_report or {})
+    if _first_result_at is not None:
+        report["time_to_first_result"] = round(_first_result_at - process_start_time(), 4)
+    return report
+
+
+def _emit(event, payload):
+    logger.info(json.dumps({"event": event, **payload}, ensure_ascii=False))
+    # デプロイごとに比較できるよう、指定があればファイルにも書き出す
+    path = os.environ.get("FATE_STARTUP_REPORT")
+    if path:
+        try:
+            with open(path, "w", encoding="utf-8") as f:
+                json.dump(startup_report(), f, ensure_ascii=False, indent=2)
+        except OSError:
+            logger.warning("起動レポートを書き出せませんでした: %s", path)